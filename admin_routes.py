@@ -388,7 +388,7 @@ def get_db_versions():
             for path in sftp_paths[:10]:  # 限制查詢數量以提高效能
                 try:
                     # 列出目錄內容
-                    items = sftp_manager._sftp.listdir(path)
+                    items = sftp_manager.listdir(path)
                     
                     # 過濾版本資料夾（格式: 數字開頭）
                     for item in items:
@@ -1022,6 +1022,7 @@ def browse_server():
     try:
         data = request.json
         path = data.get('path', getattr(config, 'DEFAULT_SERVER_PATH', '/home/vince_lin/ai/preMP'))
+        refresh = data.get('refresh', False)
         
         from vp_lib.sftp_manager import SFTPManager
         sftp_manager = SFTPManager()
@@ -1029,8 +1030,12 @@ def browse_server():
         try:
             sftp_manager.connect()
             
+            # 使用者要求重新整理時，清除該路徑的快取
+            if refresh:
+                sftp_manager.invalidate_cache(path)
+            
             # 列出目錄內容
-            items = sftp_manager._sftp.listdir_attr(path)
+            items = sftp_manager.listdir_attr(path)
             
             files = []
             folders = []
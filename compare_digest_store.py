@@ -0,0 +1,166 @@
+"""
+比對結果記錄模組
+以 SQLite 記錄每組比對的輸入雜湊（兩側目標檔案內容、比對情境與路徑）與比對結果，
+重新比對同一來源目錄時，輸入未改變的比對對直接使用記錄的結果，只重新比對新增或改變的部分
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import utils
+import config
+from parse_cache import parse_cache
+
+logger = utils.setup_logger(__name__)
+
+# 比對邏輯或結果格式改變時遞增，讓舊的記錄全部失效
+COMPARE_LOGIC_VERSION = 2
+
+class CompareDigestStore:
+    """比對結果記錄類別（執行緒安全）"""
+
+    def __init__(self, db_path: str = None, enabled: bool = None, retention_days: int = None):
+        """
+        初始化記錄
+
+        Args:
+            db_path: SQLite 檔案路徑（預設 config.COMPARE_DIGEST_DB_PATH）
+            enabled: 是否啟用（預設 config.COMPARE_INCREMENTAL_ENABLED）
+            retention_days: 超過此天數未使用的記錄會被清除（預設 config.COMPARE_DIGEST_RETENTION_DAYS）
+        """
+        self.db_path = db_path or config.COMPARE_DIGEST_DB_PATH
+        self.enabled = config.COMPARE_INCREMENTAL_ENABLED if enabled is None else enabled
+        self.retention_days = (retention_days if retention_days is not None
+                               else config.COMPARE_DIGEST_RETENTION_DAYS)
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得資料庫連線，第一次使用時建立資料表並清除過期記錄（需持有鎖）"""
+        if self._conn is None:
+            utils.create_directory(os.path.dirname(os.path.abspath(self.db_path)))
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS pair_results (
+                    digest TEXT PRIMARY KEY,
+                    results TEXT NOT NULL,
+                    report_file TEXT,
+                    report_identity TEXT,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_pair_results_last_used ON pair_results (last_used);
+            ''')
+            if self.retention_days > 0:
+                with conn:
+                    conn.execute('DELETE FROM pair_results WHERE last_used < ?',
+                                 (time.time() - self.retention_days * 86400,))
+            self._conn = conn
+        return self._conn
+
+    def pair_digest(self, scenario: str, module: str, base_path: str, compare_path: str) -> str:
+        """
+        計算一組比對輸入的雜湊
+
+        Args:
+            scenario: 比對情境
+            module: 模組名稱
+            base_path: base 資料夾路徑
+            compare_path: compare 資料夾路徑
+
+        Returns:
+            十六進位雜湊字串（資料夾不存在時拋出 FileNotFoundError）
+        """
+        files = []
+        for folder in (base_path, compare_path):
+            if not os.path.isdir(folder):
+                raise FileNotFoundError(folder)
+            for target_file in config.TARGET_FILES:
+                file_path = utils.find_file_case_insensitive(folder, target_file)
+                if file_path:
+                    files.append([target_file, os.path.basename(file_path), parse_cache.file_digest(file_path)])
+                else:
+                    files.append([target_file, None, None])
+
+        # 路徑會出現在結果中（location_path），Gerrit 連結也取決於設定
+        payload = json.dumps([
+            COMPARE_LOGIC_VERSION,
+            scenario,
+            str(module),
+            os.path.abspath(base_path),
+            os.path.abspath(compare_path),
+            config.GERRIT_BASE_URL_PREBUILT,
+            config.GERRIT_BASE_URL_NORMAL,
+            files
+        ], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _report_identity(report_file: str) -> Optional[str]:
+        """報表檔案的 (size, mtime_ns)，用來確認報表寫入後未被覆寫"""
+        try:
+            st = os.stat(report_file)
+        except OSError:
+            return None
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    def get(self, digest: str) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """
+        取得記錄的比對結果
+
+        Returns:
+            (results, report_file)，沒有記錄時回傳 None；
+            報表已被刪除或覆寫時 report_file 為 None
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT results, report_file, report_identity FROM pair_results WHERE digest = ?', (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute('UPDATE pair_results SET last_used = ? WHERE digest = ?', (time.time(), digest))
+
+        results, report_file, report_identity = row
+        if report_file and self._report_identity(report_file) != report_identity:
+            report_file = None
+        return json.loads(results), report_file
+
+    def put(self, digest: str, results: Dict[str, Any], report_file: Optional[str]) -> None:
+        """記錄比對結果（report_file 以絕對路徑記錄）"""
+        data = json.dumps(results, ensure_ascii=False)
+        report_identity = None
+        if report_file:
+            report_file = os.path.abspath(report_file)
+            report_identity = self._report_identity(report_file)
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO pair_results '
+                    '(digest, results, report_file, report_identity, last_used) VALUES (?, ?, ?, ?, ?)',
+                    (digest, data, report_file, report_identity, time.time())
+                )
+
+    def clear(self) -> None:
+        """清除全部記錄"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM pair_results')
+
+    def close(self) -> None:
+        """關閉資料庫連線"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# 全域記錄實例
+compare_digest_store = CompareDigestStore()
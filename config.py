@@ -50,13 +50,49 @@ SFTP_USERNAME = 'lgwar_user'
 SFTP_PASSWORD = 'Ab!123456'
 SFTP_TIMEOUT = 30  # 連線逾時時間（秒）
 
+# 平行下載設定
+SFTP_MAX_WORKERS = 8  # 同時下載的最大 channel 數（設為 1 則序列下載）
+SFTP_CHANNELS_PER_TRANSPORT = 4  # 每條 Transport 上開啟的 SFTP channel 數
+
+# 遠端目錄列表快取設定
+SFTP_LISTING_CACHE_TTL = 120  # 目錄列表快取存活秒數（設為 0 停用快取）
+SFTP_LISTING_CACHE_MAX_ENTRIES = 2048  # 最多快取的目錄數（超過時淘汰最久未使用者）
+
+# SFTP 連線池設定（Web 任務、後台 API 與版本查詢共用已認證的連線）
+SFTP_POOL_MAX_PER_HOST = 8  # 每個主機（帳號）最多同時保留的連線數
+SFTP_POOL_MAX_IDLE_SECONDS = 300  # 閒置超過此秒數的連線會被關閉
+SFTP_POOL_HEALTH_CHECK_INTERVAL = 30  # 閒置超過此秒數的連線在借出前會先探測是否可用
+SFTP_POOL_ACQUIRE_TIMEOUT = 60  # 連線數達上限時最長等待秒數
+
+# 大檔傳輸設定（暫存檔續傳 + 管線化預先讀取）
+SFTP_WINDOW_SIZE = 16 * 1024 * 1024  # SSH channel 視窗大小（paramiko 預設 2MB，高延遲連線需加大）
+SFTP_MAX_PACKET_SIZE = 32768  # SSH 封包大小上限
+SFTP_PREFETCH_MAX_REQUESTS = 128  # 同時送出的讀取請求數（每個請求 32KB）
+SFTP_TRANSFER_CHUNK_SIZE = 256 * 1024  # 每次寫入本地檔案的大小
+SFTP_TRANSFER_MAX_RETRIES = 3  # 連線中斷後由中斷位置續傳的最大次數
+SFTP_TRANSFER_RETRY_DELAY = 2  # 續傳前的等待秒數（每次重試加倍）
+
+# 下載進度回報設定（位元組層級的進度會合併後再送出）
+PROGRESS_MAX_RATE_HZ = 4  # 每秒最多送出的進度更新次數
+PROGRESS_THROUGHPUT_WINDOW = 5  # 計算傳輸速率的滑動視窗秒數
+
 # =====================================
 # 檔案設定
 # =====================================
 TARGET_FILES = ['F_Version.txt', 'manifest.xml', 'Version.txt']
 CASE_INSENSITIVE = True  # 檔案名稱比對不區分大小寫
 MAX_SEARCH_DEPTH = 3  # 遞迴搜尋的最大深度
-SKIP_EXISTING_FILES = True  # 是否跳過已存在的檔案
+SKIP_EXISTING_FILES = True  # 是否跳過已存在且與遠端相同（size / mtime）的檔案
+
+# 本地下載快取設定（同一遠端檔案只下載一次，再複製到各任務目錄）
+DOWNLOAD_CACHE_ENABLED = True
+DOWNLOAD_CACHE_DIR = './download_cache'
+DOWNLOAD_CACHE_HARD_LINK = False  # 以硬連結代替複製放入任務目錄（節省空間，但任務目錄中的檔案為唯讀）
+DOWNLOAD_CACHE_MAX_BYTES = 20 * 1024 * 1024 * 1024  # 快取目錄總大小上限，超過時刪除最久未使用的檔案（設為 0 則不限制）
+
+# 版本資料夾索引（記錄各 DB 目錄下的版本資料夾，目錄 mtime 未改變時只需一次 stat）
+VERSION_INDEX_ENABLED = True
+VERSION_INDEX_DB_PATH = './version_index.db'
 
 # =====================================
 # 輸出設定
@@ -65,6 +101,26 @@ DEFAULT_OUTPUT_DIR = './downloads'
 DEFAULT_COMPARE_DIR = './compare_results'
 DEFAULT_ZIP_DIR = './zip_output'
 
+# =====================================
+# 比對設定
+# =====================================
+COMPARE_MAX_WORKERS = 4  # 同時比對的程序數（設為 1 則序列比對）
+COMPARE_SKIP_IDENTICAL_FILES = True  # 兩側檔案內容完全相同（sha256）時略過逐項比對
+COMPARE_DIFF_ENGINE = 'python'  # manifest 差異比對方式：python（逐筆）或 pandas（DataFrame 向量運算，適合大型 manifest）
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # manifest / 版本檔 / 樞紐分析工作表解析結果快取上限（設為 0 停用）
+
+# 增量比對（重新比對時，輸入檔案未改變的比對對直接使用上次的結果）
+COMPARE_INCREMENTAL_ENABLED = True
+COMPARE_DIGEST_DB_PATH = './compare_results/compare_digest.db'
+COMPARE_DIGEST_RETENTION_DAYS = 30  # 超過此天數未使用的比對記錄會被清除（設為 0 則不清除）
+
+# 比對結果欄式副本（報表旁另存欄式檔案與摘要 JSON，網頁讀取結果時不必解析 Excel）
+RESULT_SIDECAR_ENABLED = True
+RESULT_SIDECAR_FORMAT = 'auto'  # auto（有 pyarrow 用 Parquet，否則用 gzip JSON-lines）/ parquet / jsonl
+PAYLOAD_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 樞紐分析等 API 回應快取上限（gzip 壓縮後大小，設為 0 停用快取）
+PIVOT_INLINE_MAX_ROWS = 5000  # 結果頁面直接傳送全部資料列的工作表筆數上限，超過時改由伺服器端分頁與彙總
+PIVOT_PAGE_SIZE = 100  # 伺服器端分頁每頁預設筆數
+
 # =====================================
 # Excel 設定
 # =====================================
@@ -97,6 +153,15 @@ COMMON_PATHS = [
     '/home/vince_lin/ai/PrebuildFW'
 ]
 
+# =====================================
+# 網頁任務記錄
+# =====================================
+TASK_STORE_DB_PATH = './task_store.db'  # 任務狀態、任務結果、最近活動與比對記錄（SQLite）
+TASK_STORE_PROGRESS_INTERVAL = 1.0  # 只有進度改變時，同一任務寫入資料庫的最短間隔（秒）
+TASK_STORE_RETENTION_DAYS = 90  # 超過此天數未更新的記錄會被清除（設為 0 則不清除）
+TASK_STORE_HEARTBEAT_INTERVAL = 30.0  # 有處理中的任務時，程序更新心跳的間隔（秒）
+TASK_STORE_HEARTBEAT_TIMEOUT = 120.0  # 伺服器啟動時，心跳超過此秒數未更新的程序視為已結束，其處理中的任務標記為中斷
+
 # =====================================
 # 路徑解析規則
 # =====================================
@@ -0,0 +1,266 @@
+"""
+本地下載快取模組
+以遠端路徑 + 遠端 st_size / st_mtime 作為鍵，將下載內容存放一次，
+再複製到各任務的下載目錄（任務目錄中的檔案可寫入）；設定 DOWNLOAD_CACHE_HARD_LINK 時改以硬連結放置，
+此時任務目錄中的檔案與唯讀的快取檔案共用內容，同樣為唯讀（避免就地修改破壞快取）；
+總大小超過上限時依最近使用時間淘汰
+"""
+import os
+import shutil
+import stat
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+# 快取檔案的權限（唯讀）
+BLOB_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+# 複製到任務目錄的檔案權限（可寫入）
+COPY_MODE = stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH
+
+class DownloadCache:
+    """本地下載快取類別"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        初始化下載快取
+
+        Args:
+            cache_dir: 快取目錄（預設 config.DOWNLOAD_CACHE_DIR）
+            max_bytes: 快取總大小上限（預設 config.DOWNLOAD_CACHE_MAX_BYTES，0 表示不限制）
+        """
+        self.cache_dir = cache_dir or config.DOWNLOAD_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.DOWNLOAD_CACHE_MAX_BYTES
+        self.logger = logger
+        self._lock = threading.Lock()
+        # 快取鍵 -> [鎖, 使用中的執行緒數]，沒有執行緒使用時移除
+        self._key_locks: Dict[str, list] = {}
+        # 快取目錄的估計大小（None 表示尚未掃描）
+        self._cached_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _remote_mtime(attrs: Any):
+        """取得遠端檔案的修改時間（整數秒）"""
+        mtime = getattr(attrs, 'st_mtime', None)
+        return int(mtime) if mtime is not None else None
+
+    def _cache_key(self, host: str, remote_path: str, attrs: Any) -> str:
+        """以遠端路徑與 size / mtime 產生快取鍵"""
+        identity = f"{host}:{remote_path}:{getattr(attrs, 'st_size', None)}:{self._remote_mtime(attrs)}"
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key: str, remote_path: str) -> str:
+        """快取檔案路徑（保留副檔名方便人工檢視）"""
+        ext = os.path.splitext(remote_path)[1]
+        return os.path.join(self.cache_dir, key[:2], f"{key}{ext}")
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        """持有快取鍵專用的鎖，最後一個使用的執行緒離開時移除"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def is_fresh(self, local_file: str, attrs: Any) -> bool:
+        """
+        檢查本地檔案是否與遠端檔案一致（size 與 mtime 相同）
+
+        Args:
+            local_file: 本地檔案路徑
+            attrs: 遠端檔案的 SFTPAttributes
+
+        Returns:
+            本地檔案是否仍為最新
+        """
+        remote_mtime = self._remote_mtime(attrs)
+        remote_size = getattr(attrs, 'st_size', None)
+        if remote_mtime is None or remote_size is None:
+            return False
+
+        try:
+            local_stat = os.stat(local_file)
+        except OSError:
+            return False
+
+        return local_stat.st_size == remote_size and int(local_stat.st_mtime) == remote_mtime
+
+    def fetch(self, host: str, remote_path: str, attrs: Any, local_file: str,
+              download: Callable[[str], None]) -> bool:
+        """
+        將遠端檔案放到 local_file，快取未命中時才實際下載
+
+        Args:
+            host: SFTP 伺服器位址
+            remote_path: 遠端檔案路徑
+            attrs: 遠端檔案的 SFTPAttributes（需含 st_size / st_mtime）
+            local_file: 目標本地檔案路徑
+            download: 實際下載函數，參數為要寫入的本地路徑
+
+        Returns:
+            是否命中快取
+        """
+        key = self._cache_key(host, remote_path, attrs)
+        blob_path = self._blob_path(key, remote_path)
+
+        # 同一份內容同時只由一個執行緒下載，其他執行緒等待後直接使用
+        # 放入任務目錄也在鎖內進行，避免快取檔案同時被淘汰
+        with self._key_lock(key):
+            hit = os.path.exists(blob_path)
+
+            if hit:
+                # 以 atime 記錄最近使用時間（mtime 保留遠端的修改時間）
+                self._apply_remote_mtime(blob_path, attrs, atime=time.time())
+            else:
+                utils.create_directory(os.path.dirname(blob_path))
+
+                # 先寫入暫存檔再改名，避免讀到不完整的快取
+                # 暫存檔名固定，傳輸中斷留下的部分內容下次可續傳
+                temp_path = f"{blob_path}.tmp"
+                download(temp_path)
+                self._apply_remote_mtime(temp_path, attrs, atime=time.time())
+                os.chmod(temp_path, BLOB_MODE)
+                os.replace(temp_path, blob_path)
+                blob_size = os.path.getsize(blob_path)
+
+            self.link_or_copy(blob_path, local_file)
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                if self._cached_bytes is not None:
+                    self._cached_bytes += blob_size
+
+        if hit:
+            self.logger.info(f"使用本地快取: {remote_path} -> {local_file}")
+        else:
+            self.trim()
+        return hit
+
+    def _apply_remote_mtime(self, path: str, attrs: Any, atime: float = None) -> None:
+        """將本地檔案的 mtime 設為遠端檔案的 mtime，供之後驗證"""
+        remote_mtime = self._remote_mtime(attrs)
+        if remote_mtime is not None:
+            atime = atime or getattr(attrs, 'st_atime', None) or remote_mtime
+            os.utime(path, (atime, remote_mtime))
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """刪除檔案（唯讀檔案在部分平台需先取消唯讀）"""
+        try:
+            os.remove(path)
+        except PermissionError:
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+            os.remove(path)
+
+    def link_or_copy(self, source: str, target: str, hard_link: bool = None) -> None:
+        """
+        將檔案放到 target（保留 mtime 供之後驗證）
+
+        Args:
+            source: 來源檔案
+            target: 目標路徑
+            hard_link: 是否以硬連結放置（預設 config.DOWNLOAD_CACHE_HARD_LINK），
+                       跨檔案系統等不支援的情況改為複製；複製的檔案一律可寫入
+        """
+        utils.create_directory(os.path.dirname(target) or '.')
+        if os.path.lexists(target):
+            self._remove(target)
+
+        if hard_link is None:
+            hard_link = config.DOWNLOAD_CACHE_HARD_LINK
+        if hard_link:
+            try:
+                os.link(source, target)
+                return
+            except OSError:
+                pass
+
+        # copy2 會連同唯讀權限一起複製，改為只複製內容與時間
+        shutil.copyfile(source, target)
+        os.chmod(target, COPY_MODE)
+        st = os.stat(source)
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def _blobs(self) -> List[Tuple[str, os.stat_result]]:
+        """列出快取檔案 (路徑, stat)（不含下載中的暫存檔）"""
+        blobs = []
+        try:
+            with os.scandir(self.cache_dir) as buckets:
+                bucket_paths = [entry.path for entry in buckets if entry.is_dir()]
+        except OSError:
+            return blobs
+        for bucket_path in bucket_paths:
+            try:
+                with os.scandir(bucket_path) as entries:
+                    for entry in entries:
+                        if entry.is_file() and not entry.name.endswith('.tmp'):
+                            blobs.append((entry.path, entry.stat()))
+            except OSError:
+                continue
+        return blobs
+
+    def trim(self) -> int:
+        """
+        快取總大小超過上限時，依最近使用時間（atime）刪除最舊的快取檔案
+        （任務目錄中的硬連結不受影響）
+
+        Returns:
+            刪除的檔案數
+        """
+        if self.max_bytes <= 0:
+            return 0
+        with self._lock:
+            if self._cached_bytes is not None and self._cached_bytes <= self.max_bytes:
+                return 0
+
+        blobs = self._blobs()
+        total = sum(st.st_size for _, st in blobs)
+        removed = 0
+        for path, st in sorted(blobs, key=lambda blob: blob[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            key = os.path.splitext(os.path.basename(path))[0]
+            with self._key_lock(key):
+                try:
+                    self._remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.debug(f"無法刪除快取檔案 {path}: {str(e)}")
+                    continue
+            total -= st.st_size
+            removed += 1
+
+        with self._lock:
+            self._cached_bytes = total
+        if removed:
+            self.logger.info(f"下載快取超過上限，已刪除 {removed} 個最久未使用的檔案")
+        return removed
+
+    def store_mtime(self, local_file: str, attrs: Any) -> None:
+        """停用快取直接下載時，同樣記錄遠端 mtime 以便下次驗證"""
+        try:
+            self._apply_remote_mtime(local_file, attrs)
+        except OSError as e:
+            self.logger.debug(f"無法設定檔案時間 {local_file}: {str(e)}")
+
+# 全域下載快取實例
+download_cache = DownloadCache()
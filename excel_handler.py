@@ -298,7 +298,8 @@ class ExcelHandler:
         self.logger.info("=" * 60)
         return result
             
-    def write_download_report(self, data: List[Dict[str, Any]], output_path: str, source_filename: str) -> str:
+    def write_download_report(self, data: List[Dict[str, Any]], output_path: str, source_filename: str,
+                              summary: Dict[str, Any] = None) -> str:
         """
         寫入下載報表
         
@@ -306,6 +307,7 @@ class ExcelHandler:
             data: 報表資料
             output_path: 輸出路徑
             source_filename: 來源檔案名稱（用於命名）
+            summary: 下載摘要（例如路徑去重統計），有資料時另外寫入「下載摘要」工作表
             
         Returns:
             輸出檔案路徑
@@ -346,6 +348,11 @@ class ExcelHandler:
                 # 格式化工作表
                 worksheet = writer.sheets['下載報表']
                 self._format_worksheet(worksheet)
+                
+                if summary:
+                    summary_df = pd.DataFrame(list(summary.items()), columns=['項目', '數值'])
+                    summary_df.to_excel(writer, sheet_name='下載摘要', index=False)
+                    self._format_worksheet(writer.sheets['下載摘要'])
                     
             self.logger.info(f"成功寫入下載報表: {output_file}")
             return output_file
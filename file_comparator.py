@@ -7,15 +7,202 @@
 import os
 import re
 import glob
+import shutil
+import functools
+import multiprocessing
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import List, Dict, Any, Tuple, Set, Optional
 import pandas as pd
 import utils
 import config
 from excel_handler import ExcelHandler
+from result_sidecar import result_sidecar
+from report_writer import ReportWriter, record_columns, RED_FONT, BLUE_FONT
+from parse_cache import parse_cache
+from compare_digest_store import compare_digest_store
 
 logger = utils.setup_logger(__name__)
 
+# 比對報表各頁籤的欄位順序
+REVISION_DIFF_COLUMNS = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
+                         'base_short', 'base_revision', 'compare_short', 'compare_revision',
+                         'base_upstream', 'compare_upstream', 'base_dest-branch', 'compare_dest-branch',
+                         'base_link', 'compare_link']
+BRANCH_ERROR_COLUMNS = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
+                        'revision_short', 'revision', 'upstream', 'dest-branch',
+                        'compare_link', 'problem', 'has_wave']
+LOST_PROJECT_COLUMNS = ['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path',
+                        'upstream', 'dest-branch', 'revision', 'link']
+VERSION_DIFF_COLUMNS = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'file_type',
+                        'base_content', 'compare_content', 'org_content']
+CANNOT_COMPARE_COLUMNS = ['SN', 'module', 'location_path', 'folder_count', 'folders', 'path', 'reason']
+
+# mapping table 欄位的可能名稱（依優先順序，區分大小寫）
+MAPPING_COLUMN_ALIASES = {
+    'db_type': ['DB_Type', 'db_type', 'Type', 'type'],
+    'db_info': ['DB_Info', 'db_info', 'Info', 'info', 'Module', 'module'],
+    'db_folder': ['DB_Folder', 'db_folder', 'Folder', 'folder'],
+    'sftp_path': ['SftpPath', 'sftp_path', 'Path', 'path', 'LocalPath', 'local_path'],
+    'compare_db_type': ['compare_DB_Type', 'compare_db_type', 'Compare_Type', 'compare_type'],
+    'compare_db_info': ['compare_DB_Info', 'compare_db_info', 'Compare_Info', 'compare_info'],
+    'compare_db_folder': ['compare_DB_Folder', 'compare_db_folder', 'Compare_Folder', 'compare_folder'],
+    'compare_sftp_path': ['compare_SftpPath', 'compare_sftp_path', 'Compare_Path', 'compare_path'],
+    'module': ['Module', 'module', 'ModuleName', 'module_name']
+}
+
+# 各比對情境對應的 (DB_Type, compare_DB_Type)（小寫）
+SCENARIO_DB_TYPE_PAIRS = {
+    'master_vs_premp': [
+        ('master', 'premp'),
+        ('main', 'premp'),
+        ('release', 'premp')
+    ],
+    'premp_vs_wave': [
+        ('premp', 'wave'),
+        ('premp', 'mp'),
+        ('pre-mp', 'wave'),
+        ('pre-mp', 'mp')
+    ],
+    'wave_vs_backup': [
+        ('wave', 'backup'),
+        ('wave', 'wavebackup'),
+        ('wave', 'wave.backup'),
+        ('mp', 'mpbackup'),
+        ('mp', 'mp.backup')
+    ]
+}
+
+class ManifestProject:
+    """manifest 中單一 project 的精簡記錄（原始 XML 文字只在需要時才重新讀取）"""
+    
+    __slots__ = ('name', 'path', 'revision', 'upstream', 'dest_branch', 'groups',
+                 'clone_depth', 'remote', 'source', 'position')
+    
+    # manifest 屬性名稱 -> 欄位名稱
+    ATTRIBUTES = {
+        'name': 'name',
+        'path': 'path',
+        'revision': 'revision',
+        'upstream': 'upstream',
+        'dest-branch': 'dest_branch',
+        'groups': 'groups',
+        'clone-depth': 'clone_depth',
+        'remote': 'remote'
+    }
+    
+    def __init__(self, attrib: Dict[str, str], source: str, position: int):
+        """
+        Args:
+            attrib: project 元素的屬性
+            source: manifest 檔案路徑
+            position: 此 project 在檔案中的順序（從 0 開始）
+        """
+        for attr_name, field in self.ATTRIBUTES.items():
+            setattr(self, field, attrib.get(attr_name, ''))
+        self.source = source
+        self.position = position
+    
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.name, self.path)
+    
+    @property
+    def element(self) -> str:
+        """原始 project 元素的 XML 文字"""
+        return read_manifest_project_element(self.source, self.position)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """以 manifest 屬性名稱取值（與原本的 dict 記錄相容）"""
+        if key == 'element':
+            return self.element
+        field = self.ATTRIBUTES.get(key)
+        return getattr(self, field) if field else default
+    
+    def __getitem__(self, key: str) -> Any:
+        if key != 'element' and key not in self.ATTRIBUTES:
+            raise KeyError(key)
+        return self.get(key)
+    
+    def __repr__(self):
+        return f"ManifestProject(name={self.name!r}, path={self.path!r}, revision={self.revision!r})"
+
+def _iter_project_elements(file_path: str):
+    """
+    以 iterparse 依文件順序逐一產生 project 元素
+    
+    產生的是 start 事件時的元素（屬性已完整），處理完的頂層元素會被清除以節省記憶體
+    """
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            if elem.tag == 'project':
+                yield elem
+        else:
+            depth -= 1
+            if depth == 1:
+                root.clear()
+
+def iter_manifest_projects(file_path: str):
+    """依文件順序產生 manifest 中所有 project 的 ManifestProject 記錄"""
+    for position, elem in enumerate(_iter_project_elements(file_path)):
+        yield ManifestProject(elem.attrib, file_path, position)
+
+def read_manifest_project_element(file_path: str, position: int) -> str:
+    """重新讀取 manifest，取得第 position 個 project 元素的 XML 文字"""
+    depth = 0
+    root = None
+    current = -1
+    target = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            if elem.tag == 'project':
+                current += 1
+                if current == position:
+                    target = elem
+        else:
+            depth -= 1
+            if elem is target:
+                return ET.tostring(elem, encoding='unicode').strip()
+            if depth == 1 and target is None:
+                root.clear()
+    return ''
+
+class DirectoryIndex:
+    """來源目錄索引：走訪一次目錄樹，記錄各資料夾名稱、路徑與是否包含目標檔案"""
+    
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+        self.entries = []  # 依 os.walk 順序的 (資料夾名稱, 路徑)
+        self.has_targets = {}  # 路徑 -> 是否包含目標檔案
+        self._build()
+        # 只有包含目標檔案的資料夾可能成為比對路徑
+        self.target_entries = [(name, path) for name, path in self.entries if self.has_targets[path]]
+        
+    def _build(self):
+        targets = {name.lower() for name in config.TARGET_FILES}
+        
+        for root, dirs, files in os.walk(self.source_dir):
+            self.has_targets[root] = any(name.lower() in targets for name in files + dirs)
+            for dir_name in dirs:
+                self.entries.append((dir_name, os.path.join(root, dir_name)))
+        
+        # os.walk 不會進入符號連結的目錄，這些資料夾另外檢查
+        for _, dir_path in self.entries:
+            if dir_path not in self.has_targets:
+                try:
+                    self.has_targets[dir_path] = any(name.lower() in targets for name in os.listdir(dir_path))
+                except OSError:
+                    self.has_targets[dir_path] = False
+
 class FileComparator:
     """檔案比較器類別"""
     
@@ -25,6 +212,9 @@ class FileComparator:
         self.base_url_prebuilt = config.GERRIT_BASE_URL_PREBUILT
         self.base_url_normal = config.GERRIT_BASE_URL_NORMAL
         self.mapping_tables = {}  # 儲存載入的 mapping tables
+        self._directory_indexes = {}  # source_dir -> DirectoryIndex
+        self.parse_cache = parse_cache  # 跨情境共用的檔案解析結果
+        self.digest_store = compare_digest_store  # 增量比對使用的比對結果記錄
         
     def _shorten_hash(self, hash_str: str) -> str:
         """將 hash code 縮短為前 7 個字元"""
@@ -66,58 +256,64 @@ class FileComparator:
             return full_module.split('/')[-1]
         return full_module
         
-    def _parse_manifest_xml(self, file_path: str) -> Dict[str, Dict[str, str]]:
+    def _parse_manifest_xml(self, file_path: str) -> Dict[Tuple[str, str], ManifestProject]:
         """
-        解析 manifest.xml 檔案
+        解析 manifest.xml 檔案（串流解析，不保留整棵 XML 樹；同一檔案只解析一次）
         
         Args:
             file_path: XML 檔案路徑
             
         Returns:
-            專案資訊字典 {key: project_info}
+            專案資訊字典 {(name, path): ManifestProject}（共用物件，請勿修改）
         """
-        projects = {}
-        
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            # 尋找所有 project 元素
-            for project in root.findall('.//project'):
-                name = project.get('name', '')
-                path = project.get('path', '')
-                key = f"{name}||{path}"  # 使用 name 和 path 作為唯一鍵
-                
-                projects[key] = {
-                    'name': name,
-                    'path': path,
-                    'revision': project.get('revision', ''),
-                    'upstream': project.get('upstream', ''),
-                    'dest-branch': project.get('dest-branch', ''),
-                    'groups': project.get('groups', ''),
-                    'clone-depth': project.get('clone-depth', ''),
-                    'remote': project.get('remote', ''),
-                    'element': ET.tostring(project, encoding='unicode').strip()
-                }
-                
-            self.logger.info(f"成功解析 {file_path}，找到 {len(projects)} 個專案")
-            
+            return self.parse_cache.get_or_load(
+                file_path, 'manifest', lambda: self._load_manifest_projects(file_path)
+            )
         except Exception as e:
             self.logger.error(f"解析 XML 檔案失敗 {file_path}: {str(e)}")
+            return {}
+    
+    def _load_manifest_projects(self, file_path: str) -> Dict[Tuple[str, str], ManifestProject]:
+        """實際解析 manifest.xml"""
+        projects = {}
+        
+        # 使用 name 和 path 作為唯一鍵
+        for project in iter_manifest_projects(file_path):
+            projects[project.key] = project
             
+        self.logger.info(f"成功解析 {file_path}，找到 {len(projects)} 個專案")
         return projects
+    
+    def _read_text_file(self, file_path: str) -> Tuple[str, List[str]]:
+        """讀取文字檔案，回傳 (內容, 行列表)（同一檔案只讀取一次）"""
+        def load():
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            return content, content.splitlines()
         
-    def _compare_manifest_files(self, file1: str, file2: str, module: str, base_folder: str = None, compare_folder: str = None, module_path: str = None, compare_mode: str = None) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        return self.parse_cache.get_or_load(file_path, 'text', load)
+        
+    def _compare_manifest_files(self, file1: str, file2: str, module: str, base_folder: str = None, compare_folder: str = None, module_path: str = None, compare_mode: str = None, identical: bool = False) -> Tuple[List[Dict], List[Dict], List[Dict]]:
         """
         比較兩個 manifest.xml 檔案（修改後的邏輯）
+        
+        identical 為 True 表示兩個檔案內容完全相同，只解析 base 並當作兩側使用
+        （不會有新增 / 刪除的 project，但分支命名檢查與空 revision 仍需逐筆處理）
         """
         # 解析兩個檔案
         base_projects = self._parse_manifest_xml(file1)
-        compare_projects = self._parse_manifest_xml(file2)
+        compare_projects = base_projects if identical else self._parse_manifest_xml(file2)
         
         # 簡化模組名稱
         simple_module = self._extract_simple_module_name(module)
         
+        if config.COMPARE_DIFF_ENGINE == 'pandas':
+            return self._compare_manifest_frames(
+                base_projects, compare_projects, simple_module,
+                base_folder, compare_folder, module_path, compare_mode
+            )
+        
         # 1. 比較 revision 差異
         revision_diff = []
         sn = 1
@@ -155,15 +351,7 @@ class FileComparator:
         sn = 1
         
         # 根據資料夾名稱決定檢查規則
-        check_keyword = None
-        if base_folder and compare_folder:
-            if "-premp" in compare_folder and "-premp" not in base_folder:
-                check_keyword = 'premp'
-            elif "-wave" in compare_folder and "-wave.backup" not in compare_folder:
-                if "-premp" in base_folder:
-                    check_keyword = 'wave'
-            elif "-wave.backup" in compare_folder:
-                check_keyword = 'wave.backup'
+        check_keyword = self._branch_check_keyword(base_folder, compare_folder)
         
         if check_keyword:
             for key, compare_proj in compare_projects.items():
@@ -227,13 +415,7 @@ class FileComparator:
         sn = 1
         
         # 決定 Base folder 值
-        base_folder_value = ""
-        if compare_mode == 'master_vs_premp':
-            base_folder_value = "premp"
-        elif compare_mode == 'premp_vs_wave':
-            base_folder_value = "wave"
-        elif compare_mode == 'wave_vs_backup':
-            base_folder_value = "wavebackup"
+        base_folder_value = self._lost_project_base_value(compare_mode)
         
         # 檢查在 base 檔案中但不在 compare 檔案中的項目（刪除）
         for key, base_proj in base_projects.items():
@@ -276,6 +458,169 @@ class FileComparator:
                 sn += 1
         
         return revision_diff, branch_error, lost_project
+    
+    def _branch_check_keyword(self, base_folder: str, compare_folder: str) -> Optional[str]:
+        """根據資料夾名稱決定分支命名的檢查關鍵字（premp / wave / wave.backup）"""
+        check_keyword = None
+        if base_folder and compare_folder:
+            if "-premp" in compare_folder and "-premp" not in base_folder:
+                check_keyword = 'premp'
+            elif "-wave" in compare_folder and "-wave.backup" not in compare_folder:
+                if "-premp" in base_folder:
+                    check_keyword = 'wave'
+            elif "-wave.backup" in compare_folder:
+                check_keyword = 'wave.backup'
+        return check_keyword
+    
+    def _lost_project_base_value(self, compare_mode: str) -> str:
+        """lost_project 的 Base folder 欄位值"""
+        if compare_mode == 'master_vs_premp':
+            return "premp"
+        elif compare_mode == 'premp_vs_wave':
+            return "wave"
+        elif compare_mode == 'wave_vs_backup':
+            return "wavebackup"
+        return ""
+    
+    def _projects_frame(self, projects: Dict[Tuple[str, str], ManifestProject]) -> pd.DataFrame:
+        """將 project 記錄轉成 DataFrame（_order 為原本的順序）"""
+        records = list(projects.values())
+        return pd.DataFrame({
+            'name': [p.name for p in records],
+            'path': [p.path for p in records],
+            'revision': [p.revision for p in records],
+            'upstream': [p.upstream for p in records],
+            'dest-branch': [p.dest_branch for p in records],
+            '_order': range(len(records))
+        }, dtype=object).astype({'_order': int})
+    
+    @staticmethod
+    def _contains(series: pd.Series, keyword: str) -> pd.Series:
+        """字串包含判斷，結果固定為 bool dtype 以便用 ~ / & / | 組合"""
+        return series.str.contains(keyword, regex=False).astype(bool)
+    
+    def _link_series(self, name: pd.Series, upstream: pd.Series, dest_branch: pd.Series) -> pd.Series:
+        """_generate_link 的向量化版本"""
+        # 優先使用 upstream，如果沒有則使用 dest-branch
+        branch = upstream.where(upstream != '', dest_branch)
+        lower_name = name.str.lower()
+        is_prebuilt = self._contains(lower_name, 'prebuilt') | self._contains(lower_name, 'prebuild')
+        base_url = pd.Series(self.base_url_normal, index=name.index, dtype=object).mask(
+            is_prebuilt, self.base_url_prebuilt
+        )
+        ref = branch.where(branch.str.startswith('refs/').astype(bool), 'refs/heads/' + branch)
+        link = base_url + name + '/+log/' + ref
+        return link.where((name != '') & (branch != ''), '')
+    
+    def _compare_manifest_frames(self, base_projects: Dict[Tuple[str, str], ManifestProject],
+                                 compare_projects: Dict[Tuple[str, str], ManifestProject],
+                                 simple_module: str, base_folder: str, compare_folder: str,
+                                 module_path: str, compare_mode: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """
+        以 DataFrame 比較兩個 manifest（COMPARE_DIFF_ENGINE = 'pandas'）
+        
+        revision 差異與新增 / 刪除的 project 由一次 (name, path) outer merge 取得，
+        分支命名檢查與連結以字串向量運算產生，輸出與逐筆比對完全相同
+        """
+        base_df = self._projects_frame(base_projects)
+        compare_df = self._projects_frame(compare_projects)
+        location_path = module_path if module_path else ''
+        
+        merged = base_df.merge(compare_df, on=['name', 'path'], how='outer',
+                               suffixes=('_base', '_compare'), indicator=True)
+        
+        # 1. 比較 revision 差異（依 base 順序）
+        both = merged[merged['_merge'] == 'both'].sort_values('_order_base')
+        changed = both[(both['revision_base'] != both['revision_compare']) | (both['revision_compare'] == '')]
+        revision_diff = self._frame_records(pd.DataFrame({
+            'module': simple_module,
+            'location_path': location_path,
+            'base_folder': base_folder,
+            'compare_folder': compare_folder,
+            'name': changed['name'],
+            'path': changed['path'],
+            'base_short': changed['revision_base'].str[:7],
+            'base_revision': changed['revision_base'],
+            'compare_short': changed['revision_compare'].str[:7],
+            'compare_revision': changed['revision_compare'],
+            'base_upstream': changed['upstream_base'],
+            'compare_upstream': changed['upstream_compare'],
+            'base_dest-branch': changed['dest-branch_base'],
+            'compare_dest-branch': changed['dest-branch_compare'],
+            'base_link': self._link_series(changed['name'], changed['upstream_base'], changed['dest-branch_base']),
+            'compare_link': self._link_series(changed['name'], changed['upstream_compare'], changed['dest-branch_compare'])
+        }, index=changed.index))
+        
+        # 2. 檢查分支命名錯誤（依 compare 順序）
+        branch_error = []
+        check_keyword = self._branch_check_keyword(base_folder, compare_folder)
+        if check_keyword:
+            upstream = compare_df['upstream']
+            dest_branch = compare_df['dest-branch']
+            should_check = ((upstream != '') & (dest_branch != '')
+                            & ~self._contains(upstream, check_keyword)
+                            & ~self._contains(dest_branch, check_keyword))
+            flagged = compare_df[should_check]
+            has_wave = self._contains(flagged['upstream'], 'wave') | self._contains(flagged['dest-branch'], 'wave')
+            problem = {'premp': "沒改成 premp", 'wave': "沒改成 wave", 'wave.backup': "沒改成 wavebackup"}[check_keyword]
+            branch_error = self._frame_records(pd.DataFrame({
+                'module': simple_module,
+                'location_path': location_path,
+                'base_folder': base_folder,
+                'compare_folder': compare_folder,
+                'name': flagged['name'],
+                'path': flagged['path'],
+                'revision_short': flagged['revision'].str[:7],
+                'revision': flagged['revision'],
+                'upstream': flagged['upstream'],
+                'dest-branch': flagged['dest-branch'],
+                'compare_link': self._link_series(flagged['name'], flagged['upstream'], flagged['dest-branch']),
+                'has_wave': has_wave.map({True: 'Y', False: 'N'}),
+                'problem': has_wave.map({True: '', False: problem})
+            }, index=flagged.index))
+        
+        # 3. 檢查缺少或新增的 project（先刪除再新增）
+        base_folder_value = self._lost_project_base_value(compare_mode)
+        lost_frames = []
+        for side, status, folder, order in (('left_only', '刪除', base_folder, '_order_base'),
+                                            ('right_only', '新增', compare_folder, '_order_compare')):
+            suffix = '_base' if side == 'left_only' else '_compare'
+            rows = merged[merged['_merge'] == side].sort_values(order)
+            lost_frames.append(pd.DataFrame({
+                'Base folder': base_folder_value,
+                '狀態': status,
+                'module': simple_module,
+                'location_path': location_path,
+                'folder': folder,
+                'name': rows['name'],
+                'path': rows['path'],
+                'upstream': rows['upstream' + suffix],
+                'dest-branch': rows['dest-branch' + suffix],
+                'revision': rows['revision' + suffix],
+                'link': self._link_series(rows['name'], rows['upstream' + suffix], rows['dest-branch' + suffix])
+            }, index=rows.index))
+        lost_project = self._frame_records(pd.concat(lost_frames))
+        
+        return revision_diff, branch_error, lost_project
+    
+    def _frame_records(self, df: pd.DataFrame) -> List[Dict]:
+        """DataFrame 轉成 dict 列表，並在最前面加上從 1 開始的 SN"""
+        # 逐欄轉成 list 再組合，比 to_dict('records') 逐格轉型快很多
+        columns = list(df.columns)
+        rows = zip(*(df[column].tolist() for column in columns))
+        return [{'SN': sn, **dict(zip(columns, row))} for sn, row in enumerate(rows, 1)]
+        
+    def _files_identical(self, file1: str, file2: str) -> bool:
+        """兩個檔案內容是否完全相同（先比檔案大小，再比依檔案識別快取的 sha256）"""
+        if not config.COMPARE_SKIP_IDENTICAL_FILES:
+            return False
+        try:
+            if os.path.getsize(file1) != os.path.getsize(file2):
+                return False
+            return self.parse_cache.file_digest(file1) == self.parse_cache.file_digest(file2)
+        except OSError as e:
+            self.logger.debug(f"無法計算檔案雜湊，改為逐項比對: {str(e)}")
+            return False
         
     def _compare_text_files(self, file1: str, file2: str, file_type: str) -> List[Dict[str, Any]]:
         """
@@ -292,12 +637,8 @@ class FileComparator:
         differences = []
         
         try:
-            with open(file1, 'r', encoding='utf-8', errors='ignore') as f1:
-                content1 = f1.read()
-                lines1 = content1.splitlines()
-            with open(file2, 'r', encoding='utf-8', errors='ignore') as f2:
-                content2 = f2.read()
-                lines2 = content2.splitlines()
+            content1, lines1 = self._read_text_file(file1)
+            content2, lines2 = self._read_text_file(file2)
             
             if file_type.lower() == 'f_version.txt':
                 # F_Version.txt 比較規則：只比較 P_GIT_xxx 行
@@ -551,9 +892,8 @@ class FileComparator:
         """寫入總摘要報告，包含所有情境的統計"""
         try:
             import pandas as pd
-            from openpyxl.styles import PatternFill, Font, Alignment
             
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            with ReportWriter(output_file) as writer:
                 # 總摘要頁籤 - 這個頁籤必須存在且可見
                 summary_rows = []
                 
@@ -561,6 +901,7 @@ class FileComparator:
                 scenarios_to_check = ['master_vs_premp', 'premp_vs_wave', 'wave_vs_backup']
                 total_success = 0
                 total_failed = 0
+                total_identical = 0
                 
                 for scenario_key in scenarios_to_check:
                     if scenario_key in all_results:
@@ -571,16 +912,19 @@ class FileComparator:
                         if isinstance(scenario_result, dict):
                             success_count = scenario_result.get('success', 0)
                             failed_count = scenario_result.get('failed', 0)
+                            identical_count = scenario_result.get('identical', 0)
                             modules_list = scenario_result.get('modules', [])
                             failed_modules_list = scenario_result.get('failed_modules', [])
                             
                             total_success += success_count
                             total_failed += failed_count
+                            total_identical += identical_count
                             
                             summary_rows.append({
                                 '比對情境': scenario_name,
                                 '成功模組數': success_count,
                                 '失敗模組數': failed_count,
+                                '內容相同模組數': identical_count,
                                 '成功模組清單': ', '.join(modules_list[:5]) + ('...' if len(modules_list) > 5 else ''),
                                 '失敗模組清單': ', '.join(failed_modules_list[:5]) + ('...' if len(failed_modules_list) > 5 else '')
                             })
@@ -591,6 +935,7 @@ class FileComparator:
                                 '比對情境': scenario_name,
                                 '成功模組數': 0,
                                 '失敗模組數': 0,
+                                '內容相同模組數': 0,
                                 '成功模組清單': '無',
                                 '失敗模組清單': '無'
                             })
@@ -601,6 +946,7 @@ class FileComparator:
                         '比對情境': '無資料',
                         '成功模組數': 0,
                         '失敗模組數': 0,
+                        '內容相同模組數': 0,
                         '成功模組清單': '無',
                         '失敗模組清單': '無'
                     })
@@ -610,13 +956,13 @@ class FileComparator:
                     '比對情境': '總計',
                     '成功模組數': total_success,
                     '失敗模組數': total_failed,
+                    '內容相同模組數': total_identical,
                     '成功模組清單': f'共 {total_success} 個模組',
                     '失敗模組清單': f'共 {total_failed} 個模組'
                 })
                 
-                # 創建總摘要 DataFrame 並寫入（這個必須存在）
-                df_summary = pd.DataFrame(summary_rows)
-                df_summary.to_excel(writer, sheet_name='總摘要', index=False)
+                # 寫入總摘要（這個必須存在）
+                writer.add_sheet('總摘要', record_columns(summary_rows), summary_rows)
                 
                 # 所有差異的統計頁籤
                 stats_data = []
@@ -656,20 +1002,7 @@ class FileComparator:
                         '無法比對': 0
                     })
                 
-                df_stats = pd.DataFrame(stats_data)
-                df_stats.to_excel(writer, sheet_name='差異統計', index=False)
-                
-                # 格式化工作表
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    if hasattr(self, 'excel_handler'):
-                        self.excel_handler._format_worksheet(worksheet)
-                    else:
-                        # 基本格式化
-                        for cell in worksheet[1]:
-                            cell.font = Font(bold=True)
-                            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                            cell.font = Font(color="FFFFFF", bold=True)
+                writer.add_sheet('差異統計', record_columns(stats_data), stats_data)
             
             self.logger.info(f"成功寫入總摘要報告: {output_file}")
             
@@ -696,10 +1029,7 @@ class FileComparator:
                                     output_file, scenario_name):
         """為單一情境寫入摘要報表"""
         try:
-            import pandas as pd
-            from openpyxl.styles import PatternFill, Font, Alignment
-            
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+            with ReportWriter(output_file) as writer:
                 # 摘要頁籤
                 summary_data = [{
                     '項目': '比對情境',
@@ -710,6 +1040,9 @@ class FileComparator:
                 }, {
                     '項目': '失敗模組數',
                     '值': scenario_results['failed']
+                }, {
+                    '項目': '內容相同模組數',
+                    '值': scenario_results.get('identical', 0)
                 }, {
                     '項目': '成功模組清單',
                     '值': ', '.join(scenario_results['modules']) if scenario_results['modules'] else '無'
@@ -717,35 +1050,24 @@ class FileComparator:
                     '項目': '失敗模組清單',
                     '值': ', '.join(scenario_results['failed_modules']) if scenario_results['failed_modules'] else '無'
                 }]
+                writer.add_sheet('摘要', ['項目', '值'], summary_data)
+                # 統計資料另存為摘要 JSON，網頁讀取統計時不必解析 Excel
+                writer.set_summary({
+                    'success': scenario_results['success'],
+                    'failed': scenario_results['failed'],
+                    'identical': scenario_results.get('identical', 0),
+                    'modules': list(scenario_results['modules']),
+                    'failed_modules': list(scenario_results['failed_modules'])
+                })
                 
-                df_summary = pd.DataFrame(summary_data)
-                df_summary.to_excel(writer, sheet_name='摘要', index=False)
-                
-                # 各資料表
-                if revision_diff:
-                    df = pd.DataFrame(revision_diff)
-                    df.to_excel(writer, sheet_name='revision_diff', index=False)
-                
-                if branch_error:
-                    df = pd.DataFrame(branch_error)
-                    df.to_excel(writer, sheet_name='branch_error', index=False)
-                
-                if lost_project:
-                    df = pd.DataFrame(lost_project)
-                    df.to_excel(writer, sheet_name='lost_project', index=False)
-                
-                if version_diff:
-                    df = pd.DataFrame(version_diff)
-                    df.to_excel(writer, sheet_name='version_diff', index=False)
-                
-                if cannot_compare:
-                    df = pd.DataFrame(cannot_compare)
-                    df.to_excel(writer, sheet_name='無法比對', index=False)
-                
-                # 格式化所有工作表
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    self.excel_handler._format_worksheet(worksheet)
+                # 各資料表（欄位依資料原本的順序）
+                for sheet_name, records in [('revision_diff', revision_diff),
+                                            ('branch_error', branch_error),
+                                            ('lost_project', lost_project),
+                                            ('version_diff', version_diff),
+                                            ('無法比對', cannot_compare)]:
+                    if records:
+                        writer.add_sheet(sheet_name, record_columns(records), records)
             
             self.logger.info(f"成功寫入情境摘要報表: {output_file}")
             
@@ -776,6 +1098,7 @@ class FileComparator:
             'master_vs_premp': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -784,6 +1107,7 @@ class FileComparator:
             'premp_vs_wave': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -792,6 +1116,7 @@ class FileComparator:
             'wave_vs_backup': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -830,6 +1155,10 @@ class FileComparator:
         try:
             # 處理每個情境
             scenarios = ['master_vs_premp', 'premp_vs_wave', 'wave_vs_backup']
+            tasks = []  # (scenario, pair)
+            
+            # 來源目錄可能有新下載的資料夾，每次比對重新建立目錄索引
+            self._directory_indexes.clear()
             
             for scenario in scenarios:
                 self.logger.info(f"處理情境: {scenario}")
@@ -868,62 +1197,39 @@ class FileComparator:
                     )
                     
                     self.logger.info(f"找到 {len(comparison_pairs)} 對需要比對的資料夾")
-                    
-                    # 執行比對
-                    for pair in comparison_pairs:
-                        try:
-                            self.logger.info(f"比對: {pair['base_path']} vs {pair['compare_path']}")
-                            
-                            # 確保路徑存在
-                            if not os.path.exists(pair['base_path']) or not os.path.exists(pair['compare_path']):
-                                self.logger.warning(f"路徑不存在: {pair['base_path']} 或 {pair['compare_path']}")
-                                continue
-                            
-                            results = self._compare_specific_folders(
-                                os.path.dirname(pair['base_path']),
-                                os.path.basename(pair['base_path']),
-                                os.path.basename(pair['compare_path']),
-                                pair['module'],
-                                scenario
-                            )
-                            
-                            # 收集資料
-                            scenario_data[scenario]['revision_diff'].extend(results['revision_diff'])
-                            scenario_data[scenario]['branch_error'].extend(results['branch_error'])
-                            scenario_data[scenario]['lost_project'].extend(results['lost_project'])
-                            if 'version_diffs' in results:
-                                scenario_data[scenario]['version_diff'].extend(results['version_diffs'])
-                            
-                            # 記錄成功
-                            all_results[scenario]['success'] += 1
-                            all_results[scenario]['modules'].append(pair['module'])
-                            
-                            # 在寫入個別報表時
-                            if any([results['revision_diff'], results['branch_error'], results['lost_project']]):
-                                scenario_dir = os.path.join(output_dir, scenario)
-                                module_output_dir = os.path.join(scenario_dir, pair['module'])
-                                
-                                # 確保目錄存在
-                                if not os.path.exists(module_output_dir):
-                                    os.makedirs(module_output_dir, exist_ok=True)
-                                
-                                compare_filename = self._generate_compare_filename(
-                                    pair['module'], pair['base_folder'], pair['compare_folder']
-                                )
-                                
-                                report_file = self._write_module_compare_report(
-                                    pair['module'], results, module_output_dir, compare_filename
-                                )
-                                if report_file:
-                                    all_results[scenario]['reports'].append(report_file)
-                            
-                        except Exception as e:
-                            self.logger.error(f"比對 {pair['module']} ({scenario}) 失敗: {str(e)}")
-                            all_results[scenario]['failed'] += 1
-                            all_results[scenario]['failed_modules'].append(pair['module'])
+                    tasks.extend((scenario, pair) for pair in comparison_pairs)
                 else:
                     self.logger.warning(f"未找到 {scenario} 的 mapping table")
             
+            # 執行比對（多程序平行），結果依情境與 mapping 順序回傳
+            outcomes = self._run_mapping_pairs(tasks, output_dir)
+            
+            for (scenario, pair), (results, report_file, error) in zip(tasks, outcomes):
+                if error is not None:
+                    self.logger.error(f"比對 {pair['module']} ({scenario}) 失敗: {error}")
+                    all_results[scenario]['failed'] += 1
+                    all_results[scenario]['failed_modules'].append(pair['module'])
+                    continue
+                
+                # 路徑不存在
+                if results is None:
+                    continue
+                
+                # 收集資料
+                scenario_data[scenario]['revision_diff'].extend(results['revision_diff'])
+                scenario_data[scenario]['branch_error'].extend(results['branch_error'])
+                scenario_data[scenario]['lost_project'].extend(results['lost_project'])
+                if 'version_diffs' in results:
+                    scenario_data[scenario]['version_diff'].extend(results['version_diffs'])
+                
+                # 記錄成功
+                all_results[scenario]['success'] += 1
+                all_results[scenario]['modules'].append(pair['module'])
+                if results.get('identical'):
+                    all_results[scenario]['identical'] += 1
+                if report_file:
+                    all_results[scenario]['reports'].append(report_file)
+            
             # 為每個情境生成獨立的 all_scenarios_compare.xlsx
             for scenario_key in scenarios:
                 data = scenario_data[scenario_key]
@@ -975,6 +1281,188 @@ class FileComparator:
             self.logger.info("改用原有比對邏輯")
             return self._compare_without_mapping(source_dir, output_dir)
 
+    def _run_mapping_pairs(self, tasks: List[Tuple[str, Dict[str, Any]]],
+                           output_dir: str) -> List[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+        """
+        執行所有 mapping 比對對，輸入檔案未改變的比對對直接使用上次記錄的結果
+        
+        Args:
+            tasks: (scenario, pair) 列表
+            output_dir: 輸出目錄
+            
+        Returns:
+            與 tasks 順序相同的 (results, report_file, error) 列表，路徑不存在時 results 為 None
+        """
+        if not self.digest_store.enabled:
+            return self._execute_mapping_pairs(tasks, output_dir)
+        
+        outcomes = [None] * len(tasks)
+        digests = [None] * len(tasks)
+        pending = []
+        
+        for i, (scenario, pair) in enumerate(tasks):
+            cached = None
+            try:
+                digests[i] = self.digest_store.pair_digest(
+                    scenario, pair['module'], pair['base_path'], pair['compare_path']
+                )
+                cached = self.digest_store.get(digests[i])
+            except Exception as e:
+                self.logger.debug(f"無法取得比對記錄 {pair['base_path']} vs {pair['compare_path']}: {str(e)}")
+            
+            if cached is None:
+                pending.append(i)
+                continue
+            
+            results, report_file = cached
+            try:
+                report_file = self._restore_module_report(scenario, pair, results, report_file, output_dir)
+                outcomes[i] = (results, report_file, None)
+            except Exception as e:
+                self.logger.warning(f"無法沿用 {pair['module']} ({scenario}) 的比對報表，重新比對: {str(e)}")
+                pending.append(i)
+        
+        self.logger.info(f"增量比對: {len(tasks) - len(pending)} 對輸入未改變，{len(pending)} 對需要比對")
+        
+        pending.sort()
+        for i, outcome in zip(pending, self._execute_mapping_pairs([tasks[i] for i in pending], output_dir)):
+            outcomes[i] = outcome
+            results, report_file, error = outcome
+            if error is None and results is not None and digests[i]:
+                try:
+                    self.digest_store.put(digests[i], results, report_file)
+                except Exception as e:
+                    self.logger.warning(f"寫入比對記錄失敗: {str(e)}")
+        
+        return outcomes
+    
+    def _restore_module_report(self, scenario: str, pair: Dict[str, Any], results: Dict,
+                               report_file: Optional[str], output_dir: str) -> Optional[str]:
+        """
+        沿用先前產生的模組報表：已在輸出目錄則直接使用，在其他任務目錄則複製，
+        報表已不存在或被覆寫時依記錄的結果重新寫入
+        """
+        if not any([results['revision_diff'], results['branch_error'], results['lost_project']]):
+            return None
+        
+        module_output_dir = os.path.join(output_dir, scenario, pair['module'])
+        compare_filename = self._generate_compare_filename(
+            pair['module'], pair['base_folder'], pair['compare_folder']
+        )
+        target_file = os.path.join(module_output_dir, compare_filename)
+        
+        if report_file and os.path.abspath(target_file) == report_file:
+            return target_file
+        
+        if not os.path.exists(module_output_dir):
+            os.makedirs(module_output_dir, exist_ok=True)
+        
+        if report_file:
+            shutil.copy2(report_file, target_file)
+            # 欄式副本一併複製（copy2 保留修改時間，副本仍與報表一致）
+            sidecar_dir = result_sidecar.sidecar_dir(report_file)
+            if os.path.isdir(sidecar_dir):
+                target_sidecar_dir = result_sidecar.sidecar_dir(target_file)
+                shutil.rmtree(target_sidecar_dir, ignore_errors=True)
+                shutil.copytree(sidecar_dir, target_sidecar_dir)
+            return target_file
+        
+        return self._write_module_compare_report(pair['module'], results, module_output_dir, compare_filename)
+    
+    def _execute_mapping_pairs(self, tasks: List[Tuple[str, Dict[str, Any]]],
+                               output_dir: str) -> List[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+        """
+        執行 mapping 比對對（COMPARE_MAX_WORKERS > 1 時以多程序平行執行）
+        
+        Args:
+            tasks: (scenario, pair) 列表
+            output_dir: 輸出目錄
+            
+        Returns:
+            與 tasks 順序相同的 (results, report_file, error) 列表，路徑不存在時 results 為 None
+        """
+        # 同一模組目錄的比對對交給同一個程序，跨情境共用的 manifest 只需解析一次
+        groups = {}
+        for i, (scenario, pair) in enumerate(tasks):
+            groups.setdefault(os.path.dirname(pair['base_path']), []).append(i)
+        
+        max_workers = min(config.COMPARE_MAX_WORKERS, len(groups))
+        
+        if max_workers > 1:
+            try:
+                outcomes = [None] * len(tasks)
+                # 由網頁的背景執行緒啟動，fork 會複製其他執行緒持有的鎖（logging、SQLite 等），改用 spawn
+                with ProcessPoolExecutor(max_workers=max_workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as executor:
+                    futures = [
+                        (indexes, executor.submit(_compare_pairs_in_worker,
+                                                  [tasks[i] for i in indexes], output_dir))
+                        for indexes in groups.values()
+                    ]
+                    # 依原本順序放回結果，合併與 SN 編號不受完成順序影響
+                    for indexes, future in futures:
+                        for i, outcome in zip(indexes, future.result()):
+                            outcomes[i] = outcome
+                return outcomes
+            except (BrokenProcessPool, OSError) as e:
+                self.logger.warning(f"多程序比對失敗，改為序列比對: {str(e)}")
+        
+        return [
+            self._pair_outcome(functools.partial(self._compare_mapping_pair, pair, scenario, output_dir))
+            for scenario, pair in tasks
+        ]
+    
+    def _pair_outcome(self, run) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """執行單一比對對並將例外轉為錯誤訊息（程序池損壞時往外拋出以改為序列比對）"""
+        try:
+            results, report_file = run()
+            return results, report_file, None
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            return None, None, str(e)
+    
+    def _compare_mapping_pair(self, pair: Dict[str, Any], scenario: str,
+                              output_dir: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        比對 mapping table 中的一組資料夾，有差異時寫入模組報表
+        
+        Returns:
+            (results, report_file)，路徑不存在時為 (None, None)
+        """
+        self.logger.info(f"比對: {pair['base_path']} vs {pair['compare_path']}")
+        
+        # 確保路徑存在
+        if not os.path.exists(pair['base_path']) or not os.path.exists(pair['compare_path']):
+            self.logger.warning(f"路徑不存在: {pair['base_path']} 或 {pair['compare_path']}")
+            return None, None
+        
+        results = self._compare_specific_folders(
+            os.path.dirname(pair['base_path']),
+            os.path.basename(pair['base_path']),
+            os.path.basename(pair['compare_path']),
+            pair['module'],
+            scenario
+        )
+        
+        report_file = None
+        if any([results['revision_diff'], results['branch_error'], results['lost_project']]):
+            module_output_dir = os.path.join(output_dir, scenario, pair['module'])
+            
+            # 確保目錄存在
+            if not os.path.exists(module_output_dir):
+                os.makedirs(module_output_dir, exist_ok=True)
+            
+            compare_filename = self._generate_compare_filename(
+                pair['module'], pair['base_folder'], pair['compare_folder']
+            )
+            
+            report_file = self._write_module_compare_report(
+                pair['module'], results, module_output_dir, compare_filename
+            )
+        
+        return results, report_file
+
     def _compare_without_mapping(self, source_dir: str, output_dir: str) -> Dict[str, Any]:
         """
         不使用 mapping table 的原有比對邏輯（修改為與 mapping 版本一致的輸出格式）
@@ -993,6 +1481,7 @@ class FileComparator:
             'master_vs_premp': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -1001,6 +1490,7 @@ class FileComparator:
             'premp_vs_wave': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -1009,6 +1499,7 @@ class FileComparator:
             'wave_vs_backup': {
                 'success': 0,
                 'failed': 0,
+                'identical': 0,
                 'modules': [],
                 'failed_modules': [],
                 'reports': [],
@@ -1085,6 +1576,8 @@ class FileComparator:
                             # 記錄成功
                             all_results[scenario_key]['success'] += 1
                             all_results[scenario_key]['modules'].append(module)
+                            if results.get('identical'):
+                                all_results[scenario_key]['identical'] += 1
                             module_has_comparison = True
                             
                             # 寫入個別報表
@@ -1256,9 +1749,7 @@ class FileComparator:
                                output_dir: str) -> str:
         """寫入所有比對情境的整合報表"""
         try:
-            import pandas as pd
             from openpyxl.styles import PatternFill, Font, Alignment
-            from openpyxl.worksheet.filters import FilterColumn, Filters, AutoFilter
 
             # 確保輸出目錄存在（重要修正）
             if not os.path.exists(output_dir):
@@ -1267,170 +1758,77 @@ class FileComparator:
                             
             output_file = os.path.join(output_dir, "all_scenarios_compare.xlsx")
             
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # 摘要頁籤
-                summary_data = []
-                
-                # 各情境的統計
-                scenarios = [
-                    ('Master vs PreMP', all_results['master_vs_premp']),
-                    ('PreMP vs Wave', all_results['premp_vs_wave']),
-                    ('Wave vs Backup', all_results['wave_vs_backup'])
-                ]
-                
-                for scenario_name, scenario_result in scenarios:
-                    summary_data.append({
-                        '比對情境': scenario_name,
-                        '成功模組數': scenario_result['success'],
-                        '失敗模組數': scenario_result['failed'],
-                        '成功模組清單': ', '.join(scenario_result['modules']) if scenario_result['modules'] else '',
-                        '失敗模組清單': ', '.join(scenario_result['failed_modules']) if scenario_result['failed_modules'] else ''
-                    })
-                
-                # 加入總計
-                total_modules = len(set(
-                    all_results['master_vs_premp']['modules'] +
-                    all_results['premp_vs_wave']['modules'] +
-                    all_results['wave_vs_backup']['modules']
-                ))
-                
-                total_failed = len(set(
-                    all_results['master_vs_premp']['failed_modules'] +
-                    all_results['premp_vs_wave']['failed_modules'] +
-                    all_results['wave_vs_backup']['failed_modules']
-                ))
-                
+            # 摘要頁籤
+            summary_data = []
+            
+            # 各情境的統計
+            scenarios = [
+                ('Master vs PreMP', all_results['master_vs_premp']),
+                ('PreMP vs Wave', all_results['premp_vs_wave']),
+                ('Wave vs Backup', all_results['wave_vs_backup'])
+            ]
+            
+            for scenario_name, scenario_result in scenarios:
                 summary_data.append({
-                    '比對情境': '總計',
-                    '成功模組數': total_modules,
-                    '失敗模組數': total_failed,
-                    '成功模組清單': str(total_modules),
-                    '失敗模組清單': str(total_failed)
+                    '比對情境': scenario_name,
+                    '成功模組數': scenario_result['success'],
+                    '失敗模組數': scenario_result['failed'],
+                    '成功模組清單': ', '.join(scenario_result['modules']) if scenario_result['modules'] else '',
+                    '失敗模組清單': ', '.join(scenario_result['failed_modules']) if scenario_result['failed_modules'] else ''
                 })
+            
+            # 加入總計
+            total_modules = len(set(
+                all_results['master_vs_premp']['modules'] +
+                all_results['premp_vs_wave']['modules'] +
+                all_results['wave_vs_backup']['modules']
+            ))
+            
+            total_failed = len(set(
+                all_results['master_vs_premp']['failed_modules'] +
+                all_results['premp_vs_wave']['failed_modules'] +
+                all_results['wave_vs_backup']['failed_modules']
+            ))
+            
+            summary_data.append({
+                '比對情境': '總計',
+                '成功模組數': total_modules,
+                '失敗模組數': total_failed,
+                '成功模組清單': str(total_modules),
+                '失敗模組清單': str(total_failed)
+            })
+            
+            # 摘要格式：比對情境靠左、數字置中、清單靠左；總計列淺藍底粗體且全部置中
+            left = Alignment(horizontal='left', vertical='center')
+            center = Alignment(horizontal='center', vertical='center')
+            total_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
+            total_font = Font(bold=True)
+            row_styles = {
+                '比對情境': {'alignment': left},
+                '成功模組數': {'alignment': center},
+                '失敗模組數': {'alignment': center},
+                '成功模組清單': {'alignment': left},
+                '失敗模組清單': {'alignment': left}
+            }
+            total_styles = {
+                column: {'fill': total_fill, 'font': total_font,
+                         'alignment': left if column == '比對情境' else center}
+                for column in row_styles
+            }
+            total_index = len(summary_data) - 1
+            
+            with ReportWriter(output_file) as writer:
+                writer.add_sheet(
+                    '摘要', list(row_styles), summary_data,
+                    column_styles=row_styles,
+                    cell_styles=lambda index, item: total_styles if index == total_index else None
+                )
                 
-                df_summary = pd.DataFrame(summary_data)
-                df_summary.to_excel(writer, sheet_name='摘要', index=False)
-                
-                # 格式化摘要頁籤
-                worksheet_summary = writer.sheets['摘要']
-                
-                # 設定標題列格式（深藍底白字）
-                header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                header_font = Font(color="FFFFFF", bold=True)
-                
-                # 格式化標題列
-                for cell in worksheet_summary[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # 設定總計列的格式（淺藍底）
-                total_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
-                total_font = Font(bold=True)
-                
-                # 找到總計列（最後一列）
-                total_row = len(df_summary) + 1  # +1 因為第一行是標題
-                for col in range(1, len(df_summary.columns) + 1):
-                    cell = worksheet_summary.cell(row=total_row, column=col)
-                    cell.fill = total_fill
-                    cell.font = total_font
-                    # 總計列的數字也要置中
-                    if col in [2, 3]:  # 成功模組數和失敗模組數欄位
-                        cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # 設定所有資料列的對齊方式
-                for row_idx in range(2, total_row + 1):  # 包含總計列
-                    # 比對情境欄位（第1欄）靠左
-                    worksheet_summary.cell(row=row_idx, column=1).alignment = Alignment(horizontal='left', vertical='center')
-                    
-                    # 成功模組數和失敗模組數（第2、3欄）置中
-                    worksheet_summary.cell(row=row_idx, column=2).alignment = Alignment(horizontal='center', vertical='center')
-                    worksheet_summary.cell(row=row_idx, column=3).alignment = Alignment(horizontal='center', vertical='center')
-                    
-                    # 成功模組清單和失敗模組清單（第4、5欄）靠左
-                    if row_idx < total_row:  # 非總計列
-                        worksheet_summary.cell(row=row_idx, column=4).alignment = Alignment(horizontal='left', vertical='center')
-                        worksheet_summary.cell(row=row_idx, column=5).alignment = Alignment(horizontal='left', vertical='center')
-                    else:  # 總計列的清單欄位也置中
-                        worksheet_summary.cell(row=row_idx, column=4).alignment = Alignment(horizontal='center', vertical='center')
-                        worksheet_summary.cell(row=row_idx, column=5).alignment = Alignment(horizontal='center', vertical='center')
-                
-                # 調整欄寬
-                worksheet_summary.column_dimensions['A'].width = 20  # 比對情境
-                worksheet_summary.column_dimensions['B'].width = 15  # 成功模組數
-                worksheet_summary.column_dimensions['C'].width = 15  # 失敗模組數
-                worksheet_summary.column_dimensions['D'].width = 60  # 成功模組清單
-                worksheet_summary.column_dimensions['E'].width = 60  # 失敗模組清單
-                
-                # revision_diff 頁籤
-                if revision_diff:
-                    df = pd.DataFrame(revision_diff)
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'base_short', 'base_revision', 'compare_short', 'compare_revision',
-                                'base_upstream', 'compare_upstream', 'base_dest-branch', 'compare_dest-branch',
-                                'base_link', 'compare_link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='revision_diff', index=False)
-                
-                # branch_error 頁籤
-                if branch_error:
-                    df = pd.DataFrame(branch_error)
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'revision_short', 'revision', 'upstream', 'dest-branch', 
-                                'compare_link', 'problem', 'has_wave']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df_sorted = df.sort_values('has_wave', ascending=True)
-                    df_sorted.to_excel(writer, sheet_name='branch_error', index=False)
-                
-                # lost_project 頁籤
-                if lost_project:
-                    df = pd.DataFrame(lost_project)
-                    columns_order = ['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path', 
-                                'upstream', 'dest-branch', 'revision', 'link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='lost_project', index=False)
-                
-                # version_diff 頁籤
-                if version_diff:
-                    df = pd.DataFrame(version_diff)
-                    # 移除 module_path 欄位
-                    if 'module_path' in df.columns:
-                        df = df.drop('module_path', axis=1)
-                    # 移除 is_different 欄位（如果存在）
-                    if 'is_different' in df.columns:
-                        df = df.drop('is_different', axis=1)
-                    
-                    # 確保欄位順序正確
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'file_type', 
-                                'base_content', 'compare_content', 'org_content']
-                    
-                    # 只保留存在的欄位
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    
-                    # 重新排序欄位
-                    df = df.reindex(columns=columns_order)
-                    
-                    df.to_excel(writer, sheet_name='version_diff', index=False)
-                
-                # 無法比對頁籤
-                if cannot_compare_modules:
-                    df = pd.DataFrame(cannot_compare_modules)
-                    columns_order = ['SN', 'module', 'location_path', 'folder_count', 'folders', 'path', 'reason']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='無法比對', index=False)
-                
-                # 格式化所有工作表
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    self.excel_handler._format_worksheet(worksheet)
-                
-                # 套用特定格式和篩選
-                self._apply_special_formatting_and_filters(writer, revision_diff, branch_error, 
-                                            lost_project, version_diff)
+                self._add_revision_diff_sheet(writer, revision_diff)
+                self._add_branch_error_sheet(writer, branch_error)
+                self._add_lost_project_sheet(writer, lost_project)
+                self._add_version_diff_sheet(writer, version_diff)
+                self._add_cannot_compare_sheet(writer, cannot_compare_modules)
             
             self.logger.info(f"成功寫入所有情境整合報表: {output_file}")
             return output_file
@@ -1439,237 +1837,130 @@ class FileComparator:
             self.logger.error(f"寫入所有情境整合報表失敗: {str(e)}")
             raise
     
-    def _apply_special_formatting_and_filters(self, writer, revision_diff, branch_error, 
-                        lost_project, version_diff):
-        """套用特定欄位的格式和篩選器"""
-        import pandas as pd
-        from openpyxl.styles import PatternFill, Font
-        from openpyxl.worksheet.filters import FilterColumn, Filters, AutoFilter
-        
-        # revision_diff 頁籤的特定格式
-        if revision_diff and 'revision_diff' in writer.sheets:
-            worksheet = writer.sheets['revision_diff']
-            df = pd.DataFrame(revision_diff)
-            
-            # 設定深紅底標題的欄位
-            header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-            white_font = Font(color="FFFFFF", bold=True)
-            red_font = Font(color="FF0000")
-            
-            # 找到需要格式化的欄位位置
-            target_columns = ['base_short', 'base_revision', 'compare_short', 'compare_revision']
-            column_indices = {}
-            
-            for idx, col in enumerate(df.columns):
-                if col in target_columns:
-                    column_indices[col] = idx + 1
-            
-            # 設定標題為深紅底白字
-            for col_name, col_idx in column_indices.items():
-                cell = worksheet.cell(row=1, column=col_idx)
-                cell.fill = header_fill
-                cell.font = white_font
-            
-            # 設定內容為紅字
-            for row in range(2, len(df) + 2):
-                for col_name, col_idx in column_indices.items():
-                    worksheet.cell(row=row, column=col_idx).font = red_font
-        
-        # branch_error 頁籤的特定格式和篩選
-        if branch_error and 'branch_error' in writer.sheets:
-            worksheet = writer.sheets['branch_error']
-            df = pd.DataFrame(branch_error)
-            
-            # 找到 "problem" 和 "has_wave" 欄位的位置
-            problem_col = None
-            has_wave_col = None
-            for idx, col in enumerate(df.columns):
-                if col == 'problem':
-                    problem_col = idx
-                    print("problem_col:", problem_col)
-                elif col == 'has_wave':
-                    has_wave_col = idx + 2
-                    print("has_wave_col:", has_wave_col)
-            
-            if problem_col:
-                # 設定深紅底白字
-                header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-                white_font = Font(color="FFFFFF", bold=True)
-                red_font = Font(color="FF0000")
-                
-                # 設定標題
-                cell = worksheet.cell(row=1, column=problem_col)
-                cell.fill = header_fill
-                cell.font = white_font
-                
-                # 設定 problem 欄位有內容的儲存格為紅字
-                for row_idx in range(2, worksheet.max_row + 1):  # 使用 worksheet.max_row
-                    cell_value = worksheet.cell(row=row_idx, column=problem_col).value
-                    if cell_value and str(cell_value).strip():  # 如果有內容
-                        worksheet.cell(row=row_idx, column=problem_col).font = red_font
-            
-            # 設定自動篩選
-            worksheet.auto_filter.ref = worksheet.dimensions
-
-            # 設定 has_wave 欄位的篩選條件為只顯示 "N"
-            if has_wave_col:
-                # 取得所有唯一的 has_wave 值
-                has_wave_values = df['has_wave'].unique().tolist()
-                
-                # 建立篩選器，注意 colId 是從 0 開始的
-                has_wave_df_index = df.columns.get_loc('has_wave') + 1
-                print("has_wave_df_index:", has_wave_df_index)
-                filter_column = FilterColumn(colId=has_wave_df_index)
-                filter_column.filters = Filters()
-                filter_column.filters.filter = ['N']
-                
-                # 如果有 'Y' 值，需要將其設為隱藏
-                if 'Y' in has_wave_values:
-                    # 直接根據工作表中的值來隱藏
-                    for row_idx in range(2, worksheet.max_row + 1):
-                        if worksheet.cell(row=row_idx, column=has_wave_col).value == 'Y':
-                            worksheet.row_dimensions[row_idx].hidden = True
-                
-                # 將篩選器加入自動篩選
-                worksheet.auto_filter.filterColumn.append(filter_column)
-        
-        # lost_project 頁籤的特定格式
-        if lost_project and 'lost_project' in writer.sheets:
-            worksheet = writer.sheets['lost_project']
-            df = pd.DataFrame(lost_project)
-            
-            # 定義顏色
-            red_font = Font(color="FF0000")  # 紅色
-            blue_font = Font(color="0000FF")  # 藍色
-            
-            # 找到 "Base folder" 和 "狀態" 欄位的位置
-            base_folder_col = None
-            status_col = None
-            for idx, col in enumerate(df.columns):
-                if col == 'Base folder':
-                    base_folder_col = idx + 1
-                    # 設定深紅底白字
-                    header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-                    white_font = Font(color="FFFFFF", bold=True)
-                    cell = worksheet.cell(row=1, column=base_folder_col)
-                    cell.fill = header_fill
-                    cell.font = white_font
-                elif col == '狀態':
-                    status_col = idx + 1
-                    # 設定深紅底白字
-                    header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-                    white_font = Font(color="FFFFFF", bold=True)
-                    cell = worksheet.cell(row=1, column=status_col)
-                    cell.fill = header_fill
-                    cell.font = white_font
-            
-            # 設定狀態欄位的文字顏色
-            if status_col:
-                for row_idx in range(2, len(df) + 2):
-                    df_row_idx = row_idx - 2
-                    if '狀態' in df.columns:
-                        status_value = df.iloc[df_row_idx]['狀態']
-                        if status_value == '刪除':
-                            worksheet.cell(row=row_idx, column=status_col).font = red_font
-                        elif status_value == '新增':
-                            worksheet.cell(row=row_idx, column=status_col).font = blue_font
-        
-        # version_diff 頁籤的特定格式
-        if version_diff and 'version_diff' in writer.sheets:
-            worksheet = writer.sheets['version_diff']
-            df = pd.DataFrame(version_diff)
-            
-            from openpyxl.cell.text import InlineFont
-            from openpyxl.cell.rich_text import TextBlock, CellRichText
-            
-            # 設定深紅底白字的標題
-            header_fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
-            white_font = Font(color="FFFFFF", bold=True)
-            red_font = Font(color="FF0000")
-            
-            # 找到需要格式化的欄位位置
-            target_columns = ['base_content', 'compare_content']
-            column_indices = {}
-            
-            for idx, col in enumerate(df.columns):
-                if col in target_columns:
-                    column_indices[col] = idx + 2
-            
-            # 設定標題為深紅底白字（只有 base_content 和 compare_content）
-            for col_name, col_idx in column_indices.items():
-                cell = worksheet.cell(row=1, column=col_idx)
-                cell.fill = header_fill
-                cell.font = white_font
-            
-            # 處理內容，根據檔案類型標記不同部分
-            for row_idx in range(2, len(df) + 2):
-                # 讀取實際的值
-                df_row_idx = row_idx - 2  # DataFrame 的索引
-                
-                # 取得檔案類型
-                file_type = ''
-                if 'file_type' in df.columns:
-                    file_type = df.iloc[df_row_idx]['file_type']
-                
-                # 取得 base_content 和 compare_content
-                base_content = ''
-                compare_content = ''
-                
-                if 'base_content' in df.columns:
-                    base_content = df.iloc[df_row_idx]['base_content']
-                if 'compare_content' in df.columns:
-                    compare_content = df.iloc[df_row_idx]['compare_content']
-                
-                # 檢查是否為檔案不存在的情況
-                if str(base_content) == '(檔案不存在)':
-                    # base_content 為紅字
-                    if 'base_content' in column_indices:
-                        worksheet.cell(row=row_idx, column=column_indices['base_content']).font = red_font
-                        worksheet.cell(row=row_idx, column=column_indices['base_content']).value = base_content
-                        
-                    # 如果 compare_content 是 "(檔案存在)"，保持黑字
-                    if 'compare_content' in column_indices and str(compare_content) == '(檔案存在)':
-                        worksheet.cell(row=row_idx, column=column_indices['compare_content']).value = compare_content
-                        
-                elif str(compare_content) == '(檔案不存在)':
-                    # compare_content 為紅字
-                    if 'compare_content' in column_indices:
-                        worksheet.cell(row=row_idx, column=column_indices['compare_content']).font = red_font
-                        worksheet.cell(row=row_idx, column=column_indices['compare_content']).value = compare_content
-                        
-                    # 如果 base_content 是 "(檔案存在)"，保持黑字
-                    if 'base_content' in column_indices and str(base_content) == '(檔案存在)':
-                        worksheet.cell(row=row_idx, column=column_indices['base_content']).value = base_content
-                else:
-                    # 根據檔案類型和內容選擇處理方式
-                    if str(file_type).lower() == 'f_version.txt' and base_content and compare_content:
-                        # F_Version.txt: 處理 P_GIT_xxx 行 - 支援多行處理
-                        base_lines = str(base_content).split('\n')
-                        compare_lines = str(compare_content).split('\n')
-                        
-                        # 檢查是否包含 P_GIT_ 行
-                        has_p_git_base = any(line.strip().startswith('P_GIT_') for line in base_lines)
-                        has_p_git_compare = any(line.strip().startswith('P_GIT_') for line in compare_lines)
-                        
-                        if has_p_git_base or has_p_git_compare:
-                            self._format_f_version_content(worksheet, row_idx, column_indices, base_content, compare_content)
-                        else:
-                            # 其他行不需要特殊格式化
-                            pass
-                    elif 'F_HASH:' in str(base_content) or 'F_HASH:' in str(compare_content):
-                        # Version.txt with F_HASH
-                        self._format_f_hash_content(worksheet, row_idx, column_indices, base_content, compare_content)
-                    elif ':' in str(base_content) or ':' in str(compare_content):
-                        # Other Version.txt with colon
-                        self._format_colon_content(worksheet, row_idx, column_indices, base_content, compare_content)
+    def _add_revision_diff_sheet(self, writer: ReportWriter, revision_diff: List[Dict],
+                                 empty_columns: List[str] = None) -> None:
+        """
+        寫入 revision_diff 頁籤（revision 欄位標題深紅底白字、內容紅字）
+        
+        Args:
+            writer: 報表寫入器
+            revision_diff: 資料列
+            empty_columns: 沒有資料時仍建立頁籤所使用的欄位（None 表示不建立）
+        """
+        if not revision_diff:
+            if empty_columns:
+                writer.add_sheet('revision_diff', empty_columns, [])
+            return
+        
+        target_columns = ['base_short', 'base_revision', 'compare_short', 'compare_revision']
+        writer.add_sheet(
+            'revision_diff', record_columns(revision_diff, REVISION_DIFF_COLUMNS), revision_diff,
+            highlight_headers=target_columns,
+            column_styles={column: {'font': RED_FONT} for column in target_columns}
+        )
+    
+    def _add_branch_error_sheet(self, writer: ReportWriter, branch_error: List[Dict],
+                                empty_columns: List[str] = None) -> None:
+        """寫入 branch_error 頁籤（has_wave = N 排在前面且預設只顯示 N，problem 有內容時紅字）"""
+        if not branch_error:
+            if empty_columns:
+                writer.add_sheet('branch_error', empty_columns, [])
+            return
+        
+        # 將 has_wave = N 的資料排在前面（與 DataFrame.sort_values 的順序相同）
+        has_wave = pd.DataFrame({'has_wave': [item.get('has_wave') for item in branch_error]})
+        records = [branch_error[i] for i in has_wave.sort_values('has_wave', ascending=True).index]
+        
+        writer.add_sheet(
+            'branch_error', record_columns(branch_error, BRANCH_ERROR_COLUMNS), records,
+            highlight_headers=['problem'],
+            cell_styles=lambda index, item: (
+                {'problem': {'font': RED_FONT}} if str(item.get('problem') or '').strip() else None
+            ),
+            hidden=lambda item: item.get('has_wave') == 'Y',
+            auto_filter=True,
+            filters={'has_wave': ['N']}
+        )
+    
+    def _add_lost_project_sheet(self, writer: ReportWriter, lost_project: List[Dict],
+                                empty_columns: List[str] = None) -> None:
+        """寫入 lost_project 頁籤（刪除紅字、新增藍字）"""
+        if not lost_project:
+            if empty_columns:
+                writer.add_sheet('lost_project', empty_columns, [])
+            return
+        
+        status_styles = {'刪除': {'狀態': {'font': RED_FONT}}, '新增': {'狀態': {'font': BLUE_FONT}}}
+        writer.add_sheet(
+            'lost_project', record_columns(lost_project, LOST_PROJECT_COLUMNS), lost_project,
+            highlight_headers=['Base folder', '狀態'],
+            cell_styles=lambda index, item: status_styles.get(item.get('狀態'))
+        )
+    
+    def _add_version_diff_sheet(self, writer: ReportWriter, version_diff: List[Dict],
+                                empty_columns: List[str] = None) -> None:
+        """寫入 version_diff 頁籤（依檔案類型以 rich text 標出不同的值）"""
+        if not version_diff:
+            if empty_columns:
+                writer.add_sheet('version_diff', empty_columns, [])
+            return
+        
+        writer.add_sheet(
+            'version_diff', record_columns(version_diff, VERSION_DIFF_COLUMNS), version_diff,
+            highlight_headers=['base_content', 'compare_content'],
+            cell_styles=self._version_diff_cell_styles
+        )
+    
+    def _add_cannot_compare_sheet(self, writer: ReportWriter, cannot_compare_modules: List[Dict]) -> None:
+        """寫入無法比對頁籤"""
+        if cannot_compare_modules:
+            writer.add_sheet('無法比對', record_columns(cannot_compare_modules, CANNOT_COMPARE_COLUMNS),
+                             cannot_compare_modules)
+    
+    def _version_diff_cell_styles(self, index: int, item: Dict[str, Any]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """version_diff 單列的格式：檔案不存在的一側紅字，其餘依檔案類型只標出不同的部分"""
+        file_type = item.get('file_type', '')
+        base_content = item.get('base_content', '')
+        compare_content = item.get('compare_content', '')
+        
+        # 檢查是否為檔案不存在的情況
+        if str(base_content) == '(檔案不存在)':
+            return {'base_content': {'font': RED_FONT}}
+        if str(compare_content) == '(檔案不存在)':
+            return {'compare_content': {'font': RED_FONT}}
+        
+        # 根據檔案類型和內容選擇處理方式
+        rich_values = (None, None)
+        if str(file_type).lower() == 'f_version.txt' and base_content and compare_content:
+            # F_Version.txt: 只處理包含 P_GIT_xxx 行的內容
+            base_lines = str(base_content).split('\n')
+            compare_lines = str(compare_content).split('\n')
+            if (any(line.strip().startswith('P_GIT_') for line in base_lines) or
+                    any(line.strip().startswith('P_GIT_') for line in compare_lines)):
+                rich_values = self._f_version_rich_text(base_content, compare_content)
+        elif 'F_HASH:' in str(base_content) or 'F_HASH:' in str(compare_content):
+            # Version.txt with F_HASH
+            rich_values = self._f_hash_rich_text(base_content, compare_content)
+        elif ':' in str(base_content) or ':' in str(compare_content):
+            # Other Version.txt with colon
+            rich_values = self._colon_rich_text(base_content, compare_content)
+        
+        styles = {}
+        for column, value in zip(('base_content', 'compare_content'), rich_values):
+            if value is not None:
+                styles[column] = {'value': value}
+        return styles
 
-    def _format_f_version_content(self, worksheet, row_idx, column_indices, base_content, compare_content):
-        """格式化 F_Version.txt 內容 - 只標記 git hash 和 svn number，支援多行"""
+    def _f_version_rich_text(self, base_content, compare_content) -> Tuple[Any, Any]:
+        """F_Version.txt 內容 - 只標記 git hash 和 svn number，支援多行（回傳 base / compare 的 rich text，None 表示不變）"""
         from openpyxl.cell.text import InlineFont
         from openpyxl.cell.rich_text import TextBlock, CellRichText
         
+        base_value = None
+        compare_value = None
+        
         # 處理 base_content - 支援多行
-        if 'base_content' in column_indices and base_content:
+        if base_content:
             base_lines = str(base_content).split('\n')
             compare_lines = str(compare_content).split('\n') if compare_content else []
             
@@ -1704,11 +1995,10 @@ class FileComparator:
                     # 非 P_GIT_ 行，保持原樣
                     rich_text_parts.append(TextBlock(InlineFont(color="000000"), base_line))
             
-            cell_rich_text = CellRichText(rich_text_parts)
-            worksheet.cell(row=row_idx, column=column_indices['base_content']).value = cell_rich_text
+            base_value = CellRichText(rich_text_parts)
         
         # 處理 compare_content - 支援多行
-        if 'compare_content' in column_indices and compare_content:
+        if compare_content:
             base_lines = str(base_content).split('\n') if base_content else []
             compare_lines = str(compare_content).split('\n')
             
@@ -1743,16 +2033,20 @@ class FileComparator:
                     # 非 P_GIT_ 行，保持原樣
                     rich_text_parts.append(TextBlock(InlineFont(color="000000"), compare_line))
             
-            cell_rich_text = CellRichText(rich_text_parts)
-            worksheet.cell(row=row_idx, column=column_indices['compare_content']).value = cell_rich_text
+            compare_value = CellRichText(rich_text_parts)
+        
+        return base_value, compare_value
 
-    def _format_f_hash_content(self, worksheet, row_idx, column_indices, base_content, compare_content):
-        """格式化 F_HASH 內容 - 只標記 hash 值"""
+    def _f_hash_rich_text(self, base_content, compare_content) -> Tuple[Any, Any]:
+        """F_HASH 內容 - 只標記 hash 值（回傳 base / compare 的 rich text，None 表示不變）"""
         from openpyxl.cell.text import InlineFont
         from openpyxl.cell.rich_text import TextBlock, CellRichText
         
+        base_value = None
+        compare_value = None
+        
         # 處理 base_content
-        if 'base_content' in column_indices and base_content and 'F_HASH:' in str(base_content):
+        if base_content and 'F_HASH:' in str(base_content):
             parts = str(base_content).split('F_HASH:', 1)
             if len(parts) == 2:
                 hash1 = parts[1].strip()
@@ -1762,16 +2056,13 @@ class FileComparator:
                     if len(compare_parts) == 2:
                         hash2 = compare_parts[1].strip()
                 
-                rich_text_parts = [
+                base_value = CellRichText([
                     TextBlock(InlineFont(color="000000"), "F_HASH: "),
                     TextBlock(InlineFont(color="FF0000" if hash1 != hash2 else "000000"), hash1)
-                ]
-                
-                cell_rich_text = CellRichText(rich_text_parts)
-                worksheet.cell(row=row_idx, column=column_indices['base_content']).value = cell_rich_text
+                ])
         
         # 處理 compare_content
-        if 'compare_content' in column_indices and compare_content and 'F_HASH:' in str(compare_content):
+        if compare_content and 'F_HASH:' in str(compare_content):
             parts = str(compare_content).split('F_HASH:', 1)
             if len(parts) == 2:
                 hash2 = parts[1].strip()
@@ -1781,21 +2072,23 @@ class FileComparator:
                     if len(base_parts) == 2:
                         hash1 = base_parts[1].strip()
                 
-                rich_text_parts = [
+                compare_value = CellRichText([
                     TextBlock(InlineFont(color="000000"), "F_HASH: "),
                     TextBlock(InlineFont(color="FF0000" if hash1 != hash2 else "000000"), hash2)
-                ]
-                
-                cell_rich_text = CellRichText(rich_text_parts)
-                worksheet.cell(row=row_idx, column=column_indices['compare_content']).value = cell_rich_text
+                ])
+        
+        return base_value, compare_value
 
-    def _format_colon_content(self, worksheet, row_idx, column_indices, base_content, compare_content):
-        """格式化包含冒號的內容 - 只標記值的部分"""
+    def _colon_rich_text(self, base_content, compare_content) -> Tuple[Any, Any]:
+        """包含冒號的內容 - 只標記值的部分（回傳 base / compare 的 rich text，None 表示不變）"""
         from openpyxl.cell.text import InlineFont
         from openpyxl.cell.rich_text import TextBlock, CellRichText
         
+        base_value = None
+        compare_value = None
+        
         # 處理 base_content
-        if 'base_content' in column_indices and base_content and ':' in str(base_content):
+        if base_content and ':' in str(base_content):
             parts = str(base_content).split(':', 1)
             if len(parts) == 2:
                 key = parts[0]
@@ -1807,16 +2100,13 @@ class FileComparator:
                     if len(compare_parts) == 2 and compare_parts[0] == key:
                         value2 = compare_parts[1].strip()
                 
-                rich_text_parts = [
+                base_value = CellRichText([
                     TextBlock(InlineFont(color="000000"), key + ": "),
                     TextBlock(InlineFont(color="FF0000" if value1 != value2 else "000000"), value1)
-                ]
-                
-                cell_rich_text = CellRichText(rich_text_parts)
-                worksheet.cell(row=row_idx, column=column_indices['base_content']).value = cell_rich_text
+                ])
         
         # 處理 compare_content
-        if 'compare_content' in column_indices and compare_content and ':' in str(compare_content):
+        if compare_content and ':' in str(compare_content):
             parts = str(compare_content).split(':', 1)
             if len(parts) == 2:
                 key = parts[0]
@@ -1828,14 +2118,13 @@ class FileComparator:
                     if len(base_parts) == 2 and base_parts[0] == key:
                         value1 = base_parts[1].strip()
                 
-                rich_text_parts = [
+                compare_value = CellRichText([
                     TextBlock(InlineFont(color="000000"), key + ": "),
                     TextBlock(InlineFont(color="FF0000" if value1 != value2 else "000000"), value2)
-                ]
-                
-                cell_rich_text = CellRichText(rich_text_parts)
-                worksheet.cell(row=row_idx, column=column_indices['compare_content']).value = cell_rich_text
-                        
+                ])
+        
+        return base_value, compare_value
+
     def compare_module_folders(self, module_path: str, base_folder_suffix: str = None) -> Dict[str, Any]:
         """
         比較模組下的兩個資料夾
@@ -2179,9 +2468,12 @@ class FileComparator:
             'lost_project': [],
             'text_file_differences': {},
             'version_diffs': [],
+            'identical_files': [],  # 兩側內容完全相同的目標檔案
+            'identical': False,  # 存在的目標檔案是否全部兩側都有且內容相同
             'base_folder': base_folder,
             'compare_folder': compare_folder
         }
+        present_files = 0  # 至少一側存在的目標檔案數
         
         try:
             folder1_path = os.path.join(module_path, base_folder)
@@ -2202,15 +2494,26 @@ class FileComparator:
                 file1 = utils.find_file_case_insensitive(folder1_path, target_file)
                 file2 = utils.find_file_case_insensitive(folder2_path, target_file)
                 
+                if file1 or file2:
+                    present_files += 1
+                
                 if file1 and file2:
+                    identical = self._files_identical(file1, file2)
+                    if identical:
+                        results['identical_files'].append(target_file)
+                    
                     if target_file.lower() == 'manifest.xml':
                         # 比較 manifest.xml
                         revision_diff, branch_error, lost_project = self._compare_manifest_files(
-                            file1, file2, module, base_folder, compare_folder, module_path, compare_mode
+                            file1, file2, module, base_folder, compare_folder, module_path, compare_mode,
+                            identical=identical
                         )
                         results['revision_diff'] = revision_diff
                         results['branch_error'] = branch_error
                         results['lost_project'] = lost_project
+                    elif identical:
+                        # 內容完全相同的版本檔案不會有差異
+                        self.logger.debug(f"{target_file} 兩側內容相同，略過比對")
                     else:
                         # 比較文字檔案（Version.txt 或 F_Version.txt）
                         differences = self._compare_text_files(file1, file2, target_file)
@@ -2289,6 +2592,8 @@ class FileComparator:
                                 self.logger.error(f"讀取檔案失敗 {file2}: {str(e)}")
                 else:
                     self.logger.warning(f"檔案 {target_file} 在兩個資料夾中都不存在")
+            
+            results['identical'] = present_files > 0 and len(results['identical_files']) == present_files
                         
         except Exception as e:
             self.logger.error(f"比較資料夾失敗: {str(e)}")
@@ -2300,10 +2605,6 @@ class FileComparator:
         寫入單一模組的比較報表（與 all_compare.xlsx 相同格式）
         """
         try:
-            import pandas as pd
-            from openpyxl.styles import PatternFill, Font
-            from openpyxl.worksheet.filters import FilterColumn, Filters
-
             # 確保輸出目錄存在（重要修正）
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir, exist_ok=True)
@@ -2328,74 +2629,23 @@ class FileComparator:
             for i, item in enumerate(version_diffs, 1):
                 item['SN'] = i
             
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # revision_diff 頁籤
-                if revision_diff:
-                    df = pd.DataFrame(revision_diff)
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'base_short', 'base_revision', 'compare_short', 'compare_revision',
-                                'base_upstream', 'compare_upstream', 'base_dest-branch', 'compare_dest-branch',
-                                'base_link', 'compare_link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='revision_diff', index=False)
-                else:
-                    # 即使沒有資料也建立空的頁籤
-                    pd.DataFrame(columns=['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
-                                        'base_short', 'base_revision', 'compare_short', 'compare_revision']).to_excel(
-                        writer, sheet_name='revision_diff', index=False)
-                
-                # branch_error 頁籤
-                if branch_error:
-                    df = pd.DataFrame(branch_error)
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'revision_short', 'revision', 'upstream', 'dest-branch', 
-                                'compare_link', 'problem', 'has_wave']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    
-                    # 將 has_wave = N 的資料排在前面
-                    df_sorted = df.sort_values('has_wave', ascending=True)
-                    df_sorted.to_excel(writer, sheet_name='branch_error', index=False)
-                else:
-                    pd.DataFrame(columns=['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
-                                        'problem', 'has_wave']).to_excel(
-                        writer, sheet_name='branch_error', index=False)
-                
-                # lost_project 頁籤
-                if lost_project:
-                    df = pd.DataFrame(lost_project)
-                    columns_order = ['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path', 
-                                'upstream', 'dest-branch', 'revision', 'link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='lost_project', index=False)
-                else:
-                    pd.DataFrame(columns=['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path']).to_excel(
-                        writer, sheet_name='lost_project', index=False)
-                
-                # version_diff 頁籤 - 修正：加入 org_content
-                if version_diffs:
-                    df = pd.DataFrame(version_diffs)
-                    # 確保欄位順序正確，org_content 在最後
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'file_type', 
-                                'base_content', 'compare_content', 'org_content']  # 加入 org_content
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='version_diff', index=False)
-                else:
-                    pd.DataFrame(columns=['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'file_type',
-                                        'base_content', 'compare_content', 'org_content']).to_excel(  # 加入 org_content
-                        writer, sheet_name='version_diff', index=False)
-                
-                # 先格式化所有工作表（基本格式）
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    self.excel_handler._format_worksheet(worksheet)
-                
-                # 套用特定欄位的格式和篩選
-                self._apply_special_formatting_and_filters(writer, revision_diff, branch_error, 
-                                                    lost_project, version_diffs)
+            # 即使沒有資料也建立空的頁籤
+            with ReportWriter(output_file) as writer:
+                self._add_revision_diff_sheet(
+                    writer, revision_diff,
+                    empty_columns=['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
+                                   'base_short', 'base_revision', 'compare_short', 'compare_revision']
+                )
+                self._add_branch_error_sheet(
+                    writer, branch_error,
+                    empty_columns=['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path',
+                                   'problem', 'has_wave']
+                )
+                self._add_lost_project_sheet(
+                    writer, lost_project,
+                    empty_columns=['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path']
+                )
+                self._add_version_diff_sheet(writer, version_diffs, empty_columns=VERSION_DIFF_COLUMNS)
                         
             self.logger.info(f"成功寫入比較報表: {output_file}")
             return output_file
@@ -2409,10 +2659,6 @@ class FileComparator:
                              cannot_compare_modules: List[Dict], output_dir: str) -> str:
         """寫入整合比較報表（包含所有比較結果）"""
         try:
-            import pandas as pd
-            from openpyxl.styles import PatternFill, Font
-            from openpyxl.worksheet.filters import FilterColumn, Filters
-            
             # 確保輸出目錄存在（重要修正）
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir, exist_ok=True)
@@ -2430,81 +2676,13 @@ class FileComparator:
             for i, item in enumerate(version_diff, 1):
                 item['SN'] = i
             
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # revision_diff 頁籤（只在有資料時產生）
-                if revision_diff:
-                    df = pd.DataFrame(revision_diff)
-                    # 調整欄位順序
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'base_short', 'base_revision', 'compare_short', 'compare_revision',
-                                'base_upstream', 'compare_upstream', 'base_dest-branch', 'compare_dest-branch',
-                                'base_link', 'compare_link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='revision_diff', index=False)
-                
-                # branch_error 頁籤（只在有資料時產生）
-                if branch_error:
-                    df = pd.DataFrame(branch_error)
-                    # 調整欄位順序
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'name', 'path', 
-                                'revision_short', 'revision', 'upstream', 'dest-branch', 
-                                'compare_link', 'problem', 'has_wave']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    
-                    # 將 has_wave = N 的資料排在前面
-                    df_sorted = df.sort_values('has_wave', ascending=True)
-                    df_sorted.to_excel(writer, sheet_name='branch_error', index=False)
-                
-                # lost_project 頁籤（只在有資料時產生）
-                if lost_project:
-                    df = pd.DataFrame(lost_project)
-                    # 調整欄位順序
-                    columns_order = ['SN', 'Base folder', '狀態', 'module', 'location_path', 'folder', 'name', 'path', 
-                                'upstream', 'dest-branch', 'revision', 'link']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='lost_project', index=False)
-                
-                # version_diff 頁籤
-                if version_diff:
-                    df = pd.DataFrame(version_diff)
-                    # 移除 module_path 欄位
-                    if 'module_path' in df.columns:
-                        df = df.drop('module_path', axis=1)
-                    # 移除 is_different 欄位（如果存在）
-                    if 'is_different' in df.columns:
-                        df = df.drop('is_different', axis=1)
-                    
-                    # 確保欄位順序正確
-                    columns_order = ['SN', 'module', 'location_path', 'base_folder', 'compare_folder', 'file_type', 
-                                'base_content', 'compare_content', 'org_content']
-                    
-                    # 只保留存在的欄位
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    
-                    # 重新排序欄位
-                    df = df.reindex(columns=columns_order)
-                    
-                    df.to_excel(writer, sheet_name='version_diff', index=False)
-                
-                # 無法比對頁籤（只在有資料時產生）
-                if cannot_compare_modules:
-                    df = pd.DataFrame(cannot_compare_modules)
-                    columns_order = ['SN', 'module', 'location_path', 'folder_count', 'folders', 'path', 'reason']
-                    columns_order = [col for col in columns_order if col in df.columns]
-                    df = df[columns_order]
-                    df.to_excel(writer, sheet_name='無法比對', index=False)
-                
-                # 先格式化所有工作表（基本格式）
-                for sheet_name in writer.sheets:
-                    worksheet = writer.sheets[sheet_name]
-                    self.excel_handler._format_worksheet(worksheet)
-                
-                # 套用特定欄位的格式和篩選
-                self._apply_special_formatting_and_filters(writer, revision_diff, branch_error, 
-                                                       lost_project, version_diff)
+            # 各頁籤只在有資料時產生
+            with ReportWriter(output_file) as writer:
+                self._add_revision_diff_sheet(writer, revision_diff)
+                self._add_branch_error_sheet(writer, branch_error)
+                self._add_lost_project_sheet(writer, lost_project)
+                self._add_version_diff_sheet(writer, version_diff)
+                self._add_cannot_compare_sheet(writer, cannot_compare_modules)
                         
             self.logger.info(f"成功寫入整合報表: {output_file}")
             return output_file
@@ -2524,6 +2702,8 @@ class FileComparator:
             包含所有 mapping table 的字典
         """
         mapping_tables = {}
+        # 各類型目前採用的檔名（DataFrame 為快取的共用物件，不記錄在 attrs）
+        source_files = {}
         
         try:
             import glob
@@ -2553,8 +2733,10 @@ class FileComparator:
                                 found_files.add(file_path)
                                 
                                 try:
-                                    # 讀取 Excel 檔案
-                                    df = pd.read_excel(file_path)
+                                    # 讀取 Excel 檔案（檔案未改變時使用快取的解析結果）
+                                    df = parse_cache.get_or_load(
+                                        file_path, 'mapping', functools.partial(self._read_mapping_table, file_path)
+                                    )
                                     
                                     self.logger.info(f"成功讀取 mapping table: {file}")
                                     self.logger.info(f"  欄位: {df.columns.tolist()}")
@@ -2579,15 +2761,15 @@ class FileComparator:
                                     
                                     # 如果同類型已存在，根據檔名長度決定優先級（更具體的優先）
                                     if mapping_type in mapping_tables:
-                                        existing_file_length = len(mapping_tables[mapping_type].attrs.get('source_file', ''))
+                                        existing_file_length = len(source_files.get(mapping_type, ''))
                                         new_file_length = len(file)
                                         if new_file_length > existing_file_length:
                                             mapping_tables[mapping_type] = df
-                                            df.attrs['source_file'] = file
+                                            source_files[mapping_type] = file
                                             self.logger.info(f"覆蓋 mapping table 類型 {mapping_type}: {file}")
                                     else:
                                         mapping_tables[mapping_type] = df
-                                        df.attrs['source_file'] = file
+                                        source_files[mapping_type] = file
                                         self.logger.info(f"載入 mapping table: {file} (類型: {mapping_type})")
                                     
                                 except Exception as e:
@@ -2598,6 +2780,50 @@ class FileComparator:
             
         return mapping_tables
     
+    def _read_mapping_table(self, file_path: str) -> pd.DataFrame:
+        """
+        讀取 mapping table，欄位名稱與每一列所屬的比對情境在讀取時解析一次
+        （記錄在 attrs 的 mapping_columns / row_scenarios）
+        """
+        df = pd.read_excel(file_path)
+        columns = self._resolve_mapping_columns(df)
+        df.attrs['mapping_columns'] = columns
+        df.attrs['row_scenarios'] = tuple(self._mapping_row_scenarios(df, columns))
+        return df
+    
+    @staticmethod
+    def _resolve_mapping_columns(mapping_df: pd.DataFrame) -> Dict[str, str]:
+        """找出 mapping table 實際存在的欄位名稱 {欄位種類: 欄位名稱}"""
+        actual_columns = {}
+        for key, possible_names in MAPPING_COLUMN_ALIASES.items():
+            for name in possible_names:
+                if name in mapping_df.columns:
+                    actual_columns[key] = name
+                    break
+        return actual_columns
+    
+    @staticmethod
+    def _mapping_row_scenarios(mapping_df: pd.DataFrame, columns: Dict[str, str]) -> List[Optional[str]]:
+        """
+        計算每一列所屬的比對情境（向量運算，三個情境一次完成）
+        
+        Returns:
+            與資料列順序相同的情境名稱列表，不符合任何情境為 None
+        """
+        def normalized(key):
+            if key not in columns:
+                return pd.Series('', index=mapping_df.index)
+            return mapping_df[columns[key]].astype(str).str.lower().str.strip()
+        
+        scenario_by_pair = {
+            f'{db_type}\t{compare_db_type}': scenario
+            for scenario, pairs in SCENARIO_DB_TYPE_PAIRS.items()
+            for db_type, compare_db_type in pairs
+        }
+        pair_keys = normalized('db_type') + '\t' + normalized('compare_db_type')
+        scenarios = pair_keys.map(scenario_by_pair)
+        return [scenario if isinstance(scenario, str) else None for scenario in scenarios.tolist()]
+    
     def _find_comparison_pairs_from_mapping(self, mapping_df: pd.DataFrame, source_dir: str, scenario: str) -> List[Dict[str, Any]]:
         """
         根據 mapping table 找出需要比對的檔案對
@@ -2605,63 +2831,54 @@ class FileComparator:
         comparison_pairs = []
         
         try:
-            # 預期的欄位名稱（不區分大小寫）- 擴充欄位
-            expected_columns = {
-                'db_type': ['DB_Type', 'db_type', 'Type', 'type'],
-                'db_info': ['DB_Info', 'db_info', 'Info', 'info', 'Module', 'module'],
-                'db_folder': ['DB_Folder', 'db_folder', 'Folder', 'folder'],
-                'sftp_path': ['SftpPath', 'sftp_path', 'Path', 'path', 'LocalPath', 'local_path'],
-                'compare_db_type': ['compare_DB_Type', 'compare_db_type', 'Compare_Type', 'compare_type'],
-                'compare_db_info': ['compare_DB_Info', 'compare_db_info', 'Compare_Info', 'compare_info'],
-                'compare_db_folder': ['compare_DB_Folder', 'compare_db_folder', 'Compare_Folder', 'compare_folder'],
-                'compare_sftp_path': ['compare_SftpPath', 'compare_sftp_path', 'Compare_Path', 'compare_path'],
-                'module': ['Module', 'module', 'ModuleName', 'module_name']
-            }
-            
-            # 找出實際存在的欄位名稱
-            actual_columns = {}
-            for key, possible_names in expected_columns.items():
-                for name in possible_names:
-                    if name in mapping_df.columns:
-                        actual_columns[key] = name
-                        break
+            # 欄位名稱與各列情境在讀取 mapping table 時已解析
+            actual_columns = mapping_df.attrs.get('mapping_columns')
+            if actual_columns is None:
+                actual_columns = self._resolve_mapping_columns(mapping_df)
+            row_scenarios = mapping_df.attrs.get('row_scenarios')
+            if row_scenarios is None or len(row_scenarios) != len(mapping_df):
+                row_scenarios = self._mapping_row_scenarios(mapping_df, actual_columns)
             
             self.logger.info(f"找到的 mapping 欄位: {actual_columns}")
             self.logger.info(f"正在處理情境: {scenario}")
             
-            # 遍歷每一行
-            for idx, row in mapping_df.iterrows():
+            # 符合情境的資料列
+            labels = pd.Series(row_scenarios, dtype=object)
+            mask = labels.notna() if scenario == 'all' else labels.eq(scenario)
+            positions = mask.to_numpy().nonzero()[0]
+            self.logger.info(f"符合情境 {scenario} 的 mapping 資料列: {len(positions)}/{len(mapping_df)}")
+            
+            # 只取出需要的欄位（欄位不存在時為空字串）
+            values = {}
+            for key in MAPPING_COLUMN_ALIASES:
+                if key in actual_columns:
+                    column_values = mapping_df[actual_columns[key]].tolist()
+                    values[key] = [column_values[pos] for pos in positions]
+                else:
+                    values[key] = [''] * len(positions)
+            index_labels = mapping_df.index[positions].tolist()
+            
+            for i, idx in enumerate(index_labels):
                 try:
                     # 取得基礎資訊
-                    db_type = row.get(actual_columns.get('db_type', ''), '')
-                    db_info = row.get(actual_columns.get('db_info', ''), '')
-                    db_folder = row.get(actual_columns.get('db_folder', ''), '')
-                    sftp_path = row.get(actual_columns.get('sftp_path', ''), '')
-                    module_name = row.get(actual_columns.get('module', ''), '')
+                    db_type = values['db_type'][i]
+                    db_info = values['db_info'][i]
+                    db_folder = values['db_folder'][i]
+                    sftp_path = values['sftp_path'][i]
+                    module_name = values['module'][i]
                     
                     # 取得比對資訊
-                    compare_db_type = row.get(actual_columns.get('compare_db_type', ''), '')
-                    compare_db_info = row.get(actual_columns.get('compare_db_info', ''), '')
-                    compare_db_folder = row.get(actual_columns.get('compare_db_folder', ''), '')
-                    compare_sftp_path = row.get(actual_columns.get('compare_sftp_path', ''), '')
-                    
-                    self.logger.info(f"行 {idx}: DB_Type='{db_type}', compare_DB_Type='{compare_db_type}'")
-                    self.logger.info(f"行 {idx}: DB_Info='{db_info}', DB_Folder='{db_folder}'")
-                    self.logger.info(f"行 {idx}: compare_DB_Info='{compare_db_info}', compare_DB_Folder='{compare_db_folder}'")
-                    
-                    # 檢查是否符合當前情境
-                    if not self._match_scenario(db_type, compare_db_type, scenario):
-                        self.logger.info(f"行 {idx}: 不符合情境 {scenario}，跳過")
-                        continue
-                    
-                    self.logger.info(f"行 {idx}: 符合情境 {scenario}，開始尋找本地路徑")
+                    compare_db_type = values['compare_db_type'][i]
+                    compare_db_info = values['compare_db_info'][i]
+                    compare_db_folder = values['compare_db_folder'][i]
+                    compare_sftp_path = values['compare_sftp_path'][i]
                     
                     # 在 source_dir 中尋找對應的本地路徑
                     base_local_path = self._find_local_path(source_dir, sftp_path, db_info, db_folder)
                     compare_local_path = self._find_local_path(source_dir, compare_sftp_path, compare_db_info, compare_db_folder)
                     
-                    self.logger.info(f"行 {idx}: base_local_path = {base_local_path}")
-                    self.logger.info(f"行 {idx}: compare_local_path = {compare_local_path}")
+                    self.logger.debug(f"行 {idx}: {db_type}/{db_info}/{db_folder} -> {base_local_path}, "
+                                      f"{compare_db_type}/{compare_db_info}/{compare_db_folder} -> {compare_local_path}")
                     
                     if base_local_path and compare_local_path:
                         # 使用 module_name 或從路徑提取
@@ -2685,7 +2902,6 @@ class FileComparator:
                             'db_type': db_type,
                             'compare_db_type': compare_db_type
                         })
-                        self.logger.info(f"成功建立比對對: {module_name} - {db_info} vs {compare_db_info}")
                     else:
                         self.logger.warning(f"行 {idx}: 無法找到完整的路徑對 - Base: {base_local_path}, Compare: {compare_local_path}")
                         
@@ -2705,79 +2921,55 @@ class FileComparator:
         db_type = str(db_type).lower().strip()
         compare_db_type = str(compare_db_type).lower().strip()
         
-        scenario_map = {
-            'master_vs_premp': [
-                ('master', 'premp'),
-                ('main', 'premp'),
-                ('release', 'premp')
-            ],
-            'premp_vs_wave': [
-                ('premp', 'wave'),
-                ('premp', 'mp'),
-                ('pre-mp', 'wave'),
-                ('pre-mp', 'mp')
-            ],
-            'wave_vs_backup': [
-                ('wave', 'backup'),
-                ('wave', 'wavebackup'),
-                ('wave', 'wave.backup'),
-                ('mp', 'mpbackup'),
-                ('mp', 'mp.backup')
-            ]
-        }
-        
         if scenario == 'all':
             # 檢查所有情境
-            for scenario_pairs in scenario_map.values():
-                for valid_pair in scenario_pairs:
-                    if (db_type == valid_pair[0] and compare_db_type == valid_pair[1]):
-                        return True
-        elif scenario in scenario_map:
-            # 檢查特定情境
-            for valid_pair in scenario_map[scenario]:
-                if (db_type == valid_pair[0] and compare_db_type == valid_pair[1]):
-                    return True
-                    
-        return False
+            return any((db_type, compare_db_type) in pairs for pairs in SCENARIO_DB_TYPE_PAIRS.values())
+        
+        return (db_type, compare_db_type) in SCENARIO_DB_TYPE_PAIRS.get(scenario, [])
+    
+    def _get_directory_index(self, source_dir: str) -> DirectoryIndex:
+        """取得來源目錄的索引（同一次比對中只建立一次）"""
+        index = self._directory_indexes.get(source_dir)
+        if index is None:
+            index = DirectoryIndex(source_dir)
+            self._directory_indexes[source_dir] = index
+            self.logger.info(f"建立目錄索引: {source_dir} ({len(index.entries)} 個資料夾，"
+                             f"{len(index.target_entries)} 個包含目標檔案)")
+        return index
     
     def _find_local_path(self, source_dir: str, sftp_path: str, db_info: str, db_folder: str = None) -> Optional[str]:
         """
         根據 SFTP 路徑、DB 資訊和 DB Folder 找出本地路徑
         """
         try:
+            # 只需檢查包含目標檔案的資料夾（順序與 os.walk 相同）
+            candidates = self._get_directory_index(source_dir).target_entries
+            
             # 策略 0: 如果有 db_folder，優先使用它來匹配
             if db_folder:
-                self.logger.info(f"嘗試使用 DB_Folder 匹配: {db_folder}")
-                for root, dirs, files in os.walk(source_dir):
-                    for dir_name in dirs:
-                        # 完全匹配 db_folder
-                        if dir_name == db_folder:
-                            dir_path = os.path.join(root, dir_name)
-                            if self._has_target_files(dir_path):
-                                self.logger.info(f"通過 DB_Folder 完全匹配找到路徑: {dir_path}")
-                                return dir_path
-                        # 部分匹配 - 檢查 db_folder 是否包含在 dir_name 中
-                        if db_folder in dir_name or dir_name in db_folder:
-                            dir_path = os.path.join(root, dir_name)
-                            if self._has_target_files(dir_path):
-                                self.logger.info(f"通過 DB_Folder 部分匹配找到路徑: {dir_path}")
-                                return dir_path
+                self.logger.debug(f"嘗試使用 DB_Folder 匹配: {db_folder}")
+                for dir_name, dir_path in candidates:
+                    # 完全匹配 db_folder
+                    if dir_name == db_folder:
+                        self.logger.debug(f"通過 DB_Folder 完全匹配找到路徑: {dir_path}")
+                        return dir_path
+                    # 部分匹配 - 檢查 db_folder 是否包含在 dir_name 中
+                    if db_folder in dir_name or dir_name in db_folder:
+                        self.logger.debug(f"通過 DB_Folder 部分匹配找到路徑: {dir_path}")
+                        return dir_path
             
             # 策略 1: 直接匹配 DB 資訊
             if db_info:
-                self.logger.info(f"嘗試使用 DB_Info 匹配: {db_info}")
-                for root, dirs, files in os.walk(source_dir):
-                    for dir_name in dirs:
-                        # 檢查目錄名稱是否包含 DB 資訊
-                        if db_info in dir_name:
-                            dir_path = os.path.join(root, dir_name)
-                            if self._has_target_files(dir_path):
-                                self.logger.info(f"通過 DB_Info 找到路徑: {dir_path}")
-                                return dir_path
+                self.logger.debug(f"嘗試使用 DB_Info 匹配: {db_info}")
+                for dir_name, dir_path in candidates:
+                    # 檢查目錄名稱是否包含 DB 資訊
+                    if db_info in dir_name:
+                        self.logger.debug(f"通過 DB_Info 找到路徑: {dir_path}")
+                        return dir_path
             
             # 策略 2: 從 SFTP 路徑提取關鍵資訊
             if sftp_path:
-                self.logger.info(f"嘗試從 SFTP 路徑匹配: {sftp_path}")
+                self.logger.debug(f"嘗試從 SFTP 路徑匹配: {sftp_path}")
                 # 處理 Windows 和 Linux 路徑分隔符
                 sftp_path = sftp_path.replace('\\', '/')
                 path_parts = sftp_path.strip('/').split('/')
@@ -2789,15 +2981,12 @@ class FileComparator:
                     # 跳過太短的部分
                     if len(path_part) < 3:
                         continue
-                        
-                    for root, dirs, files in os.walk(source_dir):
-                        for dir_name in dirs:
-                            # 檢查是否包含路徑部分
-                            if path_part in dir_name or dir_name in path_part:
-                                dir_path = os.path.join(root, dir_name)
-                                if self._has_target_files(dir_path):
-                                    self.logger.info(f"通過 SFTP 路徑部分 '{path_part}' 找到路徑: {dir_path}")
-                                    return dir_path
+                    
+                    for dir_name, dir_path in candidates:
+                        # 檢查是否包含路徑部分
+                        if path_part in dir_name or dir_name in path_part:
+                            self.logger.debug(f"通過 SFTP 路徑部分 '{path_part}' 找到路徑: {dir_path}")
+                            return dir_path
             
             self.logger.warning(f"無法找到本地路徑 - DB_Info: {db_info}, DB_Folder: {db_folder}, SFTP: {sftp_path}")
             
@@ -2818,6 +3007,11 @@ class FileComparator:
         """
         target_files = ['manifest.xml', 'version.txt', 'f_version.txt']
         
+        # 已建立索引的目錄直接使用索引結果
+        for index in self._directory_indexes.values():
+            if dir_path in index.has_targets:
+                return index.has_targets[dir_path]
+        
         try:
             files = os.listdir(dir_path)
             for file in files:
@@ -2826,4 +3020,20 @@ class FileComparator:
         except:
             pass
             
-        return False            
\ No newline at end of file
+        return False
+
+# 子程序中重複使用的比較器（每個程序只建立一次）
+_worker_comparator = None
+
+def _compare_pairs_in_worker(tasks: List[Tuple[str, Dict[str, Any]]],
+                             output_dir: str) -> List[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+    """ProcessPoolExecutor 的工作函數：依序比對多組資料夾並寫入模組報表"""
+    global _worker_comparator
+    if _worker_comparator is None:
+        _worker_comparator = FileComparator()
+    return [
+        _worker_comparator._pair_outcome(
+            functools.partial(_worker_comparator._compare_mapping_pair, pair, scenario, output_dir)
+        )
+        for scenario, pair in tasks
+    ]
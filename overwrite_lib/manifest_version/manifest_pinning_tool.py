@@ -35,6 +35,18 @@ import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import difflib
 
+# 共用的遠端目錄列表快取 / SFTP 連線池 / 版本資料夾索引（選用）
+# 只在呼叫端（例如 Web 應用程式）已可匯入時使用；本工具不修改 sys.path，
+# 避免專案根目錄的 utils / config 遮蔽 overwrite_lib 的同名模組，單獨執行時直接連線與列出目錄
+try:
+    from remote_listing_cache import listing_cache as shared_listing_cache
+    from sftp_connection_pool import connection_pool as shared_connection_pool
+    from version_index import version_index as shared_version_index
+except ImportError:
+    shared_listing_cache = None
+    shared_connection_pool = None
+    shared_version_index = None
+
 # =====================================
 # ===== 版本資訊 =====
 # =====================================
@@ -870,11 +882,21 @@ resource_manager = ResourceManager()
 class SFTPManager:
     """改進版 SFTP 管理器 - 修復 type 3 unimplemented 錯誤"""
     
-    def __init__(self):
+    def __init__(self, listing_cache=None, connection_pool=None, version_index=None):
+        """
+        Args:
+            listing_cache: 遠端目錄列表快取（預設使用可匯入的共用快取，沒有時直接列出目錄）
+            connection_pool: SFTP 連線池（預設使用可匯入的共用連線池，沒有時直接建立連線）
+            version_index: 版本資料夾索引（預設使用可匯入的共用索引，沒有時直接列出目錄）
+        """
         self.logger = setup_logger(self.__class__.__name__)
         self.config = config_manager.sftp_config
+        self.listing_cache = listing_cache or shared_listing_cache
+        self.connection_pool = connection_pool or shared_connection_pool
+        self.version_index = version_index or shared_version_index
         self.sftp = None
         self.transport = None
+        self._connection = None
         self.connected = False
         self._connection_lock = threading.Lock()
         # 快取伺服器能力
@@ -897,38 +919,29 @@ class SFTPManager:
                 # 重試連線
                 for attempt in range(self.config['retry_count']):
                     try:
-                        # 建立 Socket 連線
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        sock.settimeout(self.config['timeout'])
-                        
-                        # 設定 socket 選項避免 Garbage packet
-                        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                        
-                        # 連接到伺服器
-                        sock.connect((self.config['host'], self.config['port']))
-                        
-                        # 建立 Transport（修復 Garbage packet 的關鍵）
-                        self.transport = paramiko.Transport(sock)
-                        
-                        # 設定較保守的參數避免協議問題
-                        self.transport.set_keepalive(30)
-                        self.transport.use_compression(False)  # 關閉壓縮
-                        
-                        # 開始 SSH 握手
-                        self.transport.start_client()
-                        
-                        # 認證
-                        self.transport.auth_password(
-                            self.config['username'],
-                            self.config['password']
-                        )
-                        
-                        # 建立 SFTP 客戶端
-                        self.sftp = paramiko.SFTPClient.from_transport(self.transport)
-                        
-                        # 測試連線並檢測伺服器能力
-                        self._detect_server_capabilities()
+                        if self.connection_pool is not None:
+                            # 由連線池取得連線，沒有可用連線時才建立新的 Transport
+                            self._connection = self.connection_pool.acquire(
+                                self.config['host'], self.config['port'],
+                                self.config['username'], self.config['password'],
+                                factory=self._create_transport, profile='manifest-pinning'
+                            )
+                            self.transport = self._connection.transport
+                            self.sftp = self._connection.sftp
+                            
+                            # 檢測伺服器能力（同一條連線只檢測一次）
+                            capabilities = self._connection.server_capabilities
+                            if capabilities:
+                                self._server_capabilities = dict(capabilities)
+                            else:
+                                self._detect_server_capabilities()
+                                self._connection.server_capabilities = dict(self._server_capabilities)
+                        else:
+                            self.transport = self._create_transport()
+                            self.sftp = paramiko.SFTPClient.from_transport(self.transport)
+                            
+                            # 測試連線並檢測伺服器能力
+                            self._detect_server_capabilities()
                         
                         self.connected = True
                         resource_manager.register_sftp(self)
@@ -950,6 +963,41 @@ class SFTPManager:
                 self._cleanup_failed_connection()
                 return False
     
+    def _create_transport(self) -> paramiko.Transport:
+        """建立並認證 Transport（使用保守的 socket 與協議設定）"""
+        # 建立 Socket 連線
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.config['timeout'])
+        
+        # 設定 socket 選項避免 Garbage packet
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        
+        # 連接到伺服器
+        sock.connect((self.config['host'], self.config['port']))
+        
+        # 建立 Transport（修復 Garbage packet 的關鍵）
+        transport = paramiko.Transport(sock)
+        
+        try:
+            # 設定較保守的參數避免協議問題
+            transport.set_keepalive(30)
+            transport.use_compression(False)  # 關閉壓縮
+            
+            # 開始 SSH 握手
+            transport.start_client()
+            
+            # 認證
+            transport.auth_password(
+                self.config['username'],
+                self.config['password']
+            )
+        except Exception:
+            transport.close()
+            raise
+        
+        return transport
+    
     def _detect_server_capabilities(self):
         """檢測 SFTP 伺服器支援的功能"""
         try:
@@ -994,32 +1042,44 @@ class SFTPManager:
             }
     
     def _cleanup_failed_connection(self):
-        """清理失敗的連線"""
+        """清理失敗的連線（不放回連線池）"""
         try:
-            if self.sftp:
-                self.sftp.close()
-                self.sftp = None
-            if self.transport:
-                self.transport.close()
-                self.transport = None
+            if self._connection:
+                self.connection_pool.release(self._connection, discard=True)
+            else:
+                self._close_transport()
+            self._connection = None
+            self.sftp = None
+            self.transport = None
             self.connected = False
             self._server_capabilities['checked'] = False
         except:
             pass
     
+    def _close_transport(self):
+        """關閉自行建立的 SFTP 連線（未使用連線池時）"""
+        for resource in (self.sftp, self.transport):
+            if resource is not None:
+                try:
+                    resource.close()
+                except Exception:
+                    pass
+    
     def disconnect(self):
-        """安全斷開 SFTP 連線"""
+        """安全斷開 SFTP 連線（使用連線池時歸還至連線池）"""
         with self._connection_lock:
             try:
-                if self.sftp:
-                    self.sftp.close()
-                    self.sftp = None
-                if self.transport:
-                    self.transport.close()
-                    self.transport = None
+                if self._connection:
+                    self.connection_pool.release(self._connection)
+                    self.logger.info("SFTP 連線已歸還連線池")
+                elif self.transport:
+                    self._close_transport()
+                    self.logger.info("SFTP 連線已關閉")
+                self._connection = None
+                self.sftp = None
+                self.transport = None
                 self.connected = False
                 self._server_capabilities['checked'] = False
-                self.logger.info("SFTP 連線已關閉")
             except Exception as e:
                 self.logger.warning(f"關閉 SFTP 連線時發生錯誤: {e}")
     
@@ -1165,7 +1225,7 @@ class SFTPManager:
             # 列出目錄
             version_dirs = []
             try:
-                items = self._safe_listdir_with_details(base_path)
+                items = self._list_version_dirs(base_path)
                 
                 for item_info in items:
                     try:
@@ -1218,7 +1278,7 @@ class SFTPManager:
             # 嘗試列出目錄，如果失敗就用直接路徑方式
             matching_dirs = []
             try:
-                items = self._safe_listdir_with_details(base_path)
+                items = self._list_version_dirs(base_path)
                 
                 for item_info in items:
                     try:
@@ -1259,16 +1319,46 @@ class SFTPManager:
             self.logger.error(f"搜尋指定版本失敗: {e}")
             return None
 
+    def _list_version_dirs(self, path: str) -> list:
+        """列出版本目錄（經由版本資料夾索引，目錄 mtime 未改變時只需一次 stat）"""
+        if self.version_index is None:
+            return self._safe_listdir_with_details(path)
+        folders = self.version_index.get_folders(
+            self.config['host'], path,
+            stat_dir=lambda: self.sftp.stat(path),
+            list_dir=lambda: self._load_version_entries(path)
+        )
+        return [{'name': f.name, 'is_dir': f.is_dir, 'mtime': f.mtime} for f in folders]
+    
+    def _load_version_entries(self, path: str) -> list:
+        """重新列出版本目錄（目錄已變更，先清除列表快取）"""
+        if self.listing_cache is not None:
+            self.listing_cache.invalidate(self.config['host'], path)
+        return [
+            (item['name'], item.get('is_dir', False), item.get('mtime', 0))
+            for item in self._safe_listdir_with_details(path)
+        ]
+    
     def _safe_listdir(self, path: str) -> list:
-        """最安全的列目錄方法 - 只使用基本 listdir"""
+        """最安全的列目錄方法 - 只使用基本 listdir（經由列表快取）"""
         try:
-            return self.sftp.listdir(path)
+            return self._cached_listing(path, lambda: self.sftp.listdir(path), 'names')
         except Exception as e:
             self.logger.error(f"列出目錄失敗: {path}, 錯誤: {e}")
             raise
     
     def _safe_listdir_with_details(self, path: str) -> list:
-        """安全的列出目錄內容，根據伺服器能力選擇方法"""
+        """安全的列出目錄內容（經由列表快取，結果請勿修改）"""
+        return self._cached_listing(path, lambda: self._load_listdir_with_details(path), 'details')
+    
+    def _cached_listing(self, path: str, loader, kind: str):
+        """經由列表快取取得目錄列表，沒有列表快取時直接列出"""
+        if self.listing_cache is None:
+            return loader()
+        return self.listing_cache.get_or_load(self.config['host'], path, loader, kind=kind)
+    
+    def _load_listdir_with_details(self, path: str) -> list:
+        """列出目錄內容，根據伺服器能力選擇方法"""
         try:
             result = []
             
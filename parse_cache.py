@@ -0,0 +1,143 @@
+"""
+檔案解析結果快取模組
+以 (實際路徑, 檔案大小, mtime_ns) 為鍵快取 manifest / 文字檔的解析結果與內容雜湊，
+同一檔案在不同比對情境中（如 premp 在 master_vs_premp 與 premp_vs_wave）只需解析一次
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+# 計算雜湊時每次讀取的大小
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# 最多記錄的檔案雜湊數（每筆只有數十 bytes，不計入 max_bytes）
+MAX_DIGEST_ENTRIES = 65536
+
+class ParseCache:
+    """檔案解析結果快取類別（執行緒安全，預設以檔案大小估算記憶體用量）"""
+
+    def __init__(self, max_bytes: int = None):
+        """
+        初始化快取
+
+        Args:
+            max_bytes: 快取上限（預設 config.PARSE_CACHE_MAX_BYTES，設為 0 停用快取）
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else config.PARSE_CACHE_MAX_BYTES
+        self.logger = logger
+        self._entries = OrderedDict()  # (kind, realpath, size, mtime_ns) -> (估算大小, 內容)
+        self._total_bytes = 0
+        self._digests = OrderedDict()  # (realpath, size, mtime_ns) -> sha256
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def file_identity(file_path: str) -> Tuple[str, int, int]:
+        """取得檔案識別 (realpath, size, mtime_ns)，檔案內容改變時識別也會改變"""
+        real_path = os.path.realpath(file_path)
+        st = os.stat(real_path)
+        return real_path, st.st_size, st.st_mtime_ns
+
+    def get_or_load(self, file_path: str, kind: str, loader: Callable[[], Any],
+                    cost: Callable[[Any], int] = None) -> Any:
+        """
+        取得檔案的解析結果，未命中時呼叫 loader 解析並寫入快取
+
+        Args:
+            file_path: 檔案路徑
+            kind: 解析種類（如 manifest / text），同一檔案的不同解析結果分開快取
+            loader: 解析函數，拋出的例外會直接往上傳遞且不寫入快取
+            cost: 由解析結果計算記憶體用量的函數（解析結果遠大於檔案時使用，例如壓縮的 xlsx 轉成 DataFrame；
+                  預設為檔案大小）
+
+        Returns:
+            解析結果（共用物件，請勿修改）
+        """
+        if self.max_bytes <= 0:
+            return loader()
+
+        real_path, size, mtime_ns = self.file_identity(file_path)
+        key = (kind, real_path, size, mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        value = loader()
+
+        # 比上限還大的解析結果不快取
+        entry_cost = max(cost(value) if cost else size, 1)
+        if entry_cost > self.max_bytes:
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (entry_cost, value)
+                self._total_bytes += entry_cost
+            while self._total_bytes > self.max_bytes:
+                _, (evicted_cost, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_cost
+
+        return value
+
+    def file_digest(self, file_path: str) -> str:
+        """
+        取得檔案內容的 sha256（串流讀取，檔案未改變時直接使用記錄的結果）
+
+        Args:
+            file_path: 檔案路徑
+
+        Returns:
+            十六進位雜湊字串
+        """
+        identity = self.file_identity(file_path)
+
+        with self._lock:
+            digest = self._digests.get(identity)
+            if digest is not None:
+                self._digests.move_to_end(identity)
+                return digest
+
+        sha = hashlib.sha256()
+        with open(identity[0], 'rb') as f:
+            for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            self._digests[identity] = digest
+            while len(self._digests) > MAX_DIGEST_ENTRIES:
+                self._digests.popitem(last=False)
+
+        return digest
+
+    def clear(self) -> None:
+        """清除全部快取"""
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得快取統計"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+# 全域快取實例
+parse_cache = ParseCache()
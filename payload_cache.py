@@ -0,0 +1,101 @@
+"""
+API 回應快取模組
+以 (來源檔案識別, 參數) 為鍵快取已序列化並以 gzip 壓縮的 JSON 回應，
+來源檔案未改變時直接回傳壓縮後的位元組，不必重新讀取 Excel 與轉換資料
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+# gzip 壓縮等級（JSON 文字重複性高，中等壓縮即可得到大部分效果）
+GZIP_LEVEL = 6
+
+class PayloadCache:
+    """API 回應快取類別（執行緒安全，以壓縮後大小計算上限，LRU 淘汰）"""
+
+    def __init__(self, max_bytes: int = None):
+        """
+        初始化快取
+
+        Args:
+            max_bytes: 快取上限（預設 config.PAYLOAD_CACHE_MAX_BYTES，設為 0 停用快取）
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else config.PAYLOAD_CACHE_MAX_BYTES
+        self.logger = logger
+        self._entries = OrderedDict()  # key -> gzip 壓縮的內容
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def compress(data: bytes) -> bytes:
+        """以 gzip 壓縮（mtime 固定為 0，相同內容得到相同結果）"""
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """取得快取的壓縮內容，未命中時回傳 None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        """寫入壓縮內容（比上限還大的內容不快取）"""
+        if self.max_bytes <= 0 or len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old)
+            self._entries[key] = value
+            self._total_bytes += len(value)
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], bytes]) -> bytes:
+        """
+        取得快取的壓縮內容，未命中時呼叫 builder 產生未壓縮的內容，壓縮後寫入快取
+
+        Args:
+            key: 快取鍵（應包含來源檔案的識別，檔案改變時鍵也會改變）
+            builder: 產生未壓縮內容（bytes）的函數，拋出的例外會直接往上傳遞且不寫入快取
+
+        Returns:
+            gzip 壓縮的內容
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = self.compress(builder())
+        self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """清除全部快取"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得快取統計"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+# 全域快取實例
+payload_cache = PayloadCache()
@@ -0,0 +1,307 @@
+"""
+樞紐分析查詢模組
+在伺服器端以 pandas 對比對結果做篩選、排序、分頁與分組彙總，
+大型工作表不必把所有資料列傳到瀏覽器再由 pivotUI 計算
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence
+import pandas as pd
+import utils
+import config
+from parse_cache import parse_cache
+from result_sidecar import result_sidecar
+
+logger = utils.setup_logger(__name__)
+
+# 支援的彙總方式（名稱與 pivotUI 的 aggregatorName 相同）
+AGGREGATORS = ('Count', 'Count Unique Values', 'Sum', 'Integer Sum', 'Average', 'Minimum', 'Maximum')
+
+# 數值彙總對應的 pandas 函數（無法轉為數字的值略過，與 pivotUI 相同）
+NUMERIC_AGGREGATIONS = {
+    'Sum': 'sum',
+    'Integer Sum': 'sum',
+    'Average': 'mean',
+    'Minimum': 'min',
+    'Maximum': 'max'
+}
+
+# 單頁最多資料列
+MAX_PAGE_SIZE = 1000
+
+# 分組彙總最多回傳的列 / 欄鍵數（總計仍以全部資料計算）
+MAX_AGGREGATE_KEYS = 1000
+
+# 篩選器列出的欄位值上限（與 results.js generateFilters 相同：少於 50 個不同值的欄位）
+MAX_FACET_VALUES = 50
+
+class PivotQuery:
+    """樞紐分析查詢類別"""
+
+    def __init__(self):
+        self.logger = logger
+
+    @staticmethod
+    def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """處理 NaN 與日期，轉為可序列化的值（與樞紐分析 API 傳給瀏覽器的資料相同）"""
+        df = df.fillna('')
+        for col in df.columns:
+            if df[col].dtype == 'datetime64[ns]':
+                df[col] = df[col].astype(str)
+            elif df[col].dtype == 'object':
+                df[col] = df[col].apply(lambda x: str(x) if pd.notna(x) else '')
+        return df
+
+    def load_sheets(self, report_path: str) -> Dict[str, pd.DataFrame]:
+        """
+        讀取報表的所有工作表（優先使用欄式副本，報表未改變時使用快取）
+
+        Returns:
+            {工作表名稱: DataFrame}（共用物件，請勿修改）
+        """
+        return parse_cache.get_or_load(report_path, 'pivot-sheets', lambda: self._read_sheets(report_path),
+                                       cost=self.sheets_memory)
+
+    @staticmethod
+    def sheets_memory(sheets: Dict[str, pd.DataFrame]) -> int:
+        """工作表實際佔用的記憶體（xlsx 為壓縮格式，DataFrame 通常是檔案大小的數倍）"""
+        return int(sum(df.memory_usage(deep=True).sum() for df in sheets.values()))
+
+    def _read_sheets(self, report_path: str) -> Dict[str, pd.DataFrame]:
+        self.logger.info(f'讀取樞紐分析資料: {report_path}')
+        excel_data = result_sidecar.read_excel(report_path)
+        return {sheet_name: self.normalize_frame(df) for sheet_name, df in excel_data.items()}
+
+    def get_sheet(self, report_path: str, sheet_name: str) -> pd.DataFrame:
+        """取得單一工作表，不存在時拋出 ValueError"""
+        sheets = self.load_sheets(report_path)
+        if sheet_name not in sheets:
+            raise ValueError(f'找不到資料表：{sheet_name}')
+        return sheets[sheet_name]
+
+    @staticmethod
+    def text_values(series: pd.Series) -> pd.Series:
+        """欄位值轉為字串（與瀏覽器端 String(value) 相同，如 1.0 轉為 '1'）"""
+        if pd.api.types.is_bool_dtype(series):
+            return series.map({True: 'true', False: 'false'})
+        if pd.api.types.is_float_dtype(series):
+            return series.map(lambda v: '' if v != v else (str(int(v)) if float(v).is_integer() else repr(float(v))))
+        return series.astype(str)
+
+    @staticmethod
+    def parse_json_arg(value: Optional[str], default: Any) -> Any:
+        """解析查詢參數中的 JSON（如 filters），空白時回傳預設值，格式錯誤時拋出 ValueError"""
+        if not value:
+            return default
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise ValueError(f'參數格式錯誤：{value}')
+
+    def _check_columns(self, df: pd.DataFrame, columns: Sequence[str]) -> None:
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise ValueError(f'找不到欄位：{", ".join(map(str, missing))}')
+
+    def filter_frame(self, df: pd.DataFrame, filters: Dict[str, List[Any]] = None,
+                     exclusions: Dict[str, List[Any]] = None, search: str = None) -> pd.DataFrame:
+        """
+        篩選資料列
+
+        Args:
+            df: 工作表資料
+            filters: 只保留這些值 {欄位: [值]}（與頁面篩選器相同）
+            exclusions: 排除這些值 {欄位: [值]}（與 pivotUI 設定的 exclusions 相同）
+            search: 任一欄位包含此文字（不分大小寫）
+
+        Returns:
+            篩選後的資料（沒有任何條件時回傳原物件）
+        """
+        filters = filters or {}
+        exclusions = exclusions or {}
+        self._check_columns(df, list(filters) + list(exclusions))
+        if not filters and not exclusions and not search:
+            return df
+
+        mask = pd.Series(True, index=df.index)
+        for column, values in filters.items():
+            mask &= self.text_values(df[column]).isin([str(v) for v in values])
+        for column, values in exclusions.items():
+            mask &= ~self.text_values(df[column]).isin([str(v) for v in values])
+        if search:
+            term = str(search).lower()
+            matched = pd.Series(False, index=df.index)
+            for column in df.columns:
+                matched |= self.text_values(df[column]).str.lower().str.contains(term, regex=False)
+            mask &= matched
+        return df[mask]
+
+    def sort_frame(self, df: pd.DataFrame, column: str, order: str = 'asc') -> pd.DataFrame:
+        """依欄位排序（數字欄依數值，其餘依不分大小寫的文字，相同值保持原順序）"""
+        self._check_columns(df, [column])
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            key = series
+        else:
+            key = self.text_values(series).str.lower()
+        positions = key.reset_index(drop=True).sort_values(ascending=(order != 'desc'), kind='stable').index
+        return df.iloc[positions]
+
+    def page_rows(self, report_path: str, sheet_name: str, page: int = 1, page_size: int = None,
+                  sort: str = None, order: str = 'asc', filters: Dict[str, List[Any]] = None,
+                  exclusions: Dict[str, List[Any]] = None, search: str = None) -> Dict[str, Any]:
+        """
+        取得一頁資料列（先篩選、再排序、再分頁）
+
+        Returns:
+            {'sheet', 'columns', 'total', 'filtered', 'page', 'page_size', 'pages', 'rows'}
+        """
+        df = self.get_sheet(report_path, sheet_name)
+        page_size = min(max(int(page_size or config.PIVOT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+        filtered = self.filter_frame(df, filters, exclusions, search)
+        if sort:
+            filtered = self.sort_frame(filtered, sort, order)
+
+        pages = max((len(filtered) + page_size - 1) // page_size, 1)
+        page = min(max(int(page or 1), 1), pages)
+        start = (page - 1) * page_size
+
+        return {
+            'sheet': sheet_name,
+            'columns': df.columns.tolist(),
+            'total': len(df),
+            'filtered': len(filtered),
+            'page': page,
+            'page_size': page_size,
+            'pages': pages,
+            'rows': filtered.iloc[start:start + page_size].to_dict('records')
+        }
+
+    def _aggregate(self, df: pd.DataFrame, keys: List[str], text: pd.DataFrame,
+                   aggregator: str, values: Optional[pd.Series]):
+        """依 keys 分組彙總（keys 為空時回傳單一值）"""
+        if aggregator == 'Count':
+            if not keys:
+                return len(df)
+            return text.groupby(keys, sort=True).size()
+
+        if not keys:
+            if aggregator == 'Count Unique Values':
+                return int(values.nunique())
+            return values.agg(NUMERIC_AGGREGATIONS[aggregator])
+
+        grouped = values.groupby([text[key] for key in keys], sort=True)
+        if aggregator == 'Count Unique Values':
+            return grouped.nunique()
+        return grouped.agg(NUMERIC_AGGREGATIONS[aggregator])
+
+    @staticmethod
+    def _native(value: Any) -> Any:
+        """轉為可 JSON 序列化的值（NaN 轉為 None）"""
+        if value is None:
+            return None
+        if hasattr(value, 'item'):
+            value = value.item()
+        if isinstance(value, float) and value != value:
+            return None
+        return value
+
+    def aggregate(self, report_path: str, sheet_name: str, rows: Sequence[str] = (), cols: Sequence[str] = (),
+                  aggregator: str = 'Count', vals: Sequence[str] = (), filters: Dict[str, List[Any]] = None,
+                  exclusions: Dict[str, List[Any]] = None) -> Dict[str, Any]:
+        """
+        分組彙總（rows / cols / vals / aggregator / exclusions 與 pivotUI 設定相同）
+
+        Returns:
+            {'rows', 'cols', 'aggregator', 'row_keys', 'col_keys',
+             'cells': [[列索引, 欄索引, 值]], 'row_totals', 'col_totals', 'total',
+             'total_rows', 'filtered', 'truncated'}
+        """
+        rows, cols, vals = list(rows or []), list(cols or []), list(vals or [])
+        if aggregator not in AGGREGATORS:
+            raise ValueError(f'不支援的彙總方式：{aggregator}')
+        if aggregator != 'Count' and not vals:
+            raise ValueError(f'彙總方式 {aggregator} 需要指定數值欄位')
+
+        df = self.get_sheet(report_path, sheet_name)
+        self._check_columns(df, rows + cols + vals[:1])
+        filtered = self.filter_frame(df, filters, exclusions)
+
+        # 分組鍵與 pivotUI 相同一律以字串比較
+        text = pd.DataFrame({key: self.text_values(filtered[key]) for key in dict.fromkeys(rows + cols)},
+                            index=filtered.index)
+        values = None
+        if aggregator == 'Count Unique Values':
+            values = self.text_values(filtered[vals[0]])
+        elif aggregator != 'Count':
+            values = pd.to_numeric(filtered[vals[0]], errors='coerce')
+            if aggregator == 'Integer Sum':
+                values = values.apply(lambda v: int(v) if v == v else v)
+
+        cells_series = self._aggregate(filtered, rows + cols, text, aggregator, values)
+        row_series = self._aggregate(filtered, rows, text, aggregator, values)
+        col_series = self._aggregate(filtered, cols, text, aggregator, values)
+        total = self._aggregate(filtered, [], text, aggregator, values)
+
+        def series_keys(series, count):
+            if not count:
+                return [[]]
+            return [list(key) if isinstance(key, tuple) else [key] for key in series.index]
+
+        row_keys = series_keys(row_series, len(rows))
+        col_keys = series_keys(col_series, len(cols))
+        truncated = len(row_keys) > MAX_AGGREGATE_KEYS or len(col_keys) > MAX_AGGREGATE_KEYS
+        row_keys, col_keys = row_keys[:MAX_AGGREGATE_KEYS], col_keys[:MAX_AGGREGATE_KEYS]
+
+        row_index = {tuple(key): i for i, key in enumerate(row_keys)}
+        col_index = {tuple(key): i for i, key in enumerate(col_keys)}
+
+        cells = []
+        if rows or cols:
+            for key, value in cells_series.items():
+                key = key if isinstance(key, tuple) else (key,)
+                r, c = row_index.get(key[:len(rows)]), col_index.get(key[len(rows):])
+                if r is not None and c is not None:
+                    cells.append([r, c, self._native(value)])
+        else:
+            cells.append([0, 0, self._native(total)])
+
+        return {
+            'sheet': sheet_name,
+            'rows': rows,
+            'cols': cols,
+            'aggregator': aggregator,
+            'row_keys': row_keys,
+            'col_keys': col_keys,
+            'cells': cells,
+            'row_totals': [self._native(v) for v in row_series.tolist()][:MAX_AGGREGATE_KEYS] if rows else [self._native(total)],
+            'col_totals': [self._native(v) for v in col_series.tolist()][:MAX_AGGREGATE_KEYS] if cols else [self._native(total)],
+            'total': self._native(total),
+            'total_rows': len(df),
+            'filtered': len(filtered),
+            'truncated': truncated
+        }
+
+    def describe(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        工作表概要（伺服器端分頁的工作表以此產生統計卡片與篩選器）
+
+        Returns:
+            {'total': 筆數,
+             'distinct': {欄位: 不同值個數（不含空白）},
+             'facets': {欄位: [[值, 筆數]]}（只列出少於 MAX_FACET_VALUES 個不同值的欄位，依第一次出現的順序）}
+        """
+        distinct = {}
+        facets = {}
+        for column in df.columns:
+            text = self.text_values(df[column])
+            distinct[column] = int(text[text != ''].nunique())
+            uniques = df[column].drop_duplicates()
+            if 0 < len(uniques) < MAX_FACET_VALUES:
+                counts = text.value_counts()
+                facets[column] = [[self._native(value), int(counts[key])]
+                                  for value, key in zip(uniques.tolist(), self.text_values(uniques).tolist())]
+        return {'total': len(df), 'distinct': distinct, 'facets': facets}
+
+# 全域查詢實例
+pivot_query = PivotQuery()
@@ -0,0 +1,155 @@
+"""
+遠端目錄列表快取模組
+以 (host, path) 為鍵快取 SFTP listdir / listdir_attr 結果，供所有 SFTP 程式路徑共用
+支援 TTL 過期、LRU 容量上限與明確失效
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+class RemoteListingCache:
+    """遠端目錄列表快取類別（執行緒安全）"""
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        """
+        初始化快取
+
+        Args:
+            ttl: 快取存活秒數（預設 config.SFTP_LISTING_CACHE_TTL）
+            max_entries: 最大快取項目數（預設 config.SFTP_LISTING_CACHE_MAX_ENTRIES）
+        """
+        self.ttl = ttl if ttl is not None else config.SFTP_LISTING_CACHE_TTL
+        self.max_entries = max_entries or config.SFTP_LISTING_CACHE_MAX_ENTRIES
+        self.logger = logger
+        self._entries = OrderedDict()  # (host, path, kind) -> (過期時間, 內容)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        """統一路徑格式（移除結尾斜線）"""
+        return path.rstrip('/') or '/'
+
+    def get(self, host: str, path: str, kind: str = 'attr') -> Optional[Any]:
+        """
+        取得快取內容
+
+        Args:
+            host: SFTP 伺服器位址
+            path: 遠端目錄路徑
+            kind: 快取內容種類（attr / names / details）
+
+        Returns:
+            快取內容，不存在或已過期則回傳 None
+        """
+        key = (host, self._normalize_path(path), kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, host: str, path: str, value: Any, kind: str = 'attr') -> None:
+        """寫入快取，超過容量時淘汰最久未使用的項目"""
+        if self.ttl <= 0:
+            return
+
+        key = (host, self._normalize_path(path), kind)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, host: str, path: str, loader: Callable[[], Any], kind: str = 'attr') -> Any:
+        """
+        取得快取內容，未命中時呼叫 loader 載入並寫入快取
+
+        loader 拋出的例外會直接往上傳遞，且不會寫入快取
+        """
+        value = self.get(host, path, kind)
+        if value is None:
+            value = loader()
+            self.put(host, path, value, kind)
+        return value
+
+    def invalidate(self, host: str = None, path: str = None) -> int:
+        """
+        使快取失效
+
+        Args:
+            host: 只清除此伺服器的項目（None 表示全部）
+            path: 只清除此路徑（含其子路徑）的項目（None 表示全部）
+
+        Returns:
+            清除的項目數
+        """
+        prefix = self._normalize_path(path) if path else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (host is None or key[0] == host)
+                and (prefix is None or key[1] == prefix or key[1].startswith(prefix.rstrip('/') + '/'))
+            ]
+            for key in keys:
+                del self._entries[key]
+
+        if keys:
+            self.logger.debug(f"清除遠端目錄快取 {len(keys)} 筆: host={host}, path={path}")
+        return len(keys)
+
+    def clear(self) -> None:
+        """清除全部快取"""
+        self.invalidate()
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得快取統計"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+# 全域快取實例
+listing_cache = RemoteListingCache()
+
+def cached_listdir_attr(sftp, host: str, path: str) -> List[Any]:
+    """
+    透過快取取得 sftp.listdir_attr 結果
+
+    Args:
+        sftp: paramiko SFTPClient
+        host: SFTP 伺服器位址（快取鍵）
+        path: 遠端目錄路徑
+
+    Returns:
+        SFTPAttributes 列表（共用物件，請勿修改）
+    """
+    return listing_cache.get_or_load(host, path, lambda: sftp.listdir_attr(path), kind='attr')
+
+def cached_listdir(sftp, host: str, path: str) -> List[str]:
+    """
+    透過快取取得 sftp.listdir 結果
+    若已有 listdir_attr 快取則直接由其取出檔名
+    """
+    attrs = listing_cache.get(host, path, kind='attr')
+    if attrs is not None:
+        return [item.filename for item in attrs]
+    return listing_cache.get_or_load(host, path, lambda: sftp.listdir(path), kind='names')
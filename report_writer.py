@@ -0,0 +1,182 @@
+"""
+串流 Excel 報表寫入模組
+以 openpyxl write-only 模式逐列寫入比對報表：標題、欄位格式與篩選條件在寫入前宣告一次，
+欄寬在寫入前由資料計算，不需要寫完後重新開啟工作表逐格設定格式，大型報表的時間與記憶體用量都低很多
+"""
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.filters import FilterColumn, Filters
+import utils
+from result_sidecar import result_sidecar
+
+logger = utils.setup_logger(__name__)
+
+# 標題列格式（與 ExcelHandler._format_worksheet 相同，框線與 pandas to_excel 的標題相同）
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(color="FFFFFF", bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+_THIN = Side(style='thin')
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+# 重點欄位標題（深紅底白字）
+HIGHLIGHT_HEADER_FILL = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
+
+RED_FONT = Font(color="FF0000")
+BLUE_FONT = Font(color="0000FF")
+
+# 自動欄寬上限
+MAX_COLUMN_WIDTH = 100
+
+# 單一儲存格格式：{'value': 取代的值, 'font': Font, 'fill': PatternFill, 'alignment': Alignment}
+CellStyle = Dict[str, Any]
+
+class ReportWriter:
+    """串流 Excel 報表寫入類別（openpyxl write-only 活頁簿）"""
+
+    def __init__(self, output_file: str):
+        """
+        初始化寫入器
+
+        Args:
+            output_file: 輸出的 Excel 檔案路徑（save 時寫入）
+        """
+        self.output_file = output_file
+        self.logger = logger
+        self.workbook = Workbook(write_only=True)
+        self.sheet_names = []
+        # 已寫入的工作表資料（save 後寫成欄式副本）
+        self.sheets = []
+        self.summary = None
+
+    def add_sheet(self, title: str, columns: Sequence[str], records: Sequence[Dict[str, Any]],
+                  highlight_headers: Iterable[str] = (),
+                  column_styles: Dict[str, CellStyle] = None,
+                  cell_styles: Callable[[int, Dict[str, Any]], Dict[str, CellStyle]] = None,
+                  hidden: Callable[[Dict[str, Any]], bool] = None,
+                  auto_filter: bool = False,
+                  filters: Dict[str, List[str]] = None) -> None:
+        """
+        寫入一個工作表（每列資料只走訪兩次：計算欄寬、寫入）
+
+        Args:
+            title: 工作表名稱
+            columns: 欄位順序（記錄中沒有的欄位寫成空白）
+            records: 資料列（dict）
+            highlight_headers: 標題改為深紅底白字的欄位
+            column_styles: 整欄資料套用的格式 {欄位: CellStyle}
+            cell_styles: 個別儲存格格式，參數為 (資料列索引, 記錄)，回傳 {欄位: CellStyle}
+            hidden: 回傳 True 的資料列會隱藏
+            auto_filter: 是否對整個資料範圍設定自動篩選
+            filters: 自動篩選的預設條件 {欄位: 顯示的值}
+        """
+        columns = list(columns)
+        ws = self.workbook.create_sheet(title)
+        self.sheet_names.append(title)
+        self.sheets.append((title, columns, records))
+
+        # write-only 工作表的欄寬必須在寫入資料前設定
+        for col_idx, width in enumerate(self._column_widths(columns, records), 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        highlight_headers = set(highlight_headers)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(ws, value=column)
+            cell.fill = HIGHLIGHT_HEADER_FILL if column in highlight_headers else HEADER_FILL
+            cell.font = HEADER_FONT
+            cell.alignment = HEADER_ALIGNMENT
+            cell.border = HEADER_BORDER
+            header.append(cell)
+        ws.append(header)
+
+        column_styles = column_styles or {}
+        for index, record in enumerate(records):
+            if hidden is not None and hidden(record):
+                ws.row_dimensions[index + 2].hidden = True
+
+            styles = cell_styles(index, record) if cell_styles is not None else None
+            row = []
+            for column in columns:
+                value = record.get(column)
+                style = column_styles.get(column)
+                if styles and column in styles:
+                    style = {**style, **styles[column]} if style else styles[column]
+                row.append(self._styled_cell(ws, value, style) if style else value)
+            ws.append(row)
+
+        if auto_filter and columns:
+            ws.auto_filter.ref = f"A1:{get_column_letter(len(columns))}{len(records) + 1}"
+            for column, values in (filters or {}).items():
+                if column in columns:
+                    filter_column = FilterColumn(colId=columns.index(column))
+                    filter_column.filters = Filters()
+                    filter_column.filters.filter = list(values)
+                    ws.auto_filter.filterColumn.append(filter_column)
+
+    @staticmethod
+    def _column_widths(columns: List[str], records: Sequence[Dict[str, Any]]) -> List[int]:
+        """依標題與內容的最大字元數計算欄寬（與 ExcelHandler._format_worksheet 相同規則）"""
+        widths = []
+        for column in columns:
+            max_length = len(str(column))
+            for record in records:
+                value = record.get(column)
+                if value is not None:
+                    length = len(str(value))
+                    if length > max_length:
+                        max_length = length
+            widths.append(min(max_length + 2, MAX_COLUMN_WIDTH))
+        return widths
+
+    @staticmethod
+    def _styled_cell(ws, value: Any, style: CellStyle) -> WriteOnlyCell:
+        """建立帶格式的儲存格"""
+        cell = WriteOnlyCell(ws, value=style.get('value', value))
+        if 'font' in style:
+            cell.font = style['font']
+        if 'fill' in style:
+            cell.fill = style['fill']
+        if 'alignment' in style:
+            cell.alignment = style['alignment']
+        return cell
+
+    def set_summary(self, summary: Dict[str, Any]) -> None:
+        """設定摘要資料（save 時與欄式副本一起寫成 summary.json）"""
+        self.summary = summary
+
+    def save(self) -> str:
+        """寫入檔案（沒有任何工作表時建立空白工作表），接著寫入欄式副本"""
+        if not self.sheet_names:
+            self.workbook.create_sheet('Sheet')
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_file)), exist_ok=True)
+        self.workbook.save(self.output_file)
+        result_sidecar.write(self.output_file, self.sheets, self.summary)
+        return self.output_file
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.save()
+        return False
+
+def record_columns(records: Iterable[Dict[str, Any]], order: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    取得記錄的欄位（依第一次出現的順序，與 pd.DataFrame(records) 相同）
+
+    Args:
+        records: 資料列
+        order: 指定欄位順序時，只保留記錄中存在的欄位並依此順序排列
+    """
+    seen = {}
+    for record in records:
+        for key in record:
+            seen.setdefault(key, None)
+    if order is not None:
+        return [column for column in order if column in seen]
+    return list(seen)
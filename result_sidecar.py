@@ -0,0 +1,235 @@
+"""
+比對結果欄式副本模組
+比對報表寫入 Excel 時，同時把每個工作表寫成欄式檔案（有 pyarrow 時為 Parquet，否則為 gzip JSON-lines）
+並附上摘要 JSON；讀取結果時優先使用副本，不必每次都以 pd.read_excel 解析 Excel
+"""
+import os
+import json
+import gzip
+import shutil
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import pandas as pd
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+# 副本格式版本（格式改變時遞增，舊副本視為不存在）
+SIDECAR_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+SUMMARY_FILE = 'summary.json'
+SIDECAR_SUFFIX = '.columnar'
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class ResultSidecar:
+    """比對結果欄式副本類別"""
+
+    def __init__(self, enabled: bool = None, file_format: str = None):
+        """
+        初始化
+
+        Args:
+            enabled: 是否寫入與讀取副本（預設 config.RESULT_SIDECAR_ENABLED）
+            file_format: 副本格式 auto / parquet / jsonl（預設 config.RESULT_SIDECAR_FORMAT）
+        """
+        self.enabled = config.RESULT_SIDECAR_ENABLED if enabled is None else enabled
+        self.file_format = file_format or config.RESULT_SIDECAR_FORMAT
+        self.logger = logger
+        self._pyarrow = None
+
+    @staticmethod
+    def sidecar_dir(excel_path: str) -> str:
+        """Excel 檔案對應的副本目錄（與 Excel 同目錄的隱藏資料夾）"""
+        directory, name = os.path.split(excel_path)
+        return os.path.join(directory, f'.{name}{SIDECAR_SUFFIX}')
+
+    @staticmethod
+    def is_sidecar_dir(name: str) -> bool:
+        """目錄名稱是否為副本目錄（列出或打包結果時用來略過）"""
+        return name.startswith('.') and name.endswith(SIDECAR_SUFFIX)
+
+    @staticmethod
+    def _excel_identity(excel_path: str) -> Optional[str]:
+        """Excel 檔案的 (size, mtime_ns)，用來確認副本與 Excel 一致"""
+        try:
+            st = os.stat(excel_path)
+        except OSError:
+            return None
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    def _sheet_format(self) -> str:
+        """決定工作表副本格式"""
+        if self.file_format == 'jsonl':
+            return 'jsonl'
+        if self._pyarrow is None:
+            self._pyarrow = _has_pyarrow()
+        if self.file_format == 'parquet' and not self._pyarrow:
+            self.logger.warning("未安裝 pyarrow，比對結果副本改用 JSON-lines")
+        return 'parquet' if self._pyarrow else 'jsonl'
+
+    def write(self, excel_path: str, sheets: Sequence[Tuple[str, List[str], Sequence[Dict[str, Any]]]],
+              summary: Dict[str, Any] = None) -> Optional[str]:
+        """
+        寫入副本（Excel 必須已寫入完成）
+
+        Args:
+            excel_path: 對應的 Excel 檔案
+            sheets: [(工作表名稱, 欄位, 資料列)]，順序與 Excel 相同
+            summary: 摘要資料（寫成 summary.json）
+
+        Returns:
+            副本目錄，停用或失敗時回傳 None
+        """
+        if not self.enabled:
+            return None
+
+        sidecar = self.sidecar_dir(excel_path)
+        try:
+            # 先移除舊的 manifest，寫到一半失敗時讀取端會改讀 Excel
+            if os.path.isdir(sidecar):
+                shutil.rmtree(sidecar)
+            os.makedirs(sidecar, exist_ok=True)
+
+            preferred = self._sheet_format()
+            entries = []
+            for index, (title, columns, records) in enumerate(sheets):
+                file_format = preferred
+                if file_format == 'parquet':
+                    try:
+                        file_name = f'sheet_{index}.parquet'
+                        self._write_parquet(os.path.join(sidecar, file_name), columns, records)
+                    except Exception as e:
+                        # 同一欄混合數字與文字等 Parquet 無法表示的資料
+                        self.logger.debug(f"工作表 {title} 無法寫成 Parquet，改用 JSON-lines: {str(e)}")
+                        file_format = 'jsonl'
+                if file_format == 'jsonl':
+                    file_name = f'sheet_{index}.jsonl.gz'
+                    self._write_jsonl(os.path.join(sidecar, file_name), columns, records)
+                entries.append({
+                    'name': title,
+                    'file': file_name,
+                    'format': file_format,
+                    'columns': list(columns),
+                    'rows': len(records)
+                })
+
+            if summary is not None:
+                self._write_json(os.path.join(sidecar, SUMMARY_FILE), summary)
+
+            self._write_json(os.path.join(sidecar, MANIFEST_FILE), {
+                'version': SIDECAR_VERSION,
+                'excel_identity': self._excel_identity(excel_path),
+                'sheets': entries
+            })
+            return sidecar
+
+        except Exception as e:
+            self.logger.warning(f"寫入比對結果副本失敗 {excel_path}: {str(e)}")
+            shutil.rmtree(sidecar, ignore_errors=True)
+            return None
+
+    @staticmethod
+    def _write_parquet(file_path: str, columns: List[str], records: Sequence[Dict[str, Any]]) -> None:
+        df = pd.DataFrame([[record.get(column) for column in columns] for record in records],
+                          columns=columns, dtype=object)
+        df.to_parquet(file_path, index=False)
+
+    @staticmethod
+    def _write_jsonl(file_path: str, columns: List[str], records: Sequence[Dict[str, Any]]) -> None:
+        with gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            for record in records:
+                f.write(json.dumps([record.get(column) for column in columns], ensure_ascii=False, default=str))
+                f.write('\n')
+
+    @staticmethod
+    def _write_json(file_path: str, data: Dict[str, Any]) -> None:
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, file_path)
+
+    def _load_manifest(self, excel_path: str) -> Optional[Dict[str, Any]]:
+        """讀取副本 manifest，副本不存在、版本不符或 Excel 已被改寫時回傳 None"""
+        if not self.enabled:
+            return None
+        manifest_path = os.path.join(self.sidecar_dir(excel_path), MANIFEST_FILE)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != SIDECAR_VERSION:
+            return None
+        if manifest.get('excel_identity') != self._excel_identity(excel_path):
+            return None
+        return manifest
+
+    def read_sheets(self, excel_path: str, sheet_names: Sequence[str] = None) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        由副本讀取工作表
+
+        Args:
+            excel_path: Excel 檔案路徑
+            sheet_names: 只讀取這些工作表（None 表示全部）
+
+        Returns:
+            {工作表名稱: DataFrame}（順序與 Excel 相同），沒有可用的副本時回傳 None
+        """
+        manifest = self._load_manifest(excel_path)
+        if manifest is None:
+            return None
+
+        sidecar = self.sidecar_dir(excel_path)
+        result = {}
+        try:
+            for entry in manifest['sheets']:
+                if sheet_names is not None and entry['name'] not in sheet_names:
+                    continue
+                file_path = os.path.join(sidecar, entry['file'])
+                if entry['format'] == 'parquet':
+                    df = pd.read_parquet(file_path)
+                else:
+                    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+                        rows = [json.loads(line) for line in f]
+                    df = pd.DataFrame(rows, columns=entry['columns'])
+                result[entry['name']] = df
+        except Exception as e:
+            self.logger.warning(f"讀取比對結果副本失敗，改讀 Excel {excel_path}: {str(e)}")
+            return None
+        return result
+
+    def read_summary(self, excel_path: str) -> Optional[Dict[str, Any]]:
+        """讀取副本的摘要 JSON，沒有可用的副本或摘要時回傳 None"""
+        if self._load_manifest(excel_path) is None:
+            return None
+        try:
+            with open(os.path.join(self.sidecar_dir(excel_path), SUMMARY_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read_excel(self, excel_path: str, sheet_name: str = None):
+        """
+        讀取比對結果（優先使用副本，沒有副本時以 pd.read_excel 讀取）
+
+        Args:
+            excel_path: Excel 檔案路徑
+            sheet_name: 工作表名稱，None 表示全部（與 pd.read_excel 的 sheet_name=None 相同回傳 dict）
+
+        Returns:
+            sheet_name 為 None 時回傳 {工作表名稱: DataFrame}，否則回傳 DataFrame
+        """
+        sheets = self.read_sheets(excel_path, None if sheet_name is None else [sheet_name])
+        if sheets is not None and (sheet_name is None or sheet_name in sheets):
+            return sheets if sheet_name is None else sheets[sheet_name]
+        return pd.read_excel(excel_path, sheet_name=sheet_name)
+
+# 全域副本實例
+result_sidecar = ResultSidecar()
@@ -0,0 +1,145 @@
+"""
+SFTP 下載效能量測工具
+啟動本地 SFTP 測試伺服器，以不同的平行度執行 download_from_excel，
+輸出 files/s、MB/s 與 SFTP 請求往返次數
+
+使用方式:
+    python sftp_benchmark.py --db-count 20 --rddb-count 20 --latency-ms 20 --workers 1,4,8
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict, List
+import pandas as pd
+import utils
+import config
+from sftp_downloader import SFTPDownloader
+from sftp_test_server import LocalSFTPServer
+from sftp_connection_pool import connection_pool
+from remote_listing_cache import listing_cache
+from download_cache import download_cache
+
+logger = utils.setup_logger(__name__)
+
+def write_benchmark_excel(paths: List[str], excel_path: str) -> str:
+    """將遠端路徑寫成單一路徑格式的 Excel"""
+    pd.DataFrame({'SN': range(1, len(paths) + 1), 'ftp path': paths}).to_excel(excel_path, index=False)
+    return excel_path
+
+def _collect_output(output_dir: str):
+    """統計下載目錄中的目標檔案數與總大小"""
+    targets = {name.lower() for name in config.TARGET_FILES}
+    files = 0
+    size = 0
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            if name.lower() in targets:
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+def run_benchmark(server: LocalSFTPServer, excel_path: str, workers_levels: List[int],
+                  work_dir: str) -> List[Dict[str, Any]]:
+    """
+    以各個平行度執行下載並量測
+
+    每次執行前清空目錄列表快取、下載快取與連線池，確保每次都是冷啟動
+
+    Args:
+        server: 已啟動的本地 SFTP 測試伺服器
+        excel_path: 下載清單 Excel
+        workers_levels: 要量測的 SFTP_MAX_WORKERS 值
+        work_dir: 輸出與快取使用的工作目錄
+
+    Returns:
+        每個平行度的量測結果
+    """
+    original_workers = config.SFTP_MAX_WORKERS
+    original_cache_dir = download_cache.cache_dir
+    results = []
+
+    try:
+        for workers in workers_levels:
+            output_dir = os.path.join(work_dir, f'output_{workers}')
+            download_cache.cache_dir = os.path.join(work_dir, f'cache_{workers}')
+            config.SFTP_MAX_WORKERS = workers
+            listing_cache.clear()
+            connection_pool.close_all()
+            server.reset_stats()
+
+            downloader = SFTPDownloader(server.host, server.port, server.username, server.password)
+            start = time.perf_counter()
+            downloader.download_from_excel(excel_path, output_dir)
+            elapsed = time.perf_counter() - start
+
+            files, size = _collect_output(output_dir)
+            results.append({
+                'workers': workers,
+                'seconds': elapsed,
+                'files': files,
+                'bytes': size,
+                'files_per_sec': files / elapsed if elapsed else 0.0,
+                'mb_per_sec': size / (1024 * 1024) / elapsed if elapsed else 0.0,
+                'round_trips': server.requests,
+                'read_requests': server.read_requests
+            })
+    finally:
+        config.SFTP_MAX_WORKERS = original_workers
+        download_cache.cache_dir = original_cache_dir
+        connection_pool.close_all()
+        listing_cache.clear()
+
+    return results
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """以表格輸出量測結果"""
+    header = f"{'workers':>8} {'seconds':>9} {'files':>7} {'files/s':>9} {'MB/s':>8} {'round-trips':>12} {'reads':>7}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>9.2f} {r['files']:>7} {r['files_per_sec']:>9.1f} "
+              f"{r['mb_per_sec']:>8.2f} {r['round_trips']:>12} {r['read_requests']:>7}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='SFTP 下載效能量測（使用本地 SFTP 測試伺服器）')
+    parser.add_argument('--db-count', type=int, default=10, help='DB 格式路徑數')
+    parser.add_argument('--rddb-count', type=int, default=10, help='RDDB 格式路徑數')
+    parser.add_argument('--depth', type=int, default=1, help='目標檔案所在的子目錄深度')
+    parser.add_argument('--extra-files', type=int, default=5, help='每層目錄的雜檔數')
+    parser.add_argument('--manifest-kb', type=int, default=256, help='manifest 檔案大小（KB）')
+    parser.add_argument('--latency-ms', type=float, default=0, help='每個目錄 / 開檔 / stat 請求注入的延遲（毫秒）')
+    parser.add_argument('--workers', default='1,4,8', help='要量測的平行度（逗號分隔）')
+    parser.add_argument('--keep', action='store_true', help='保留工作目錄')
+    args = parser.parse_args(argv)
+
+    workers_levels = [int(w) for w in args.workers.split(',') if w.strip()]
+    work_dir = tempfile.mkdtemp(prefix='sftp_benchmark_')
+
+    try:
+        with LocalSFTPServer(latency=args.latency_ms / 1000.0) as server:
+            paths = server.generate_tree(
+                db_count=args.db_count,
+                rddb_count=args.rddb_count,
+                depth=args.depth,
+                extra_files=args.extra_files,
+                manifest_size=args.manifest_kb * 1024
+            )
+            excel_path = write_benchmark_excel(paths, os.path.join(work_dir, 'benchmark_paths.xlsx'))
+
+            print(f"路徑數: {len(paths)}，深度: {args.depth}，manifest: {args.manifest_kb} KB，"
+                  f"延遲: {args.latency_ms} ms")
+            results = run_benchmark(server, excel_path, workers_levels, work_dir)
+            print_results(results)
+    finally:
+        if args.keep:
+            print(f"工作目錄: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+SFTP Channel 池模組
+在少量 Transport 上開啟多個 SFTP channel，供平行下載使用
+額外需要的 Transport 由共用連線池借用；歸還時已失效的 channel（例如續傳時已改用新連線）
+會被丟棄並以新的 channel 取代，不會再借給其他工作
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+import paramiko
+import utils
+import config
+from sftp_connection_pool import connection_pool
+
+logger = utils.setup_logger(__name__)
+
+# 等待閒置 channel 時，檢查池中是否還有 channel 的間隔秒數
+IDLE_POLL_INTERVAL = 1.0
+
+class SFTPChannelPool:
+    """SFTP Channel 池類別"""
+
+    def __init__(self, host: str, port: int, username: str, password: str,
+                 max_channels: int = None, channels_per_transport: int = None,
+                 transports: List[paramiko.Transport] = None):
+        """
+        初始化 Channel 池
+
+        Args:
+            host: SFTP 伺服器位址
+            port: SFTP 連接埠
+            username: 使用者名稱
+            password: 密碼
+            max_channels: 最大 channel 數（預設 config.SFTP_MAX_WORKERS）
+            channels_per_transport: 每條 Transport 的 channel 數（預設 config.SFTP_CHANNELS_PER_TRANSPORT）
+            transports: 已建立的 Transport，會優先在其上開啟 channel（不由本池關閉）
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_channels = max(1, max_channels or config.SFTP_MAX_WORKERS)
+        self.channels_per_transport = max(1, channels_per_transport or config.SFTP_CHANNELS_PER_TRANSPORT)
+        self.logger = logger
+
+        self._borrowed_transports = list(transports or [])
+        self._leased_connections = []
+        self._channels = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """已開啟的 channel 數"""
+        return len(self._channels)
+
+    def open(self) -> int:
+        """
+        建立所有 channel
+
+        Returns:
+            實際開啟的 channel 數
+        """
+        with self._lock:
+            transports = list(self._borrowed_transports)
+
+            while len(self._channels) < self.max_channels:
+                # 目前的 Transport 都已滿，向連線池借用新的 Transport
+                if len(self._channels) >= len(transports) * self.channels_per_transport:
+                    try:
+                        # 連線池已滿時不等待，直接以現有 channel 執行
+                        conn = connection_pool.acquire(self.host, self.port, self.username, self.password, timeout=0)
+                    except Exception as e:
+                        self.logger.warning(f"取得額外 Transport 失敗，使用現有 {len(self._channels)} 個 channel: {str(e)}")
+                        break
+                    self._leased_connections.append(conn)
+                    transports.append(conn.transport)
+
+                transport = transports[len(self._channels) // self.channels_per_transport]
+                try:
+                    sftp = paramiko.SFTPClient.from_transport(transport)
+                except Exception as e:
+                    self.logger.warning(f"開啟 SFTP channel 失敗: {str(e)}")
+                    break
+
+                self._channels.append(sftp)
+                self._idle.put(sftp)
+
+            self.logger.info(f"SFTP channel 池已就緒: {len(self._channels)} 個 channel / {len(transports)} 條 Transport")
+
+        if not self._channels:
+            raise ConnectionError("無法開啟任何 SFTP channel")
+
+        return len(self._channels)
+
+    def acquire(self, timeout: Optional[float] = None) -> paramiko.SFTPClient:
+        """取得一個閒置的 channel（所有 channel 都已失效且無法取代時拋出 ConnectionError）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = IDLE_POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                with self._lock:
+                    if not self._channels:
+                        raise ConnectionError("SFTP channel 池已無可用的 channel")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def release(self, sftp: paramiko.SFTPClient) -> None:
+        """歸還 channel，已失效的 channel 改以新的 channel 取代"""
+        if self._is_healthy(sftp):
+            self._idle.put(sftp)
+            return
+
+        with self._lock:
+            if sftp not in self._channels:
+                # 池已關閉
+                return
+            self._channels.remove(sftp)
+            try:
+                sftp.close()
+            except Exception:
+                pass
+            try:
+                replacement = self._open_replacement_locked()
+            except Exception as e:
+                self.logger.warning(f"無法取代失效的 SFTP channel，剩餘 {len(self._channels)} 個 channel: {str(e)}")
+                return
+            self.logger.info("已丟棄失效的 SFTP channel 並開啟新的 channel")
+        self._idle.put(replacement)
+
+    @staticmethod
+    def _is_healthy(sftp: paramiko.SFTPClient) -> bool:
+        """channel 與其 Transport 是否仍可使用"""
+        try:
+            channel = sftp.get_channel()
+            return not channel.closed and channel.get_transport().is_active()
+        except Exception:
+            return False
+
+    def _open_replacement_locked(self) -> paramiko.SFTPClient:
+        """在仍可用的 Transport 上開啟新的 channel，都已滿或失效時向連線池借用新的 Transport（需持有鎖）"""
+        # 已失效的 Transport 歸還連線池（由連線池關閉）
+        for conn in [conn for conn in self._leased_connections if not conn.is_healthy()]:
+            self._leased_connections.remove(conn)
+            connection_pool.release(conn)
+
+        transports = self._borrowed_transports + [conn.transport for conn in self._leased_connections]
+        for transport in transports:
+            if not transport.is_active():
+                continue
+            used = sum(1 for sftp in self._channels if sftp.get_channel().get_transport() is transport)
+            if used < self.channels_per_transport:
+                break
+        else:
+            conn = connection_pool.acquire(self.host, self.port, self.username, self.password, timeout=0)
+            self._leased_connections.append(conn)
+            transport = conn.transport
+
+        sftp = paramiko.SFTPClient.from_transport(transport)
+        self._channels.append(sftp)
+        return sftp
+
+    @contextmanager
+    def channel(self, timeout: Optional[float] = None):
+        """以 context manager 方式借用 channel"""
+        sftp = self.acquire(timeout)
+        try:
+            yield sftp
+        finally:
+            self.release(sftp)
+
+    def close(self) -> None:
+        """關閉所有 channel，並將借用的連線歸還連線池"""
+        with self._lock:
+            for sftp in self._channels:
+                try:
+                    sftp.close()
+                except Exception as e:
+                    self.logger.debug(f"關閉 SFTP channel 時發生錯誤: {str(e)}")
+            for conn in self._leased_connections:
+                connection_pool.release(conn)
+
+            self._channels = []
+            self._leased_connections = []
+            self._idle = queue.Queue()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,303 @@
+"""
+SFTP 連線池模組
+以 (host, port, username, profile) 為鍵重複使用已認證的 Transport
+（profile 區分不同的 Transport 建立方式，例如自訂 socket 與協議設定的連線不會借給一般呼叫端），
+避免每個 Web 任務、後台 API 與版本查詢都重新進行 SSH 握手與認證
+支援健康檢查、閒置淘汰與每個主機的連線數上限
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+import paramiko
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+PoolKey = Tuple[str, int, str, str]
+
+# 使用預設 Transport 建立方式的連線設定檔名稱
+DEFAULT_PROFILE = 'default'
+
+class PooledConnection:
+    """連線池中的單一連線（一條 Transport + 一個主要 SFTP channel）"""
+
+    def __init__(self, key: PoolKey, transport: paramiko.Transport):
+        self.key = key
+        self.transport = transport
+        self.sftp = paramiko.SFTPClient.from_transport(transport)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        # 呼叫端檢測到的伺服器能力（同一條連線只需檢測一次）
+        self.server_capabilities: Optional[Dict[str, bool]] = None
+
+    def open_channel(self) -> paramiko.SFTPClient:
+        """在同一條 Transport 上開啟額外的 SFTP channel"""
+        return paramiko.SFTPClient.from_transport(self.transport)
+
+    def is_healthy(self, probe: bool = False) -> bool:
+        """
+        檢查連線是否可用
+
+        Args:
+            probe: 是否實際送出一個 SFTP 請求確認（否則只檢查 Transport 狀態）
+        """
+        try:
+            if not self.transport.is_active() or not self.transport.is_authenticated():
+                return False
+            if probe:
+                # realpath 幾乎所有伺服器都支援，比 stat 更保險
+                self.sftp.normalize('.')
+                self.last_checked = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        """關閉連線"""
+        try:
+            self.sftp.close()
+        except Exception:
+            pass
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+class SFTPConnectionPool:
+    """SFTP 連線池類別（執行緒安全）"""
+
+    def __init__(self, max_per_host: int = None, max_idle_seconds: float = None,
+                 health_check_interval: float = None):
+        """
+        初始化連線池
+
+        Args:
+            max_per_host: 每個主機（帳號）的最大連線數（預設 config.SFTP_POOL_MAX_PER_HOST）
+            max_idle_seconds: 閒置超過此秒數即關閉（預設 config.SFTP_POOL_MAX_IDLE_SECONDS）
+            health_check_interval: 閒置超過此秒數的連線在借出前會實際探測（預設 config.SFTP_POOL_HEALTH_CHECK_INTERVAL）
+        """
+        self.max_per_host = max_per_host or config.SFTP_POOL_MAX_PER_HOST
+        self.max_idle_seconds = max_idle_seconds if max_idle_seconds is not None else config.SFTP_POOL_MAX_IDLE_SECONDS
+        self.health_check_interval = health_check_interval if health_check_interval is not None else config.SFTP_POOL_HEALTH_CHECK_INTERVAL
+        self.logger = logger
+
+        self._idle: Dict[PoolKey, List[PooledConnection]] = {}
+        self._in_use: Dict[PoolKey, int] = {}
+        self._condition = threading.Condition()
+        self._reaper = None
+        self._created = 0
+        self._reused = 0
+
+    @staticmethod
+    def _default_factory(host: str, port: int, username: str, password: str) -> paramiko.Transport:
+        """預設的 Transport 建立方式（加大視窗以利高延遲連線的大檔傳輸）"""
+        transport = paramiko.Transport(
+            (host, port),
+            default_window_size=config.SFTP_WINDOW_SIZE,
+            default_max_packet_size=config.SFTP_MAX_PACKET_SIZE
+        )
+        transport.connect(username=username, password=password)
+        return transport
+
+    @staticmethod
+    def _profile_of(factory: Optional[Callable[[], paramiko.Transport]]) -> str:
+        """依 Transport 建立函數決定設定檔名稱（同一類別的方法視為相同設定）"""
+        if factory is None:
+            return DEFAULT_PROFILE
+        return f"{getattr(factory, '__module__', '')}.{getattr(factory, '__qualname__', repr(factory))}"
+
+    def acquire(self, host: str, port: int, username: str, password: str,
+                factory: Callable[[], paramiko.Transport] = None,
+                timeout: float = None, profile: str = None) -> PooledConnection:
+        """
+        借出一條連線，沒有閒置連線時建立新連線
+
+        Args:
+            host: SFTP 伺服器位址
+            port: SFTP 連接埠
+            username: 使用者名稱
+            password: 密碼
+            factory: 自訂的 Transport 建立函數（需回傳已認證的 Transport）
+            timeout: 達到連線上限時的最長等待秒數（預設 config.SFTP_POOL_ACQUIRE_TIMEOUT，0 表示不等待）
+            profile: 連線設定檔名稱，只有相同設定檔的連線會互相重複使用
+                     （未指定時，有 factory 以其名稱區分，否則為 DEFAULT_PROFILE）
+
+        Returns:
+            PooledConnection
+        """
+        key = (host, int(port), username, profile or self._profile_of(factory))
+        timeout = config.SFTP_POOL_ACQUIRE_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            # 閒置過久的連線在鎖外關閉，不阻擋其他執行緒借出/歸還
+            with self._condition:
+                evicted = self._evict_idle_locked()
+            self._close_evicted(evicted)
+
+            with self._condition:
+                conn = self._pop_idle_locked(key)
+
+                if conn is None:
+                    total = self._in_use.get(key, 0) + len(self._idle.get(key, []))
+                    if total >= self.max_per_host:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"SFTP 連線池已滿 ({host}:{port}, 上限 {self.max_per_host})")
+                        self._condition.wait(remaining)
+                        continue
+
+                # 先佔用名額，實際連線在鎖外進行
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+
+            if conn is not None:
+                # 閒置太久的連線先探測，失效則丟棄後重新取得
+                needs_probe = time.monotonic() - conn.last_checked >= self.health_check_interval
+                if conn.is_healthy(probe=needs_probe):
+                    conn.last_used = time.monotonic()
+                    with self._condition:
+                        self._reused += 1
+                    return conn
+                self.logger.info(f"丟棄失效的 SFTP 連線: {host}:{port}")
+                self._discard(conn)
+                continue
+
+            try:
+                self.logger.info(f"建立新的 SFTP 連線: {host}:{port}")
+                transport = factory() if factory else self._default_factory(host, port, username, password)
+                conn = PooledConnection(key, transport)
+            except Exception:
+                with self._condition:
+                    self._in_use[key] -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._created += 1
+            self._ensure_reaper()
+            return conn
+
+    def release(self, conn: PooledConnection, discard: bool = False) -> None:
+        """
+        歸還連線
+
+        Args:
+            conn: 要歸還的連線
+            discard: 是否直接關閉（例如呼叫端已知連線異常）
+        """
+        if conn is None:
+            return
+
+        if discard or not conn.is_healthy():
+            self._discard(conn)
+            return
+
+        conn.last_used = time.monotonic()
+        with self._condition:
+            self._in_use[conn.key] = max(0, self._in_use.get(conn.key, 0) - 1)
+            self._idle.setdefault(conn.key, []).append(conn)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, host: str, port: int, username: str, password: str, **kwargs):
+        """以 context manager 方式借用連線"""
+        conn = self.acquire(host, port, username, password, **kwargs)
+        failed = False
+        try:
+            yield conn
+        except Exception:
+            failed = not conn.is_healthy()
+            raise
+        finally:
+            self.release(conn, discard=failed)
+
+    def _discard(self, conn: PooledConnection) -> None:
+        """關閉連線並釋放名額"""
+        conn.close()
+        with self._condition:
+            self._in_use[conn.key] = max(0, self._in_use.get(conn.key, 0) - 1)
+            self._condition.notify()
+
+    def _pop_idle_locked(self, key: PoolKey) -> Optional[PooledConnection]:
+        """取出最近使用的閒置連線（需持有鎖）"""
+        idle = self._idle.get(key)
+        return idle.pop() if idle else None
+
+    def _evict_idle_locked(self) -> List[PooledConnection]:
+        """
+        由閒置列表移除閒置過久的連線（需持有鎖）
+
+        Returns:
+            被移除的連線，需在釋放鎖之後以 _close_evicted 關閉（關閉涉及網路 I/O）
+        """
+        now = time.monotonic()
+        evicted = []
+        for key, idle in self._idle.items():
+            keep = []
+            for conn in idle:
+                if now - conn.last_used > self.max_idle_seconds:
+                    evicted.append(conn)
+                else:
+                    keep.append(conn)
+            self._idle[key] = keep
+
+        if evicted:
+            self._condition.notify_all()
+        return evicted
+
+    def _close_evicted(self, evicted: List[PooledConnection]) -> None:
+        """關閉被淘汰的連線（不可持有鎖）"""
+        for conn in evicted:
+            conn.close()
+        if evicted:
+            self.logger.info(f"關閉 {len(evicted)} 條閒置的 SFTP 連線")
+
+    def evict_idle(self) -> int:
+        """關閉閒置過久的連線"""
+        with self._condition:
+            evicted = self._evict_idle_locked()
+        self._close_evicted(evicted)
+        return len(evicted)
+
+    def _ensure_reaper(self) -> None:
+        """啟動背景執行緒定期淘汰閒置連線"""
+        with self._condition:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='sftp-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        """背景淘汰迴圈"""
+        interval = max(1.0, self.max_idle_seconds / 2)
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                self.logger.debug(f"淘汰閒置連線時發生錯誤: {str(e)}")
+
+    def close_all(self) -> None:
+        """關閉所有閒置連線（借出中的連線於歸還時處理）"""
+        with self._condition:
+            idle_connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn in idle_connections:
+            conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得連線池統計"""
+        with self._condition:
+            return {
+                'idle': sum(len(idle) for idle in self._idle.values()),
+                'in_use': sum(self._in_use.values()),
+                'created': self._created,
+                'reused': self._reused
+            }
+
+# 全域連線池實例
+connection_pool = SFTPConnectionPool()
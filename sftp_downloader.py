@@ -4,13 +4,23 @@ SFTP 下載模組（增強版）
 支援雙路徑 Excel 格式（SftpPath 和 compare_SftpPath）
 """
 import os
+import re
 import stat
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import paramiko
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import pandas as pd
 import utils
 import config
 from excel_handler import ExcelHandler
+from sftp_channel_pool import SFTPChannelPool
+from sftp_connection_pool import connection_pool
+from remote_listing_cache import cached_listdir_attr
+from download_cache import download_cache
+from sftp_transfer import resumable_transfer
 
 logger = utils.setup_logger(__name__)
 
@@ -34,20 +44,33 @@ class SFTPDownloader:
         self.password = password or config.SFTP_PASSWORD
         self.logger = logger
         self.excel_handler = ExcelHandler()
-        self._sftp = None
+        self._local = threading.local()
+        self._main_sftp = None
         self._transport = None
-        
+        self._connection = None
+        self.download_summary = {}
+
+    @property
+    def _sftp(self) -> Optional[paramiko.SFTPClient]:
+        """目前執行緒使用的 SFTP 客戶端（平行下載時為借用的 channel）"""
+        return getattr(self._local, 'sftp', None) or self._main_sftp
+
+    @_sftp.setter
+    def _sftp(self, value: Optional[paramiko.SFTPClient]) -> None:
+        self._main_sftp = value
+
     def connect(self) -> None:
-        """建立 SFTP 連線"""
+        """建立 SFTP 連線（由共用連線池取得已認證的連線）"""
         try:
-            self.logger.info(f"正在連線到 SFTP 伺服器: {self.host}:{self.port}")
+            # 重複呼叫時先歸還原本的連線
+            if self._connection:
+                self.disconnect()
             
-            # 建立 Transport
-            self._transport = paramiko.Transport((self.host, self.port))
-            self._transport.connect(username=self.username, password=self.password)
+            self.logger.info(f"正在連線到 SFTP 伺服器: {self.host}:{self.port}")
             
-            # 建立 SFTP 客戶端
-            self._sftp = paramiko.SFTPClient.from_transport(self._transport)
+            self._connection = connection_pool.acquire(self.host, self.port, self.username, self.password)
+            self._transport = self._connection.transport
+            self._sftp = self._connection.sftp
             
             self.logger.info("SFTP 連線成功")
             
@@ -56,84 +79,63 @@ class SFTPDownloader:
             raise
             
     def disconnect(self) -> None:
-        """關閉 SFTP 連線"""
+        """歸還 SFTP 連線至連線池"""
         try:
-            if self._sftp:
-                self._sftp.close()
-            if self._transport:
-                self._transport.close()
-            self.logger.info("SFTP 連線已關閉")
+            if self._connection:
+                connection_pool.release(self._connection)
+                self.logger.info("SFTP 連線已歸還連線池")
         except Exception as e:
             self.logger.error(f"關閉 SFTP 連線時發生錯誤: {str(e)}")
+        finally:
+            self._connection = None
+            self._sftp = None
+            self._transport = None
             
-    def _find_file_case_insensitive(self, remote_path: str, filename: str) -> Optional[str]:
-        """
-        在遠端目錄中不區分大小寫地尋找檔案
-        
-        Args:
-            remote_path: 遠端目錄路徑
-            filename: 要尋找的檔案名稱
-            
-        Returns:
-            找到的檔案名稱，或 None
-        """
-        try:
-            files = self._sftp.listdir(remote_path)
-            filename_lower = filename.lower()
-            
-            for file in files:
-                if file.lower() == filename_lower:
-                    return file
-                    
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"列出遠端目錄失敗 {remote_path}: {str(e)}")
-            return None
-            
-    def _find_file_recursive(self, remote_path: str, filename: str, max_depth: int = 3, current_depth: int = 0) -> Optional[Tuple[str, str]]:
+    def _scan_target_files(self, remote_path: str, filenames, max_depth: int = 3,
+                           fallback_names=()) -> Dict[str, Tuple[str, str]]:
         """
-        遞迴搜尋檔案（不區分大小寫）
+        廣度優先掃描遠端目錄，一次找出所有目標檔案（不區分大小寫）
+        每個目錄只列出一次，所有目標檔案都找到後立即停止
         
         Args:
             remote_path: 遠端目錄路徑
-            filename: 要尋找的檔案名稱
+            filenames: 要尋找的檔案名稱集合
             max_depth: 最大搜尋深度
-            current_depth: 當前深度
+            fallback_names: 備援檔名，掃描途中順便記錄，但不影響停止條件
             
         Returns:
-            (檔案完整路徑, 實際檔案名稱) 或 None
+            {小寫檔名: (檔案完整路徑, 實際檔案名稱, SFTPAttributes)}，較淺層的檔案優先
         """
-        if current_depth > max_depth:
-            return None
-            
-        try:
-            # 先在當前目錄尋找
-            actual_filename = self._find_file_case_insensitive(remote_path, filename)
-            if actual_filename:
-                full_path = os.path.join(remote_path, actual_filename).replace('\\', '/')
-                return (full_path, actual_filename)
+        required = {name.lower() for name in filenames}
+        wanted = required | {name.lower() for name in fallback_names}
+        found = {}
+        pending_dirs = deque([(remote_path, 0)])
+        
+        while pending_dirs and not required.issubset(found):
+            current_path, current_depth = pending_dirs.popleft()
             
-            # 如果沒找到，遞迴搜尋子目錄
             try:
-                items = self._sftp.listdir_attr(remote_path)
-                for item in items:
-                    # 只處理目錄
-                    if item.st_mode is not None and stat.S_ISDIR(item.st_mode):
-                        subdir_path = os.path.join(remote_path, item.filename).replace('\\', '/')
-                        self.logger.debug(f"搜尋子目錄: {subdir_path}")
-                        
-                        result = self._find_file_recursive(subdir_path, filename, max_depth, current_depth + 1)
-                        if result:
-                            return result
+                items = cached_listdir_attr(self._sftp, self.host, current_path)
             except Exception as e:
-                self.logger.debug(f"無法列出子目錄 {remote_path}: {str(e)}")
-                
-            return None
+                if current_depth == 0:
+                    self.logger.error(f"列出遠端目錄失敗 {current_path}: {str(e)}")
+                else:
+                    self.logger.debug(f"無法列出子目錄 {current_path}: {str(e)}")
+                continue
             
-        except Exception as e:
-            self.logger.error(f"遞迴搜尋失敗 {remote_path}: {str(e)}")
-            return None
+            for item in items:
+                is_dir = item.st_mode is not None and stat.S_ISDIR(item.st_mode)
+                name_lower = item.filename.lower()
+                
+                if is_dir:
+                    if current_depth < max_depth:
+                        subdir_path = os.path.join(current_path, item.filename).replace('\\', '/')
+                        pending_dirs.append((subdir_path, current_depth + 1))
+                elif name_lower in wanted and name_lower not in found:
+                    full_path = os.path.join(current_path, item.filename).replace('\\', '/')
+                    found[name_lower] = (full_path, item.filename, item)
+        
+        return found
             
     def download_files(self, ftp_path: str, local_dir: str) -> Tuple[List[str], Dict[str, str]]:
         """
@@ -194,53 +196,62 @@ class SFTPDownloader:
                     target_files.append(target_file)
                     file_mapping[target_file] = target_file
             
+            # 單次掃描遠端目錄，同時尋找所有候選檔名（DB 格式一併尋找原始檔名作為備援）
+            # 掃描結果附帶遠端 size / mtime，用來驗證本地檔案是否仍為最新
+            candidates = set(file_mapping.values())
+            fallbacks = set(file_mapping.keys()) - candidates if is_db_format else set()
+            self.logger.debug(f"搜尋檔案: {', '.join(sorted(candidates))} in {ftp_path}")
+            found_files = self._scan_target_files(
+                ftp_path, candidates, config.MAX_SEARCH_DEPTH, fallback_names=fallbacks
+            )
+            
             # 下載每個目標檔案
             for original_file, actual_file in file_mapping.items():
                 try:
-                    # 檢查本地是否已存在該檔案（使用原始檔名）
                     local_file = os.path.join(local_dir, original_file)
-                    if os.path.exists(local_file) and config.SKIP_EXISTING_FILES:
-                        self.logger.info(f"檔案已存在，跳過下載: {local_file}")
-                        downloaded_files.append(original_file)
-                        file_paths[original_file] = "已存在"
-                        continue
                     
-                    # 遞迴尋找檔案（使用實際檔名）
-                    self.logger.debug(f"搜尋檔案: {actual_file} in {ftp_path}")
-                    result = self._find_file_recursive(ftp_path, actual_file, config.MAX_SEARCH_DEPTH)
+                    # 優先使用實際檔名的搜尋結果
+                    result = found_files.get(actual_file.lower())
+                    
+                    # 如果是 DB 格式但找不到帶版本號的檔案，改用原始檔名
+                    if not result and is_db_format and actual_file != original_file:
+                        self.logger.info(f"找不到 {actual_file}，嘗試尋找 {original_file}")
+                        result = found_files.get(original_file.lower())
                     
                     if result:
-                        remote_file, actual_filename = result
+                        remote_file, actual_filename, remote_attrs = result
+                        
+                        # 搜尋結果的 size / mtime 可能來自目錄列表快取（TTL 內檔案可能已重新發佈），
+                        # 比對本地檔案與計算下載快取鍵前重新取得
+                        remote_attrs = self._sftp.stat(remote_file)
+                        
+                        # 本地檔案與遠端 size / mtime 相同才跳過（使用原始檔名）
+                        if config.SKIP_EXISTING_FILES and download_cache.is_fresh(local_file, remote_attrs):
+                            self.logger.info(f"檔案已存在且與遠端相同，跳過下載: {local_file}")
+                            downloaded_files.append(original_file)
+                            file_paths[original_file] = "已存在"
+                            continue
                         
                         # 記錄相對路徑
                         relative_path = remote_file.replace(ftp_path, '').lstrip('/')
                         if relative_path != actual_filename:
-                            self.logger.info(f"找到檔案 {actual_file} 在子目錄: {os.path.dirname(relative_path)}")
+                            self.logger.info(f"找到檔案 {actual_filename} 在子目錄: {os.path.dirname(relative_path)}")
                         
                         # 下載檔案（儲存為原始檔名）
                         self.logger.info(f"下載檔案: {remote_file} -> {local_file}")
-                        self._sftp.get(remote_file, local_file)
+                        self._fetch_remote_file(remote_file, remote_attrs, local_file)
                         downloaded_files.append(original_file)
                         
                         file_paths[original_file] = relative_path
+                    elif config.SKIP_EXISTING_FILES and os.path.exists(local_file):
+                        # 遠端找不到時無法驗證，沿用本地檔案
+                        self.logger.warning(f"遠端找不到 {actual_file}，沿用本地已存在的檔案: {local_file}")
+                        downloaded_files.append(original_file)
+                        file_paths[original_file] = "已存在"
+                    elif is_db_format and actual_file != original_file:
+                        self.logger.warning(f"找不到檔案: {original_file} 或 {actual_file} in {ftp_path}")
                     else:
-                        # 如果是 DB 格式但找不到帶版本號的檔案，嘗試原始檔名
-                        if is_db_format and actual_file != original_file:
-                            self.logger.info(f"找不到 {actual_file}，嘗試尋找 {original_file}")
-                            result = self._find_file_recursive(ftp_path, original_file, config.MAX_SEARCH_DEPTH)
-                            
-                            if result:
-                                remote_file, actual_filename = result
-                                relative_path = remote_file.replace(ftp_path, '').lstrip('/')
-                                
-                                self.logger.info(f"下載檔案: {remote_file} -> {local_file}")
-                                self._sftp.get(remote_file, local_file)
-                                downloaded_files.append(original_file)
-                                file_paths[original_file] = relative_path
-                            else:
-                                self.logger.warning(f"找不到檔案: {original_file} 或 {actual_file} in {ftp_path}")
-                        else:
-                            self.logger.warning(f"找不到檔案: {actual_file} in {ftp_path}")
+                        self.logger.warning(f"找不到檔案: {actual_file} in {ftp_path}")
                             
                 except Exception as e:
                     self.logger.error(f"下載檔案失敗 {original_file}: {str(e)}")
@@ -249,7 +260,210 @@ class SFTPDownloader:
             self.logger.error(f"下載過程發生錯誤: {str(e)}")
             
         return downloaded_files, file_paths
+
+    def _fetch_remote_file(self, remote_file: str, remote_attrs: Any, local_file: str) -> None:
+        """
+        下載遠端檔案到本地，啟用下載快取時同一份內容只下載一次
+        
+        Args:
+            remote_file: 遠端檔案路徑
+            remote_attrs: 遠端檔案的 SFTPAttributes
+            local_file: 本地檔案路徑
+        """
+        sftp = self._sftp
+        
+        with self._retry_connections() as reconnect:
+            # 寫入暫存檔並於連線中斷時續傳，完成後才改名為目標檔案
+            def download(target_path: str) -> None:
+                resumable_transfer.download(
+                    sftp, remote_file, target_path, remote_attrs,
+                    reconnect=reconnect, callback=self._transfer_callback()
+                )
+            
+            if config.DOWNLOAD_CACHE_ENABLED:
+                download_cache.fetch(self.host, remote_file, remote_attrs, local_file, download)
+            else:
+                download(local_file)
+                download_cache.store_mtime(local_file, remote_attrs)
+
+    def _transfer_callback(self) -> Optional[Callable[[int, int], None]]:
+        """單一檔案傳輸的進度回調（供子類別回報位元組進度使用）"""
+        return None
+
+    @contextmanager
+    def _retry_connections(self):
+        """
+        提供續傳時取得新連線的函數，結束時將借用的連線歸還連線池
         
+        原本的連線中斷後整條 Transport 已無法使用，續傳需改用新的連線
+        """
+        leased = []
+        
+        def reconnect() -> paramiko.SFTPClient:
+            conn = connection_pool.acquire(self.host, self.port, self.username, self.password)
+            leased.append(conn)
+            return conn.sftp
+        
+        try:
+            yield reconnect
+        finally:
+            for conn in leased:
+                connection_pool.release(conn)
+
+    def _format_file_info(self, downloaded_files: List[str], file_paths: Dict[str, str]) -> str:
+        """
+        組合報表中的版本資訊檔案字串
+
+        Args:
+            downloaded_files: 成功下載的檔案列表
+            file_paths: 檔案路徑映射
+
+        Returns:
+            版本資訊檔案字串
+        """
+        file_info = []
+        for file in downloaded_files:
+            if file in file_paths:
+                path = file_paths[file]
+                if path == "已存在":
+                    file_info.append(f"{file} (已存在)")
+                elif path and path != file:
+                    file_info.append(f"{file} ({path})")
+                else:
+                    file_info.append(file)
+            else:
+                file_info.append(file)
+
+        return ', '.join(file_info) if file_info else '無'
+
+    def _run_download_jobs(self, jobs: List[Tuple[str, str]]) -> List[Tuple[List[str], Dict[str, str]]]:
+        """
+        執行下載工作，依 config.SFTP_MAX_WORKERS 平行分派到多個 SFTP channel
+
+        Args:
+            jobs: (ftp_path, local_dir) 列表
+
+        Returns:
+            與 jobs 順序相同的 download_files 結果列表
+        """
+        max_workers = min(config.SFTP_MAX_WORKERS, len(jobs))
+        if max_workers <= 1:
+            return [self.download_files(ftp_path, local_dir) for ftp_path, local_dir in jobs]
+
+        # 在主連線的 Transport 上開啟 channel，不足時再建立額外的 Transport
+        pool = SFTPChannelPool(
+            self.host, self.port, self.username, self.password,
+            max_channels=max_workers,
+            transports=[self._transport] if self._transport else None
+        )
+        try:
+            pool.open()
+        except Exception as e:
+            self.logger.warning(f"無法建立 SFTP channel 池，改為序列下載: {str(e)}")
+            pool.close()
+            return [self.download_files(ftp_path, local_dir) for ftp_path, local_dir in jobs]
+
+        self.logger.info(f"平行下載 {len(jobs)} 個路徑（{pool.size} 個 channel）")
+
+        def run_job(job: Tuple[str, str]) -> Tuple[List[str], Dict[str, str]]:
+            ftp_path, local_dir = job
+            with pool.channel() as sftp:
+                self._local.sftp = sftp
+                try:
+                    return self.download_files(ftp_path, local_dir)
+                finally:
+                    self._local.sftp = None
+
+        try:
+            with ThreadPoolExecutor(max_workers=pool.size) as executor:
+                return list(executor.map(run_job, jobs))
+        finally:
+            pool.close()
+
+    def _fill_download_results(self, download_jobs: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        下載所有工作並將結果填入對應的報表資料
+
+        Args:
+            download_jobs: (ftp_path, local_dir, report_row) 列表
+        """
+        self.download_summary = {}
+        if not download_jobs:
+            return
+
+        # 相同的遠端路徑只下載一次，再分送到其他本地資料夾
+        groups = OrderedDict()  # 正規化後的遠端路徑 -> 工作索引列表
+        for index, (ftp_path, _, _) in enumerate(download_jobs):
+            groups.setdefault(self._normalize_remote_path(ftp_path), []).append(index)
+
+        primary_jobs = [download_jobs[indices[0]][:2] for indices in groups.values()]
+        results = self._run_download_jobs(primary_jobs)
+
+        for indices, (downloaded_files, file_paths) in zip(groups.values(), results):
+            primary_dir = download_jobs[indices[0]][1]
+            for index in indices:
+                ftp_path, local_dir, report_row = download_jobs[index]
+                if index != indices[0]:
+                    self._fan_out_files(primary_dir, local_dir, downloaded_files)
+                    self._record_download_result(ftp_path, local_dir, downloaded_files, file_paths)
+                report_row['版本資訊檔案'] = self._format_file_info(downloaded_files, file_paths)
+
+        total_paths = len(download_jobs)
+        unique_paths = len(groups)
+        self.download_summary = {
+            '路徑總數': total_paths,
+            '實際下載路徑數': unique_paths,
+            '重複路徑數': total_paths - unique_paths,
+            '去重比例': f"{(total_paths - unique_paths) / total_paths:.1%}"
+        }
+        self.logger.info(
+            f"下載路徑去重: {total_paths} 筆路徑 -> {unique_paths} 個遠端資料夾 "
+            f"(去重比例 {self.download_summary['去重比例']})"
+        )
+
+    @staticmethod
+    def _normalize_remote_path(ftp_path: str) -> str:
+        """
+        正規化遠端路徑，用於判斷多筆資料是否指向同一個遠端資料夾
+
+        Args:
+            ftp_path: 遠端路徑
+
+        Returns:
+            正規化後的路徑（套用 PATH_REPLACEMENTS、統一斜線、移除結尾斜線）
+        """
+        path = str(ftp_path).strip().replace('\\', '/')
+        for old_path, new_path in config.PATH_REPLACEMENTS.items():
+            path = path.replace(old_path, new_path)
+        path = re.sub(r'/{2,}', '/', path)
+        return path.rstrip('/') or '/'
+
+    def _fan_out_files(self, source_dir: str, target_dir: str, filenames: List[str]) -> None:
+        """
+        將已下載的檔案放到另一個本地資料夾（硬連結，不支援時改為複製）
+
+        Args:
+            source_dir: 已下載檔案所在的資料夾
+            target_dir: 目標資料夾
+            filenames: 要放置的檔案名稱
+        """
+        if os.path.abspath(source_dir) == os.path.abspath(target_dir):
+            return
+
+        for filename in filenames:
+            source_file = os.path.join(source_dir, filename)
+            if not os.path.exists(source_file):
+                continue
+            try:
+                download_cache.link_or_copy(source_file, os.path.join(target_dir, filename))
+            except OSError as e:
+                self.logger.error(f"複製檔案失敗 {source_file} -> {target_dir}: {str(e)}")
+
+    def _record_download_result(self, ftp_path: str, local_dir: str,
+                                downloaded_files: List[str], file_paths: Dict[str, str]) -> None:
+        """記錄單一路徑的下載結果（供子類別統計使用）"""
+        pass
+
     def download_from_excel(self, excel_path: str, output_dir: str = None) -> str:
         """
         從 Excel 檔案讀取 FTP 路徑並下載檔案
@@ -318,6 +532,7 @@ class SFTPDownloader:
         
         # 處理每一筆資料
         report_data = []
+        download_jobs = []  # (ftp_path, local_dir, report_row)
         
         for idx, row in df.iterrows():
             # 處理兩個路徑
@@ -394,36 +609,24 @@ class SFTPDownloader:
                         local_dir = os.path.join(output_dir, f"unknown_{idx}_{path_col}")
                         local_folder_display = f"unknown_{idx}_{path_col}"
                 
-                # 下載檔案
-                downloaded_files, file_paths = self.download_files(ftp_path, local_dir)
-                
-                # 準備檔案資訊字串
-                file_info = []
-                for file in downloaded_files:
-                    if file in file_paths:
-                        path = file_paths[file]
-                        if path == "已存在":
-                            file_info.append(f"{file} (已存在)")
-                        elif path and path != file:
-                            file_info.append(f"{file} ({path})")
-                        else:
-                            file_info.append(file)
-                    else:
-                        file_info.append(file)
-                
-                # 加入報表資料（每個路徑一筆）
-                report_data.append({
+                # 加入報表資料（每個路徑一筆）（版本資訊檔案於下載完成後填入）
+                report_row = {
                     'SN': f"{idx + 1}-{1 if not is_compare else 2}",
                     '模組': module if module else '未知',
                     '路徑類型': '主路徑' if not is_compare else '比較路徑',
                     'FTP路徑': original_path,
                     '本地資料夾': local_folder_display,
-                    '版本資訊檔案': ', '.join(file_info) if file_info else '無'
-                })
+                    '版本資訊檔案': '無'
+                }
+                report_data.append(report_row)
+                download_jobs.append((ftp_path, local_dir, report_row))
+        
+        # 下載所有路徑並填入報表
+        self._fill_download_results(download_jobs)
         
         # 寫入報表
         report_path = self.excel_handler.write_download_report(
-            report_data, output_dir, excel_path
+            report_data, output_dir, excel_path, summary=self.download_summary
         )
         
         return report_path
@@ -467,6 +670,7 @@ class SFTPDownloader:
         
         # 處理每一筆資料
         report_data = []
+        download_jobs = []  # (ftp_path, local_dir, report_row)
         for idx, row in df.iterrows():
             ftp_path = row[ftp_column]
             
@@ -554,31 +758,16 @@ class SFTPDownloader:
                         local_dir = os.path.join(output_dir, top_dir, module)
                         local_folder_display = f"{top_dir}/{module}"
                 
-                # 下載檔案
-                downloaded_files, file_paths = self.download_files(ftp_path, local_dir)
-                
-                # 準備檔案資訊字串
-                file_info = []
-                for file in downloaded_files:
-                    if file in file_paths:
-                        path = file_paths[file]
-                        if path == "已存在":
-                            file_info.append(f"{file} (已存在)")
-                        elif path and path != file:
-                            file_info.append(f"{file} ({path})")
-                        else:
-                            file_info.append(file)
-                    else:
-                        file_info.append(file)
-                
-                # 加入報表資料
-                report_data.append({
+                # 加入報表資料（版本資訊檔案於下載完成後填入）
+                report_row = {
                     'SN': idx + 1,
                     '模組': module.split('/')[0] if '/' in module else module,
                     ftp_column: original_path,
                     '本地資料夾': local_folder_display,
-                    '版本資訊檔案': ', '.join(file_info) if file_info else '無'
-                })
+                    '版本資訊檔案': '無'
+                }
+                report_data.append(report_row)
+                download_jobs.append((ftp_path, local_dir, report_row))
             else:
                 self.logger.warning(f"無法解析 FTP 路徑: {ftp_path}")
                 report_data.append({
@@ -589,9 +778,12 @@ class SFTPDownloader:
                     '版本資訊檔案': '解析失敗'
                 })
         
+        # 下載所有路徑並填入報表
+        self._fill_download_results(download_jobs)
+        
         # 寫入報表
         report_path = self.excel_handler.write_download_report(
-            report_data, output_dir, excel_path
+            report_data, output_dir, excel_path, summary=self.download_summary
         )
         
         return report_path
@@ -0,0 +1,302 @@
+"""
+本地 SFTP 測試伺服器模組
+以 paramiko ServerInterface 在本機提供 SFTP 服務，內容為自動產生的
+DailyBuild / PrebuildFW 目錄樹，可設定目錄深度、雜檔數量與注入延遲，
+用於在沒有正式建置伺服器時量測下載器的效能
+"""
+import os
+import logging
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List
+import paramiko
+from paramiko.sftp import SFTP_OK, SFTP_FAILURE, SFTP_PERMISSION_DENIED
+import utils
+
+logger = utils.setup_logger(__name__)
+
+# 用戶端關閉連線時伺服器端 Transport 會記錄 Socket exception，量測時不需要顯示
+TRANSPORT_LOG_CHANNEL = 'sftp_test_server.transport'
+logging.getLogger(TRANSPORT_LOG_CHANNEL).setLevel(logging.CRITICAL)
+
+class _AuthServer(paramiko.ServerInterface):
+    """只接受固定帳號密碼的 SSH 伺服器介面"""
+
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+
+    def check_auth_password(self, username, password):
+        if username == self.username and password == self.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+class _LocalSFTPHandle(paramiko.SFTPHandle):
+    """唯讀檔案 handle，每次讀取都計入請求數"""
+
+    def __init__(self, fixture: 'LocalSFTPServer', flags: int = 0):
+        super().__init__(flags)
+        self.fixture = fixture
+
+    def read(self, offset, length):
+        self.fixture._record_request(metadata=False)
+        return super().read(offset, length)
+
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+class _LocalSFTPInterface(paramiko.SFTPServerInterface):
+    """將遠端路徑對應到本地根目錄的唯讀 SFTP 介面"""
+
+    def __init__(self, server, fixture: 'LocalSFTPServer', *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.fixture = fixture
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return os.path.normpath('/' + path.replace('\\', '/')).replace('\\', '/')
+
+    def _local_path(self, path: str) -> str:
+        return os.path.join(self.fixture.root, self._normalize(path).lstrip('/'))
+
+    def canonicalize(self, path):
+        self.fixture._record_request()
+        return self._normalize(path)
+
+    def list_folder(self, path):
+        self.fixture._record_request()
+        local_path = self._local_path(path)
+        try:
+            result = []
+            for name in os.listdir(local_path):
+                attrs = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local_path, name)))
+                attrs.filename = name
+                result.append(attrs)
+            return result
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        self.fixture._record_request()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def lstat(self, path):
+        self.fixture._record_request()
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(self._local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        self.fixture._record_request()
+        if flags & (os.O_WRONLY | os.O_RDWR):
+            return SFTP_PERMISSION_DENIED
+        try:
+            handle = _LocalSFTPHandle(self.fixture, flags)
+            handle.readfile = open(self._local_path(path), 'rb')
+            return handle
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def remove(self, path):
+        return SFTP_FAILURE
+
+    def rename(self, oldpath, newpath):
+        return SFTP_FAILURE
+
+    def mkdir(self, path, attr):
+        return SFTP_FAILURE
+
+    def rmdir(self, path):
+        return SFTP_FAILURE
+
+    def chattr(self, path, attr):
+        return SFTP_OK
+
+class LocalSFTPServer:
+    """本地 SFTP 測試伺服器類別"""
+
+    def __init__(self, root: str = None, username: str = 'bench', password: str = 'bench',
+                 latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        初始化測試伺服器
+
+        Args:
+            root: 伺服器根目錄（預設建立暫存目錄，停止時刪除）
+            username: 登入帳號
+            password: 登入密碼
+            latency: 每個目錄 / 開檔 / stat 請求注入的延遲秒數（模擬 VPN 等高延遲連線，讀取請求不延遲）
+            host: 監聽位址
+            port: 監聽連接埠（0 表示自動選擇）
+        """
+        self._owns_root = root is None
+        self.root = root or tempfile.mkdtemp(prefix='sftp_bench_')
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.logger = logger
+
+        self._host_key = None
+        self._socket = None
+        self._accept_thread = None
+        self._transports = []
+        self._running = False
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.read_requests = 0
+
+    def generate_tree(self, db_count: int = 4, rddb_count: int = 4, depth: int = 1,
+                      extra_files: int = 5, manifest_size: int = 64 * 1024) -> List[str]:
+        """
+        產生 DailyBuild / PrebuildFW 測試目錄樹
+
+        Args:
+            db_count: DB 格式路徑數（/DailyBuild/<平台>/DBxxxx_.../<版號>_all_<時間>）
+            rddb_count: RDDB 格式路徑數（/DailyBuild/PrebuildFW/<模組>/RDDB-xxx）
+            depth: 目標檔案所在的子目錄深度（0 表示放在路徑根目錄）
+            extra_files: 每層目錄額外放置的雜檔數
+            manifest_size: manifest 檔案大小（bytes）
+
+        Returns:
+            可放入 Excel 'ftp path' 欄位的遠端路徑列表
+        """
+        paths = []
+
+        for i in range(db_count):
+            version = 500 + i
+            remote_path = f"/DailyBuild/Merlin7/DB{2800 + i}_Merlin7_32Bit_FW/{version}_all_202507312300"
+            self._populate(remote_path, {
+                f'manifest_{version}.xml': self._manifest_content(manifest_size, version),
+                f'Version_{version}.txt': f'version {version}\n'.encode(),
+                'F_Version.txt': f'F_Version {version}\n'.encode()
+            }, depth, extra_files)
+            paths.append(remote_path)
+
+        for i in range(rddb_count):
+            remote_path = f"/DailyBuild/PrebuildFW/module{i}/RDDB-{900 + i}/mp.google-refplus.wave"
+            self._populate(remote_path, {
+                'manifest.xml': self._manifest_content(manifest_size, i),
+                'Version.txt': f'version {i}\n'.encode(),
+                'F_Version.txt': f'F_Version {i}\n'.encode()
+            }, depth, extra_files)
+            paths.append(remote_path)
+
+        return paths
+
+    def _populate(self, remote_path: str, files: Dict[str, bytes], depth: int, extra_files: int) -> None:
+        """在遠端路徑下建立目標檔案與雜檔"""
+        current = os.path.join(self.root, remote_path.lstrip('/'))
+        for level in range(depth + 1):
+            utils.create_directory(current)
+            for n in range(extra_files):
+                with open(os.path.join(current, f'build_{level}_{n}.log'), 'wb') as f:
+                    f.write(b'log\n')
+            if level < depth:
+                current = os.path.join(current, f'out{level}')
+
+        for name, content in files.items():
+            with open(os.path.join(current, name), 'wb') as f:
+                f.write(content)
+
+    @staticmethod
+    def _manifest_content(size: int, seed: int) -> bytes:
+        """產生指定大小的 manifest 內容"""
+        header = b'<?xml version="1.0" encoding="UTF-8"?>\n<manifest>\n'
+        footer = b'</manifest>\n'
+        lines = []
+        total = len(header) + len(footer)
+        n = 0
+        while total < size:
+            line = (f'  <project name="proj/{seed}/{n}" path="src/{n}" '
+                    f'revision="{n:040x}" upstream="main"/>\n').encode()
+            lines.append(line)
+            total += len(line)
+            n += 1
+        return header + b''.join(lines) + footer
+
+    def _record_request(self, metadata: bool = True) -> None:
+        """記錄一次 SFTP 請求（往返），目錄 / 開檔 / stat 請求注入延遲"""
+        with self._stats_lock:
+            self.requests += 1
+            if not metadata:
+                self.read_requests += 1
+        if metadata and self.latency:
+            time.sleep(self.latency)
+
+    def reset_stats(self) -> None:
+        """重設請求計數"""
+        with self._stats_lock:
+            self.requests = 0
+            self.read_requests = 0
+
+    def start(self) -> 'LocalSFTPServer':
+        """開始監聽"""
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(32)
+        self.port = self._socket.getsockname()[1]
+        self._running = True
+
+        self._accept_thread = threading.Thread(target=self._accept_loop, name='sftp-test-server', daemon=True)
+        self._accept_thread.start()
+        self.logger.info(f"本地 SFTP 測試伺服器已啟動: {self.host}:{self.port} (根目錄 {self.root})")
+        return self
+
+    def _accept_loop(self) -> None:
+        """接受連線並為每條連線建立 Transport"""
+        while self._running:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                break
+
+            try:
+                transport = paramiko.Transport(client)
+                transport.set_log_channel(TRANSPORT_LOG_CHANNEL)
+                transport.add_server_key(self._host_key)
+                transport.set_subsystem_handler('sftp', paramiko.SFTPServer, _LocalSFTPInterface, self)
+                transport.start_server(server=_AuthServer(self.username, self.password))
+                self._transports.append(transport)
+            except Exception as e:
+                self.logger.warning(f"建立測試連線失敗: {str(e)}")
+                client.close()
+
+    def stop(self) -> None:
+        """停止伺服器並清除暫存根目錄"""
+        self._running = False
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+        for transport in self._transports:
+            transport.close()
+        self._transports = []
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
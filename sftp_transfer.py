@@ -0,0 +1,162 @@
+"""
+SFTP 檔案傳輸模組
+先寫入暫存檔（.part）並以管線化預先讀取加速，連線中斷後由已寫入的位置續傳，
+完成後以原子性改名放到目標路徑
+"""
+import errno
+import os
+import time
+from typing import Any, Callable, Optional
+import paramiko
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+PARTIAL_SUFFIX = '.part'
+
+class ResumableTransfer:
+    """可續傳的 SFTP 檔案傳輸類別"""
+
+    def __init__(self, prefetch_requests: int = None, chunk_size: int = None,
+                 max_retries: int = None, retry_delay: float = None):
+        """
+        初始化傳輸設定
+
+        Args:
+            prefetch_requests: 同時送出的讀取請求數（預設 config.SFTP_PREFETCH_MAX_REQUESTS）
+            chunk_size: 每次寫入本地檔案的大小（預設 config.SFTP_TRANSFER_CHUNK_SIZE）
+            max_retries: 連線中斷後的最大續傳次數（預設 config.SFTP_TRANSFER_MAX_RETRIES）
+            retry_delay: 第一次續傳前的等待秒數，之後每次加倍（預設 config.SFTP_TRANSFER_RETRY_DELAY）
+        """
+        self.prefetch_requests = prefetch_requests or config.SFTP_PREFETCH_MAX_REQUESTS
+        self.chunk_size = chunk_size or config.SFTP_TRANSFER_CHUNK_SIZE
+        self.max_retries = max_retries if max_retries is not None else config.SFTP_TRANSFER_MAX_RETRIES
+        self.retry_delay = retry_delay if retry_delay is not None else config.SFTP_TRANSFER_RETRY_DELAY
+        self.logger = logger
+
+    def download(self, sftp: paramiko.SFTPClient, remote_path: str, local_path: str,
+                 remote_attrs: Any = None,
+                 reconnect: Callable[[], paramiko.SFTPClient] = None,
+                 callback: Callable[[int, int], None] = None) -> int:
+        """
+        下載遠端檔案
+
+        Args:
+            sftp: SFTP 客戶端
+            remote_path: 遠端檔案路徑
+            local_path: 本地檔案路徑（完成後才會出現）
+            remote_attrs: 遠端檔案的 SFTPAttributes（未提供時會 stat 取得）
+            reconnect: 連線中斷後取得新 SFTP 客戶端的函數（未提供則沿用原連線重試）
+            callback: 進度回調，參數為 (已傳輸 bytes, 檔案總 bytes)
+
+        Returns:
+            檔案大小（bytes）
+        """
+        if getattr(remote_attrs, 'st_size', None) is None:
+            remote_attrs = sftp.stat(remote_path)
+        remote_size = remote_attrs.st_size
+        remote_mtime = getattr(remote_attrs, 'st_mtime', None)
+
+        partial_path = local_path + PARTIAL_SUFFIX
+        utils.create_directory(os.path.dirname(local_path) or '.')
+
+        offset = self._resume_offset(partial_path, remote_size, remote_mtime)
+        if offset:
+            self.logger.info(f"由 {offset}/{remote_size} bytes 續傳: {remote_path}")
+
+        attempt = 0
+        while True:
+            try:
+                offset = self._transfer(sftp, remote_path, partial_path, offset, remote_size, callback)
+                break
+            except Exception as e:
+                if self._is_permanent_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                offset = self._partial_size(partial_path)
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                self.logger.warning(
+                    f"傳輸中斷 {remote_path} ({offset}/{remote_size} bytes)，"
+                    f"{delay} 秒後續傳（第 {attempt} 次）: {str(e)}"
+                )
+                time.sleep(delay)
+                if reconnect:
+                    sftp = reconnect()
+            finally:
+                # 以遠端 mtime 標記暫存檔，下次續傳時可確認仍為同一版本
+                self._stamp_partial(partial_path, remote_mtime)
+
+        if offset != remote_size:
+            os.remove(partial_path)
+            raise IOError(f"檔案大小不符 {remote_path}: 預期 {remote_size} bytes，實際 {offset} bytes")
+
+        os.replace(partial_path, local_path)
+        return remote_size
+
+    def _transfer(self, sftp: paramiko.SFTPClient, remote_path: str, partial_path: str,
+                  offset: int, remote_size: int,
+                  callback: Optional[Callable[[int, int], None]]) -> int:
+        """由 offset 開始傳輸到暫存檔，回傳最後寫入的位置"""
+        with sftp.open(remote_path, 'rb') as remote_fp:
+            if offset:
+                remote_fp.seek(offset)
+            # 一次送出多個讀取請求，避免每 32KB 等待一次往返
+            remote_fp.prefetch(remote_size, max_concurrent_requests=self.prefetch_requests)
+
+            # 先以起始位置呼叫回調，之後每次呼叫的差值即為實際傳輸的位元組
+            if callback:
+                callback(offset, remote_size)
+
+            with open(partial_path, 'ab' if offset else 'wb') as local_fp:
+                while True:
+                    data = remote_fp.read(self.chunk_size)
+                    if not data:
+                        break
+                    local_fp.write(data)
+                    offset += len(data)
+                    if callback:
+                        callback(offset, remote_size)
+
+        return offset
+
+    def _resume_offset(self, partial_path: str, remote_size: int, remote_mtime: Optional[float]) -> int:
+        """取得可續傳的位置，暫存檔不屬於同一版本時重新下載"""
+        try:
+            partial_stat = os.stat(partial_path)
+        except OSError:
+            return 0
+
+        if (remote_mtime is None or int(partial_stat.st_mtime) != int(remote_mtime)
+                or partial_stat.st_size > remote_size):
+            os.remove(partial_path)
+            return 0
+
+        return partial_stat.st_size
+
+    @staticmethod
+    def _partial_size(partial_path: str) -> int:
+        """暫存檔目前大小"""
+        try:
+            return os.path.getsize(partial_path)
+        except OSError:
+            return 0
+
+    def _stamp_partial(self, partial_path: str, remote_mtime: Optional[float]) -> None:
+        """將暫存檔的 mtime 設為遠端檔案的 mtime"""
+        if remote_mtime is None or not os.path.exists(partial_path):
+            return
+        try:
+            os.utime(partial_path, (remote_mtime, remote_mtime))
+        except OSError as e:
+            self.logger.debug(f"無法設定暫存檔時間 {partial_path}: {str(e)}")
+
+    @staticmethod
+    def _is_permanent_error(error: Exception) -> bool:
+        """檔案不存在、權限不足或本地空間不足等重試也無法解決的錯誤"""
+        if isinstance(error, (FileNotFoundError, PermissionError)):
+            return True
+        return isinstance(error, OSError) and error.errno == errno.ENOSPC
+
+# 全域傳輸實例
+resumable_transfer = ResumableTransfer()
@@ -3,8 +3,10 @@ SFTP Web 下載器 - 包裝原始 SFTPDownloader 以支援 Web 應用
 """
 import os
 import logging
-from typing import List, Dict, Any, Tuple
+import threading
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from sftp_downloader import SFTPDownloader
+from transfer_progress import TransferProgress
 import config
 import utils
 import pandas as pd
@@ -32,6 +34,8 @@ class SFTPWebDownloader(SFTPDownloader):
         self.current_progress = 0
         self.invalid_paths_count = 0
         self.invalid_paths_list = []  # 記錄無效路徑詳情
+        self._stats_lock = threading.Lock()
+        self.transfer_progress = TransferProgress(self._emit_transfer_progress)
         
     def set_progress_callback(self, callback):
         """設定進度回調函數"""
@@ -123,6 +127,7 @@ class SFTPWebDownloader(SFTPDownloader):
         
         # 處理每一筆資料
         report_data = []
+        download_jobs = []  # (ftp_path, local_dir, report_row)
         for idx, row in df.iterrows():
             ftp_path = row[ftp_column]
             
@@ -197,31 +202,16 @@ class SFTPWebDownloader(SFTPDownloader):
                         local_dir = os.path.join(output_dir, top_dir, module)
                         local_folder_display = f"{top_dir}/{module}"
                 
-                # 下載檔案
-                downloaded_files, file_paths = self.download_files(ftp_path, local_dir)
-                
-                # 準備檔案資訊字串
-                file_info = []
-                for file in downloaded_files:
-                    if file in file_paths:
-                        path = file_paths[file]
-                        if path == "已存在":
-                            file_info.append(f"{file} (已存在)")
-                        elif path and path != file:
-                            file_info.append(f"{file} ({path})")
-                        else:
-                            file_info.append(file)
-                    else:
-                        file_info.append(file)
-                
-                # 加入報表資料
-                report_data.append({
+                # 加入報表資料（版本資訊檔案於下載完成後填入）
+                report_row = {
                     'SN': idx + 1,
                     '模組': module.split('/')[0] if '/' in module else module,
                     ftp_column: original_path,
                     '本地資料夾': local_folder_display,
-                    '版本資訊檔案': ', '.join(file_info) if file_info else '無'
-                })
+                    '版本資訊檔案': '無'
+                }
+                report_data.append(report_row)
+                download_jobs.append((ftp_path, local_dir, report_row))
             else:
                 self.logger.warning(f"無法解析 FTP 路徑: {ftp_path}")
                 report_data.append({
@@ -232,9 +222,12 @@ class SFTPWebDownloader(SFTPDownloader):
                     '版本資訊檔案': '解析失敗'
                 })
         
+        # 下載所有路徑並填入報表
+        self._fill_download_results(download_jobs)
+        
         # 寫入報表
         report_path = self.excel_handler.write_download_report(
-            report_data, output_dir, excel_path
+            report_data, output_dir, excel_path, summary=self.download_summary
         )
         
         return report_path
@@ -248,6 +241,7 @@ class SFTPWebDownloader(SFTPDownloader):
         
         # 處理每一筆資料
         report_data = []
+        download_jobs = []  # (ftp_path, local_dir, report_row)
         
         for idx, row in df.iterrows():
             # 處理兩個路徑
@@ -323,36 +317,24 @@ class SFTPWebDownloader(SFTPDownloader):
                         local_dir = os.path.join(output_dir, f"unknown_{idx}_{path_col}")
                         local_folder_display = f"unknown_{idx}_{path_col}"
                 
-                # 下載檔案
-                downloaded_files, file_paths = self.download_files(ftp_path, local_dir)
-                
-                # 準備檔案資訊字串
-                file_info = []
-                for file in downloaded_files:
-                    if file in file_paths:
-                        path = file_paths[file]
-                        if path == "已存在":
-                            file_info.append(f"{file} (已存在)")
-                        elif path and path != file:
-                            file_info.append(f"{file} ({path})")
-                        else:
-                            file_info.append(file)
-                    else:
-                        file_info.append(file)
-                
-                # 加入報表資料
-                report_data.append({
+                # 加入報表資料（版本資訊檔案於下載完成後填入）
+                report_row = {
                     'SN': f"{idx + 1}-{2 if is_compare else 1}",
                     '模組': module if module else '未知',
                     '路徑類型': '比較路徑' if is_compare else '主路徑',
                     'FTP路徑': original_path,
                     '本地資料夾': local_folder_display,
-                    '版本資訊檔案': ', '.join(file_info) if file_info else '無'
-                })
+                    '版本資訊檔案': '無'
+                }
+                report_data.append(report_row)
+                download_jobs.append((ftp_path, local_dir, report_row))
+        
+        # 下載所有路徑並填入報表
+        self._fill_download_results(download_jobs)
         
         # 寫入報表
         report_path = self.excel_handler.write_download_report(
-            report_data, output_dir, excel_path
+            report_data, output_dir, excel_path, summary=self.download_summary
         )
         
         return report_path
@@ -369,63 +351,90 @@ class SFTPWebDownloader(SFTPDownloader):
             self.logger.error(f"下載過程發生錯誤: {str(e)}")
             return [], {}
         
-        # 統計結果
-        files_found = 0
+        self._record_download_result(ftp_path, local_dir, downloaded_files, file_paths)
+        
+        return downloaded_files, file_paths
+    
+    def _record_download_result(self, ftp_path: str, local_dir: str,
+                                downloaded_files: List[str], file_paths: Dict[str, str]) -> None:
+        """統計單一路徑的下載結果並更新進度"""
+        # 平行下載時多個執行緒會同時更新
+        with self._stats_lock:
+            files_found = 0
         
-        for file in config.TARGET_FILES:
-            if file in downloaded_files:
-                files_found += 1
+            for file in config.TARGET_FILES:
+                if file in downloaded_files:
+                    files_found += 1
                 
-                if file in file_paths and file_paths[file] == "已存在":
-                    # 本地已存在，計入跳過
-                    self.stats['skipped'] += 1
-                    self.skipped_files_list.append({
-                        'name': file,
-                        'path': os.path.join(local_dir, file),
-                        'reason': '檔案已存在',
-                        'ftp_path': ftp_path
-                    })
-                else:
-                    # 成功下載
-                    self.stats['downloaded'] += 1
-                    self.downloaded_files_list.append({
-                        'name': file,
-                        'path': os.path.join(local_dir, file),
-                        'ftp_path': ftp_path
-                    })
+                    if file in file_paths and file_paths[file] == "已存在":
+                        # 本地已存在，計入跳過
+                        self.stats['skipped'] += 1
+                        self.skipped_files_list.append({
+                            'name': file,
+                            'path': os.path.join(local_dir, file),
+                            'reason': '檔案已存在',
+                            'ftp_path': ftp_path
+                        })
+                    else:
+                        # 成功下載
+                        self.stats['downloaded'] += 1
+                        self.downloaded_files_list.append({
+                            'name': file,
+                            'path': os.path.join(local_dir, file),
+                            'ftp_path': ftp_path
+                        })
         
-        # 如果有效路徑但沒有找到任何檔案，計為 1 個失敗
-        if files_found == 0:
-            self.stats['failed'] += 1
-            self.failed_files_list.append({
-                'name': '路徑無檔案',
-                'path': local_dir,
-                'reason': '路徑存在但沒有找到任何目標檔案',
-                'ftp_path': ftp_path
-            })
-            self.logger.warning(f"路徑存在但沒有找到任何檔案: {ftp_path}")
+            # 如果有效路徑但沒有找到任何檔案，計為 1 個失敗
+            if files_found == 0:
+                self.stats['failed'] += 1
+                self.failed_files_list.append({
+                    'name': '路徑無檔案',
+                    'path': local_dir,
+                    'reason': '路徑存在但沒有找到任何目標檔案',
+                    'ftp_path': ftp_path
+                })
+                self.logger.warning(f"路徑存在但沒有找到任何檔案: {ftp_path}")
         
-        # 更新總數
-        self.stats['total'] = self.stats['downloaded'] + self.stats['skipped'] + self.stats['failed']
+            # 更新總數
+            self.stats['total'] = self.stats['downloaded'] + self.stats['skipped'] + self.stats['failed']
         
-        # 更新進度
-        if self.progress_callback and self.stats['total'] > 0:
-            progress = min(20 + (self.stats['total'] / max(self.stats['total'], 1)) * 70, 90)
-            self.current_progress = progress
-            
-            self.progress_callback(
-                progress, 
-                'downloading', 
-                f'已處理 {self.stats["total"]} 個項目',
-                stats=self.stats.copy(),
-                files={
-                    'downloaded': self.downloaded_files_list.copy(),
-                    'skipped': self.skipped_files_list.copy(),
-                    'failed': self.failed_files_list.copy()
-                }
-            )
+        # 更新進度（與位元組進度一起合併送出）
+        self.transfer_progress.path_done()
+    
+    def _transfer_callback(self) -> Optional[Callable[[int, int], None]]:
+        """單一檔案的位元組進度回調"""
+        return self.transfer_progress.file_callback()
+    
+    def _emit_transfer_progress(self, transfer: Dict[str, Any]) -> None:
+        """將合併後的進度送給進度回調"""
+        if not self.progress_callback:
+            return
         
-        return downloaded_files, file_paths
+        paths_total = transfer['paths_total']
+        if paths_total:
+            progress = min(5 + (transfer['paths_done'] / paths_total) * 85, 90)
+            message = f'已處理 {transfer["paths_done"]}/{paths_total} 個路徑'
+        else:
+            progress = max(self.current_progress, 5)
+            message = f'已處理 {transfer["paths_done"]} 個路徑'
+        self.current_progress = progress
+        
+        with self._stats_lock:
+            stats = self.stats.copy()
+            files = {
+                'downloaded': self.downloaded_files_list.copy(),
+                'skipped': self.skipped_files_list.copy(),
+                'failed': self.failed_files_list.copy()
+            }
+        
+        self.progress_callback(
+            progress,
+            'downloading',
+            message,
+            stats=stats,
+            files=files,
+            transfer=transfer
+        )
     
     def download_from_excel_with_progress(self, excel_path: str, output_dir: str = None):
         """從 Excel 或 CSV 下載並提供進度更新"""
@@ -500,6 +509,7 @@ class SFTPWebDownloader(SFTPDownloader):
                 )
             
             # 呼叫下載方法
+            self.transfer_progress.reset(valid_paths)
             report_path = self.download_from_excel(excel_path, output_dir)
             self.last_report_path = report_path
             
@@ -527,7 +537,8 @@ class SFTPWebDownloader(SFTPDownloader):
                         'downloaded': self.downloaded_files_list,
                         'skipped': self.skipped_files_list,
                         'failed': self.failed_files_list
-                    }
+                    },
+                    transfer=self.transfer_progress.snapshot()
                 )
                 
             return report_path
@@ -17,6 +17,7 @@ let currentModalFiles = []; // 當前模態框顯示的檔案
 let currentSortColumn = null;
 let currentSortOrder = 'asc';
 let uploadedExcelInfo = null; // 儲存上傳的Excel資訊
+let lastProgressMessage = null; // 最後一筆記錄到日誌的進度訊息
 
 // 比對結果相關變數（新增）
 let compareResults = null;
@@ -2401,6 +2402,7 @@ async function startDownload() {
         document.getElementById('downloadProgress').classList.remove('hidden');
         
         clearLog();
+        lastProgressMessage = null;
         
         let requestData = {
             sftp_config: sftpConfig,
@@ -2572,7 +2574,7 @@ function handleDownloadProgress(event) {
 
 // 監聽下載進度更新
 function updateDownloadProgress(data) {
-    const { progress, status, message, stats, files, results } = data;
+    const { progress, status, message, stats, files, results, transfer } = data;
     
     // 確保進度不超過 100%
     const safeProgress = Math.min(Math.max(0, progress || 0), 100);
@@ -2603,8 +2605,16 @@ function updateDownloadProgress(data) {
         failedFilesList = files.failed || [];
     }
     
-    // 添加日誌
-    addLog(message, status);
+    // 更新傳輸速率與預估剩餘時間
+    if (transfer) {
+        updateTransferInfo(transfer);
+    }
+    
+    // 添加日誌（傳輸進度更新頻繁，相同訊息不重複記錄）
+    if (message !== lastProgressMessage) {
+        lastProgressMessage = message;
+        addLog(message, status);
+    }
     
     // 檢查是否有 Excel 改名訊息
     if (message && message.includes('Excel 檔案已另存為')) {
@@ -2632,6 +2642,29 @@ function updateDownloadProgress(data) {
     }
 }
 
+// 更新傳輸資訊
+function updateTransferInfo(transfer) {
+    const transferInfo = document.getElementById('transferInfo');
+    if (!transferInfo) return;
+    
+    const parts = [`已傳輸 ${utils.formatFileSize(transfer.bytes_done || 0)}`];
+    if (transfer.throughput > 0) {
+        parts.push(`${utils.formatFileSize(Math.round(transfer.throughput))}/s`);
+    }
+    if (transfer.eta !== null && transfer.eta !== undefined) {
+        parts.push(`預估剩餘 ${formatDuration(transfer.eta)}`);
+    }
+    transferInfo.textContent = parts.join(' • ');
+}
+
+// 格式化秒數
+function formatDuration(seconds) {
+    const total = Math.max(0, Math.round(seconds));
+    const minutes = Math.floor(total / 60);
+    const secs = total % 60;
+    return minutes > 0 ? `${minutes} 分 ${secs} 秒` : `${secs} 秒`;
+}
+
 // 更新統計數據
 function updateStats(stats) {
     if (!stats) {
@@ -3243,6 +3276,12 @@ function resetDownloadForm() {
     }
     
     clearLog();
+    lastProgressMessage = null;
+    
+    const transferInfo = document.getElementById('transferInfo');
+    if (transferInfo) {
+        transferInfo.textContent = '';
+    }
     
     // 重置進度
     const progressFill = document.getElementById('progressFill');
@@ -157,6 +157,7 @@ function initializeSearch() {
     if (searchInput) {
         searchInput.addEventListener('input', debounce(function(e) {
             searchTerm = e.target.value.toLowerCase();
+            serverPage = 1;
             if (currentSheet) {
                 renderDataTable(currentData[currentSheet]);
             }
@@ -180,9 +181,10 @@ function debounce(func, wait) {
 // 修改 loadPivotData 函數以支援情境
 async function loadPivotData() {
     // 根據情境構建 API URL
-    let apiUrl = `/api/pivot-data/${taskId}`;
+    // paged=1：大型資料表只載入欄位與概要，資料列改由伺服器端分頁
+    let apiUrl = `/api/pivot-data/${taskId}?paged=1`;
     if (currentScenario !== 'all') {
-        apiUrl += `?scenario=${currentScenario}`;
+        apiUrl += `&scenario=${currentScenario}`;
     }
     
     // 載入該情境的專屬資料
@@ -191,6 +193,7 @@ async function loadPivotData() {
     
     // 更新頁面顯示
     currentData = data;
+    fullPivotData = null;
     updatePageHeader(); // 顯示當前情境名稱
     populateSheetSelector(data);
 
@@ -594,7 +597,8 @@ function loadSheet(sheetName) {
         return;
     }
     
-    console.log(`資料表 ${sheetName} 有 ${sheetData.data ? sheetData.data.length : 0} 筆資料`);
+    console.log(`資料表 ${sheetName} 有 ${sheetData.paged ? sheetData.total : (sheetData.data ? sheetData.data.length : 0)} 筆資料`);
+    serverPage = 1;
     
     document.getElementById('sheetSelector').value = sheetName;
     
@@ -661,6 +665,17 @@ function getColumnWidth(columnName) {
 function renderDataTable(sheetData) {
     console.log('開始渲染資料表格', sheetData);
     
+    // 大型資料表由伺服器篩選、排序後取得一頁，再以同樣方式繪製
+    if (sheetData && sheetData.paged) {
+        renderServerDataTable(sheetData);
+        return;
+    }
+    const serverResult = sheetData ? sheetData.serverPage : null;
+    const totalRows = serverResult ? serverResult.total : (sheetData && sheetData.data ? sheetData.data.length : 0);
+    if (!serverResult) {
+        renderServerPager(null);
+    }
+    
     // 取得 DOM 元素 - 支援新舊結構
     let thead, tbody;
     
@@ -695,7 +710,7 @@ function renderDataTable(sheetData) {
     tbody.innerHTML = '';
     
     // 檢查是否有資料
-    if (!sheetData || !sheetData.data || sheetData.data.length === 0) {
+    if (totalRows === 0) {
         tbody.innerHTML = `
             <tr>
                 <td colspan="100%" style="padding: 0; border: none;">
@@ -724,12 +739,12 @@ function renderDataTable(sheetData) {
         }
     }
     
-    // 先篩選再搜尋
-    let filteredData = applyDataFilters(sheetData.data);
-    let searchMatches = 0;
+    // 先篩選再搜尋（伺服器端分頁的資料已篩選）
+    let filteredData = serverResult ? sheetData.data : applyDataFilters(sheetData.data);
+    let searchMatches = serverResult ? serverResult.filtered : 0;
     
     // 如果有搜尋詞，進一步過濾
-    if (searchTerm) {
+    if (searchTerm && !serverResult) {
         filteredData = filteredData.filter(row => {
             const matches = rowMatchesSearch(row, columns, searchTerm);
             if (matches) searchMatches++;
@@ -738,7 +753,7 @@ function renderDataTable(sheetData) {
     }
     
     // 更新統計資訊
-    updateTableStats(sheetData.data.length, filteredData.length, searchMatches);
+    updateTableStats(totalRows, serverResult ? serverResult.filtered : filteredData.length, searchMatches);
     
     // 建立表頭
     const headerRow = document.createElement('tr');
@@ -930,13 +945,13 @@ function renderDataTable(sheetData) {
                 </td>
             </tr>
         `;
-        updateTableStats(sheetData.data.length, 0, 0);
+        updateTableStats(totalRows, 0, 0);
     }
 
     // 控制浮動篩選按鈕的顯示
     const fabFilter = document.getElementById('fabFilter');
     if (fabFilter) {
-        if (sheetData.data && sheetData.data.length > 0) {
+        if (totalRows > 0) {
             fabFilter.style.display = 'flex';
         } else {
             fabFilter.style.display = 'none';
@@ -1420,6 +1435,433 @@ function updateTableStats(total, displayed, searchMatches) {
     `;
 }
 
+// ===== 大型資料表：伺服器端分頁與彙總 =====
+// 超過伺服器設定筆數的資料表（paged: true）只載入欄位與概要，
+// 資料列由 /api/pivot-rows 分頁取得，樞紐分析由 /api/pivot-aggregate 計算
+const SERVER_PAGE_SIZE = 100;
+let serverPage = 1;
+let serverRequestId = 0;
+let fullPivotData = null;
+
+// 伺服器端彙總支援的方式（名稱與 pivotUI 相同）
+const SERVER_PIVOT_AGGREGATORS = {
+    'Count': '計數',
+    'Count Unique Values': '計數唯一值',
+    'Sum': '總和',
+    'Integer Sum': '整數總和',
+    'Average': '平均',
+    'Minimum': '最小值',
+    'Maximum': '最大值'
+};
+
+// 取得伺服器端分頁資料
+async function fetchServerRows(sheetName, page) {
+    const params = new URLSearchParams({
+        scenario: currentScenario,
+        sheet: sheetName,
+        page: page,
+        page_size: SERVER_PAGE_SIZE,
+        search: searchTerm,
+        filters: JSON.stringify(filters)
+    });
+    const sortEntry = Object.entries(sortOrder)[0];
+    if (sortEntry) {
+        params.set('sort', sortEntry[0]);
+        params.set('order', sortEntry[1]);
+    }
+    
+    const response = await fetch(`/api/pivot-rows/${encodeURIComponent(taskId)}?${params}`);
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error || `HTTP ${response.status}`);
+    }
+    return result;
+}
+
+// 取得伺服器端彙總結果（頁面篩選器的條件一併套用）
+async function fetchServerAggregate(sheetName, config) {
+    const response = await fetch(`/api/pivot-aggregate/${encodeURIComponent(taskId)}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            scenario: currentScenario,
+            sheet: sheetName,
+            filters: filters,
+            ...config
+        })
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error || `HTTP ${response.status}`);
+    }
+    return result;
+}
+
+// 取得完整資料（離線匯出等需要全部資料列時使用）
+async function getFullPivotData() {
+    if (!fullPivotData) {
+        let apiUrl = `/api/pivot-data/${taskId}`;
+        if (currentScenario !== 'all') {
+            apiUrl += `?scenario=${currentScenario}`;
+        }
+        const response = await fetch(apiUrl);
+        fullPivotData = await response.json();
+    }
+    return fullPivotData;
+}
+
+// 繪製伺服器端分頁的資料表
+async function renderServerDataTable(sheetData) {
+    const sheetName = currentSheet;
+    const requestId = ++serverRequestId;
+    
+    try {
+        const result = await fetchServerRows(sheetName, serverPage);
+        
+        // 等待期間切換資料表或重新查詢時，捨棄舊的回應
+        if (requestId !== serverRequestId || sheetName !== currentSheet) return;
+        
+        serverPage = result.page;
+        renderDataTable({
+            columns: sheetData.columns,
+            data: result.rows,
+            serverPage: result
+        });
+        renderServerPager(result);
+    } catch (error) {
+        console.error('載入資料列失敗:', error);
+        showToast(`載入資料失敗：${error.message}`, 'error');
+    }
+}
+
+// 分頁控制列（result 為 null 時移除）
+function renderServerPager(result) {
+    let pager = document.getElementById('serverPager');
+    
+    if (!result) {
+        if (pager) pager.remove();
+        return;
+    }
+    
+    if (!pager) {
+        pager = document.createElement('div');
+        pager.id = 'serverPager';
+        pager.className = 'server-pager';
+        document.getElementById('tableView').appendChild(pager);
+    }
+    
+    const first = result.page <= 1;
+    const last = result.page >= result.pages;
+    pager.innerHTML = `
+        <button class="btn btn-outline btn-sm" data-page="1" ${first ? 'disabled' : ''}>
+            <i class="fas fa-angle-double-left"></i>
+        </button>
+        <button class="btn btn-outline btn-sm" data-page="${result.page - 1}" ${first ? 'disabled' : ''}>
+            <i class="fas fa-angle-left"></i>
+        </button>
+        <span class="server-pager-info">
+            第 <span class="table-stat-value">${result.page}</span> / ${result.pages} 頁，共 ${result.filtered.toLocaleString()} 筆
+        </span>
+        <button class="btn btn-outline btn-sm" data-page="${result.page + 1}" ${last ? 'disabled' : ''}>
+            <i class="fas fa-angle-right"></i>
+        </button>
+        <button class="btn btn-outline btn-sm" data-page="${result.pages}" ${last ? 'disabled' : ''}>
+            <i class="fas fa-angle-double-right"></i>
+        </button>
+    `;
+    
+    pager.querySelectorAll('button[data-page]').forEach(button => {
+        button.onclick = () => {
+            serverPage = parseInt(button.dataset.page, 10);
+            renderDataTable(currentData[currentSheet]);
+            const bodyContainer = document.querySelector('.table-body-container');
+            if (bodyContainer) bodyContainer.scrollTop = 0;
+        };
+    });
+}
+
+// 伺服器端分頁資料表的統計卡片（使用伺服器計算的欄位概要）
+function renderServerStatistics(sheetData) {
+    const statsGrid = document.getElementById('statsGrid');
+    const facetCount = (column, value) => {
+        const entry = (sheetData.facets[column] || []).find(([v]) => v === value);
+        return entry ? entry[1] : 0;
+    };
+    
+    const stats = [
+        {
+            label: '總筆數',
+            value: sheetData.total,
+            icon: 'fa-list',
+            color: 'blue'
+        }
+    ];
+    
+    if (currentSheet === 'revision_diff') {
+        stats.push({
+            label: '不同版號',
+            value: sheetData.total,
+            icon: 'fa-code-branch',
+            color: 'warning'
+        });
+        stats.push({
+            label: '模組數',
+            value: sheetData.distinct.module || 0,
+            icon: 'fa-cube',
+            color: 'purple'
+        });
+        if (facetCount('has_wave', 'Y') > 0) {
+            stats.push({
+                label: '包含 Wave',
+                value: facetCount('has_wave', 'Y'),
+                icon: 'fa-check-circle',
+                color: 'success'
+            });
+        }
+        if (facetCount('has_wave', 'N') > 0) {
+            stats.push({
+                label: '缺少 Wave',
+                value: facetCount('has_wave', 'N'),
+                icon: 'fa-exclamation-triangle',
+                color: 'warning'
+            });
+        }
+    } else if (currentSheet === 'branch_error') {
+        stats.push({
+            label: '缺少 Wave',
+            value: facetCount('has_wave', 'N'),
+            icon: 'fa-exclamation-triangle',
+            color: 'danger'
+        });
+    } else if (currentSheet === 'lost_project' || currentSheet === '新增/刪除專案') {
+        stats.push({
+            label: '新增專案',
+            value: facetCount('狀態', '新增'),
+            icon: 'fa-plus-circle',
+            color: 'success'
+        });
+        stats.push({
+            label: '刪除專案',
+            value: facetCount('狀態', '刪除'),
+            icon: 'fa-minus-circle',
+            color: 'danger'
+        });
+    } else {
+        stats.push({
+            label: '欄位數',
+            value: sheetData.columns.length,
+            icon: 'fa-columns',
+            color: 'blue'
+        });
+    }
+    
+    stats.forEach(stat => {
+        const card = document.createElement('div');
+        card.className = `stat-card ${stat.color || ''}`;
+        card.innerHTML = `
+            <div class="stat-icon">
+                <i class="fas ${stat.icon}"></i>
+            </div>
+            <div class="stat-content">
+                <div class="stat-value">${stat.value.toLocaleString()}</div>
+                <div class="stat-label">${stat.label}</div>
+            </div>
+        `;
+        statsGrid.appendChild(card);
+    });
+}
+
+// 伺服器端分頁資料表的圖表：由伺服器分組計數，每組以 __count 代表筆數
+async function drawServerDataCharts(sheetData) {
+    const sheetName = currentSheet;
+    let rows;
+    
+    if (sheetName === 'revision_diff') {
+        rows = ['module'];
+    } else if (sheetName === 'branch_error') {
+        rows = ['module', 'has_wave'];
+    } else if (sheetName === 'lost_project' || sheetName === '新增/刪除專案') {
+        rows = ['狀態'];
+    } else {
+        const column = sheetData.columns.find(col =>
+            sheetData.facets[col] && col !== 'path' && !col.includes('content'));
+        rows = column ? [column] : [];
+    }
+    rows = rows.filter(col => sheetData.columns.includes(col));
+    if (rows.length === 0) return;
+    
+    try {
+        // 與一般資料表相同，圖表以全部資料計算（不套用篩選條件）
+        const result = await fetchServerAggregate(sheetName, { rows: rows, cols: [], aggregatorName: 'Count', filters: {} });
+        if (sheetName !== currentSheet) return;
+        
+        const groups = result.row_keys.map((key, index) => {
+            const row = { __count: result.row_totals[index] };
+            rows.forEach((col, i) => { row[col] = key[i]; });
+            return row;
+        });
+        drawDataCharts({ columns: rows, data: groups });
+    } catch (error) {
+        console.error('載入圖表資料失敗:', error);
+    }
+}
+
+// 伺服器端彙總的樞紐分析表
+function renderServerPivotTable(sheetData) {
+    const container = document.getElementById('pivotContainer');
+    pivotData = null;
+    
+    const columnOptions = sheetData.columns
+        .map(col => `<option value="${escapeHtml(col)}">${escapeHtml(col)}</option>`)
+        .join('');
+    const aggregatorOptions = Object.entries(SERVER_PIVOT_AGGREGATORS)
+        .map(([name, label]) => `<option value="${name}">${label}</option>`)
+        .join('');
+    
+    container.innerHTML = `
+        <div class="server-pivot">
+            <div class="server-pivot-notice">
+                <i class="fas fa-server"></i>
+                此資料表共 ${sheetData.total.toLocaleString()} 筆，樞紐分析由伺服器計算（會套用目前的篩選條件）
+            </div>
+            <div class="server-pivot-controls">
+                <label>列
+                    <select id="serverPivotRows" multiple>${columnOptions}</select>
+                </label>
+                <label>欄
+                    <select id="serverPivotCols" multiple>${columnOptions}</select>
+                </label>
+                <label>彙總方式
+                    <select id="serverPivotAggregator">${aggregatorOptions}</select>
+                </label>
+                <label>數值欄位
+                    <select id="serverPivotVals">${columnOptions}</select>
+                </label>
+                <button class="btn btn-primary btn-sm" id="serverPivotApply">
+                    <i class="fas fa-calculator"></i> 計算
+                </button>
+            </div>
+            <div id="serverPivotResult"></div>
+        </div>
+    `;
+    
+    document.getElementById('serverPivotApply').onclick = () => updateServerPivotTable();
+    updateServerPivotTable();
+}
+
+// 依目前選擇的欄位向伺服器取得彙總結果並繪製
+async function updateServerPivotTable() {
+    const sheetName = currentSheet;
+    const resultContainer = document.getElementById('serverPivotResult');
+    const selected = id => Array.from(document.getElementById(id).selectedOptions).map(opt => opt.value);
+    const aggregatorName = document.getElementById('serverPivotAggregator').value;
+    
+    const config = {
+        rows: selected('serverPivotRows'),
+        cols: selected('serverPivotCols'),
+        aggregatorName: aggregatorName,
+        vals: aggregatorName === 'Count' ? [] : [document.getElementById('serverPivotVals').value]
+    };
+    
+    resultContainer.innerHTML = `
+        <div class="loading">
+            <i class="fas fa-spinner fa-spin"></i>
+            <p>計算中...</p>
+        </div>
+    `;
+    
+    try {
+        const result = await fetchServerAggregate(sheetName, config);
+        if (sheetName !== currentSheet) return;
+        resultContainer.innerHTML = buildServerPivotTableHtml(result);
+    } catch (error) {
+        console.error('樞紐分析計算失敗:', error);
+        resultContainer.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                <h3>樞紐分析計算失敗</h3>
+                <p>${escapeHtml(error.message)}</p>
+            </div>
+        `;
+    }
+}
+
+// 以 pivotUI 相同的 pvtTable 結構產生表格（匯出功能可直接使用）
+function buildServerPivotTableHtml(result) {
+    const formatValue = value => {
+        if (value === null || value === undefined) return '';
+        return typeof value === 'number' ? value.toLocaleString(undefined, { maximumFractionDigits: 2 }) : escapeHtml(value);
+    };
+    const cellMap = new Map(result.cells.map(([r, c, value]) => [`${r},${c}`, value]));
+    const rowAttrs = result.rows;
+    const colAttrs = result.cols;
+    const colKeys = result.col_keys;
+    
+    let html = '<table class="pvtTable"><thead>';
+    
+    // 欄標題（每個欄屬性一列）
+    colAttrs.forEach((attr, level) => {
+        html += '<tr>';
+        if (level === 0 && rowAttrs.length > 0) {
+            html += `<th colspan="${rowAttrs.length}" rowspan="${colAttrs.length}"></th>`;
+        }
+        html += `<th class="pvtAxisLabel">${escapeHtml(attr)}</th>`;
+        colKeys.forEach(key => {
+            html += `<th class="pvtColLabel">${escapeHtml(key[level])}</th>`;
+        });
+        if (level === 0) {
+            html += `<th class="pvtTotalLabel pvtRowTotalLabel" rowspan="${colAttrs.length + (rowAttrs.length ? 1 : 0)}">總計</th>`;
+        }
+        html += '</tr>';
+    });
+    
+    // 列屬性標題
+    if (rowAttrs.length > 0) {
+        html += '<tr>';
+        rowAttrs.forEach(attr => {
+            html += `<th class="pvtAxisLabel">${escapeHtml(attr)}</th>`;
+        });
+        html += `<th>${colAttrs.length ? '' : '總計'}</th>`;
+        html += '</tr>';
+    }
+    html += '</thead><tbody>';
+    
+    result.row_keys.forEach((rowKey, r) => {
+        html += '<tr>';
+        rowKey.forEach((value, i) => {
+            // 最後一個列標題延伸到欄屬性標題下方
+            const colspan = i === rowKey.length - 1 && colAttrs.length > 0 ? 2 : 1;
+            html += `<th class="pvtRowLabel" colspan="${colspan}">${escapeHtml(value)}</th>`;
+        });
+        if (rowAttrs.length === 0) {
+            html += '<th class="pvtRowLabel"></th>';
+        }
+        if (colAttrs.length > 0) {
+            colKeys.forEach((colKey, c) => {
+                html += `<td class="pvtVal">${formatValue(cellMap.get(`${r},${c}`))}</td>`;
+            });
+        }
+        html += `<td class="pvtTotal rowTotal">${formatValue(result.row_totals[r])}</td>`;
+        html += '</tr>';
+    });
+    
+    // 欄總計
+    if (colAttrs.length > 0) {
+        html += `<tr><th class="pvtTotalLabel pvtColTotalLabel" colspan="${rowAttrs.length + 1}">總計</th>`;
+        result.col_totals.forEach(value => {
+            html += `<td class="pvtTotal colTotal">${formatValue(value)}</td>`;
+        });
+        html += `<td class="pvtGrandTotal">${formatValue(result.total)}</td></tr>`;
+    }
+    html += '</tbody></table>';
+    
+    if (result.truncated) {
+        html += `<p class="text-muted">分組過多，只顯示前 ${Math.max(result.row_keys.length, colKeys.length).toLocaleString()} 組（總計仍以全部資料計算）</p>`;
+    }
+    return html;
+}
+
+
 let pivotInitialData = null;
 let pivotInitialConfig = null;
 
@@ -1495,6 +1937,12 @@ function renderPivotTable(sheetData) {
 }
 
 function resetPivotTable() {
+    if (currentData && currentSheet && currentData[currentSheet] && currentData[currentSheet].paged) {
+        renderServerPivotTable(currentData[currentSheet]);
+        showToast('樞紐分析表已重置', 'success');
+        return;
+    }
+    
     if (!pivotData) {
         showAlertDialog('提示', '沒有資料可重置', 'warning');
         return;
@@ -1940,6 +2388,11 @@ function updateStatistics(sheetData) {
     const statsGrid = document.getElementById('statsGrid');
     statsGrid.innerHTML = '';
     
+    if (sheetData.paged) {
+        renderServerStatistics(sheetData);
+        return;
+    }
+    
     if (!sheetData.data || sheetData.data.length === 0) return;
     
     const stats = [
@@ -2186,7 +2639,10 @@ function generateFilters(sheetData) {
     columns.forEach(col => {
         if (col.includes('link') || col.includes('content') || col.includes('revision')) return;
         
-        const uniqueValues = [...new Set(sheetData.data.map(row => row[col]))].filter(v => v !== null && v !== undefined);
+        // 伺服器端分頁的資料表使用伺服器計算的欄位值
+        const uniqueValues = sheetData.paged
+            ? (sheetData.facets[col] || []).map(([value]) => value)
+            : [...new Set(sheetData.data.map(row => row[col]))].filter(v => v !== null && v !== undefined);
         
         if (uniqueValues.length > 0 && uniqueValues.length < 50) {
             const filterGroup = document.createElement('div');
@@ -2354,6 +2810,14 @@ function sortTable(column) {
     const sheetData = currentData[currentSheet];
     if (!sheetData || !sheetData.data) return;
     
+    // 伺服器端分頁只依最後點選的欄位排序
+    if (sheetData.paged) {
+        sortOrder = { [column]: order };
+        serverPage = 1;
+        renderDataTable(sheetData);
+        return;
+    }
+    
     sheetData.data.sort((a, b) => {
         const aVal = a[column];
         const bVal = b[column];
@@ -2380,6 +2844,10 @@ function sortTable(column) {
 
 // 繪製資料圖表
 function drawDataCharts(sheetData) {
+    if (sheetData.paged) {
+        drawServerDataCharts(sheetData);
+        return;
+    }
     if (!sheetData.data || sheetData.data.length === 0) return;
     
     const charts = ['distributionChart', 'trendChart'];
@@ -2405,14 +2873,14 @@ function drawDataCharts(sheetData) {
             sheetData.data.forEach(row => {
                 const module = row.module;
                 if (module) {
-                    chartData[module] = (chartData[module] || 0) + 1;
+                    chartData[module] = (chartData[module] || 0) + (row.__count || 1);
                 }
             });
         } else if (currentSheet === 'lost_project' || currentSheet === '新增/刪除專案') {
             sheetData.data.forEach(row => {
                 const status = row['狀態'];
                 if (status) {
-                    chartData[status] = (chartData[status] || 0) + 1;
+                    chartData[status] = (chartData[status] || 0) + (row.__count || 1);
                 }
             });
         } else {
@@ -2426,7 +2894,7 @@ function drawDataCharts(sheetData) {
                 sheetData.data.forEach(row => {
                     const value = row[firstStringCol];
                     if (value) {
-                        chartData[value] = (chartData[value] || 0) + 1;
+                        chartData[value] = (chartData[value] || 0) + (row.__count || 1);
                     }
                 });
             }
@@ -2483,7 +2951,7 @@ function drawDataCharts(sheetData) {
             sheetData.data.forEach(row => {
                 const module = row.module;
                 if (module) {
-                    chartData[module] = (chartData[module] || 0) + 1;
+                    chartData[module] = (chartData[module] || 0) + (row.__count || 1);
                 }
             });
             chartTitle = '模組差異統計';
@@ -2494,7 +2962,7 @@ function drawDataCharts(sheetData) {
                 const hasWave = row.has_wave || 'N';
                 const module = row.module || '未知模組';
                 const key = `${module} (${hasWave === 'Y' ? '有Wave' : '缺少Wave'})`;
-                chartData[key] = (chartData[key] || 0) + 1;
+                chartData[key] = (chartData[key] || 0) + (row.__count || 1);
             });
             chartTitle = '分支錯誤分析';
             
@@ -2502,7 +2970,7 @@ function drawDataCharts(sheetData) {
             // 專案變更分析
             sheetData.data.forEach(row => {
                 const status = row['狀態'] || '未知';
-                chartData[status] = (chartData[status] || 0) + 1;
+                chartData[status] = (chartData[status] || 0) + (row.__count || 1);
             });
             chartTitle = '專案變更統計';
             
@@ -2536,7 +3004,7 @@ function drawDataCharts(sheetData) {
                 sheetData.data.forEach(row => {
                     const value = row[firstStringCol];
                     if (value && typeof value === 'string') {
-                        chartData[value] = (chartData[value] || 0) + 1;
+                        chartData[value] = (chartData[value] || 0) + (row.__count || 1);
                     }
                 });
                 chartTitle = `${firstStringCol} 分布`;
@@ -2771,7 +3239,7 @@ function downloadFullReport() {
 }
 
 // 客戶端Excel匯出功能
-function exportToExcelClientSide() {
+async function exportToExcelClientSide() {
     try {
         console.log('開始客戶端Excel匯出...');
         
@@ -2788,7 +3256,10 @@ function exportToExcelClientSide() {
         
         showExportLoading();
         
-        const sheetData = currentData[currentSheet];
+        // 伺服器端分頁的資料表先取得全部資料列
+        const sheetData = currentData[currentSheet].paged
+            ? (await getFullPivotData())[currentSheet]
+            : currentData[currentSheet];
         console.log('當前資料表資料:', sheetData);
         
         if (!sheetData.data || sheetData.data.length === 0) {
@@ -2970,7 +3441,7 @@ function cleanFileName(name) {
 }
 
 // 客戶端匯出所有資料表
-function exportAllSheetsClientSide() {
+async function exportAllSheetsClientSide() {
     try {
         console.log('開始客戶端匯出所有資料表...');
         
@@ -2986,15 +3457,20 @@ function exportAllSheetsClientSide() {
         
         showExportLoading();
         
+        // 有伺服器端分頁的資料表時先取得全部資料列
+        const exportData = Object.values(currentData).some(sheet => sheet.paged)
+            ? await getFullPivotData()
+            : currentData;
+        
         const workbook = XLSX.utils.book_new();
         let totalSheets = 0;
         const usedSheetNames = new Set(); // 追蹤已使用的工作表名稱
         
-        console.log('可用資料表:', Object.keys(currentData));
+        console.log('可用資料表:', Object.keys(exportData));
         
         // 遍歷所有資料表
-        Object.keys(currentData).forEach(sheetName => {
-            const sheetData = currentData[sheetName];
+        Object.keys(exportData).forEach(sheetName => {
+            const sheetData = exportData[sheetName];
             console.log(`處理資料表: ${sheetName}`);
             
             if (!sheetData.data || sheetData.data.length === 0) {
@@ -3129,8 +3605,13 @@ function hideExportLoading() {
 
 // 匯出整個頁面為 HTML（保留 JS/CSS）- 完整離線版本
 // 修復版 exportPageAsHTML 函數 - 替換你現有的
-function exportPageAsHTML() {
+async function exportPageAsHTML() {
     try {
+        // 離線頁面需要全部資料列（伺服器端分頁的資料表先取得完整資料）
+        const exportData = Object.values(currentData || {}).some(sheet => sheet.paged)
+            ? await getFullPivotData()
+            : currentData;
+        
         // 收集所有內嵌的 CSS
         let allCSS = '';
         
@@ -3411,7 +3892,7 @@ function exportPageAsHTML() {
         }, 1000);
         
         // 內嵌資料
-        const exportedData = ${JSON.stringify(currentData)};
+        const exportedData = ${JSON.stringify(exportData)};
         const exportedTaskId = '${taskId}';
         const exportedSheet = '${currentSheet}';
         
@@ -3538,6 +4019,7 @@ function getRequiredOfflineFunctions() {
         let filters = {};
         let sortOrder = {};
         let searchTerm = '';
+        let serverPage = 1;
         let taskId = '';
         let pivotData = null;
         let pivotConfig = null;
@@ -4257,6 +4739,7 @@ function getRequiredOfflineFunctions() {
         'getSheetDisplayName',
         'loadSheet', 
         'renderDataTable',
+        'renderServerPager',
         'renderPivotTable',
         'updateStatistics',
         'updateTableStats',
@@ -4296,6 +4779,7 @@ function getRequiredOfflineFunctions() {
         window.getSheetDisplayName = getSheetDisplayName;
         window.loadSheet = loadSheet;
         window.renderDataTable = renderDataTable;
+        window.renderServerPager = renderServerPager;
         window.renderPivotTable = renderPivotTable;
         window.updateStatistics = updateStatistics;
         window.updateTableStats = updateTableStats;
@@ -4350,6 +4834,7 @@ function getAllRequiredFunctions() {
         'getSheetDisplayName',
         'loadSheet',
         'renderDataTable',
+        'renderServerPager',
         'renderPivotTable',
         'updateStatistics',
         'updateTableStats',
@@ -4391,6 +4876,7 @@ function getAllRequiredFunctions() {
         let filters = {};
         let sortOrder = {};
         let searchTerm = '';
+        let serverPage = 1;
         let taskId = '';
         let pivotData = null;
         let pivotConfig = null;
@@ -4418,6 +4904,7 @@ function getAllRequiredFunctions() {
         window.getSheetDisplayName = getSheetDisplayName;
         window.loadSheet = loadSheet;
         window.renderDataTable = renderDataTable;
+        window.renderServerPager = renderServerPager;
         window.renderPivotTable = renderPivotTable;
         window.updateStatistics = updateStatistics;
         window.updateTableStats = updateTableStats;
@@ -6092,6 +6579,12 @@ function renderPivotTable(sheetData) {
     const container = document.getElementById('pivotContainer');
     container.innerHTML = '';
     
+    // 大型資料表改由伺服器彙總
+    if (sheetData && sheetData.paged) {
+        renderServerPivotTable(sheetData);
+        return;
+    }
+    
     if (!sheetData || !sheetData.data || sheetData.data.length === 0) {
         container.innerHTML = `
             <div class="no-data-message">
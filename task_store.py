@@ -0,0 +1,605 @@
+"""
+任務狀態記錄模組
+以 SQLite（WAL 模式）記錄網頁任務的處理狀態、任務結果、最近活動與最近比對記錄，
+伺服器重新啟動後狀態仍然存在，多個伺服器程序也能共用同一份記錄（每筆處理中的任務記錄所屬程序，程序定期更新心跳，
+伺服器啟動時只將已停止心跳的程序留下的任務標記為中斷）；
+任務開始與結束時同時更新統計計數（總數、每日數量、成功/失敗、處理時間），查詢統計不必掃描目錄
+"""
+import atexit
+import json
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+# 任務結束的狀態（寫入後不再保留在程序記憶體中）
+FINAL_STATUSES = ('completed', 'error')
+
+# 伺服器重新啟動時，未結束的任務改為此訊息
+INTERRUPTED_MESSAGE = '任務已中斷（伺服器重新啟動），請重新執行'
+
+# 任務種類與會產生的結果目錄（下載 / 比對）
+TASK_KINDS = {
+    'download': ('download',),
+    'compare': ('compare',),
+    'one_step': ('download', 'compare')
+}
+
+def _day(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+
+def format_duration(seconds: Optional[float]) -> str:
+    """處理時間的顯示文字"""
+    if seconds is None or seconds < 60:
+        return '< 1 分鐘'
+    minutes, seconds = divmod(int(seconds), 60)
+    if minutes < 60:
+        return f'{minutes} 分 {seconds} 秒'
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours} 小時 {minutes} 分'
+
+class TaskStore:
+    """任務狀態記錄類別（執行緒安全）"""
+
+    def __init__(self, db_path: str = None, progress_interval: float = None, retention_days: int = None):
+        """
+        初始化記錄
+
+        Args:
+            db_path: SQLite 檔案路徑（預設 config.TASK_STORE_DB_PATH）
+            progress_interval: 狀態未改變時，同一任務兩次寫入資料庫的最短間隔秒數
+                               （預設 config.TASK_STORE_PROGRESS_INTERVAL）
+            retention_days: 超過此天數未更新的記錄會被清除（預設 config.TASK_STORE_RETENTION_DAYS）
+        """
+        self.db_path = db_path or config.TASK_STORE_DB_PATH
+        self.progress_interval = (progress_interval if progress_interval is not None
+                                  else config.TASK_STORE_PROGRESS_INTERVAL)
+        self.retention_days = (retention_days if retention_days is not None
+                               else config.TASK_STORE_RETENTION_DAYS)
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = None
+        # 本程序正在處理的任務：task_id -> 最新狀態（與 WebProcessor 共用 results 物件）
+        self._live = {}
+        # task_id -> (最後寫入時間, 最後寫入的狀態)
+        self._persisted = {}
+        # 本程序的識別（記錄在處理中的任務上，供其他程序判斷任務是否仍在處理）
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_interval = config.TASK_STORE_HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = config.TASK_STORE_HEARTBEAT_TIMEOUT
+        self._heartbeat = None
+        # 程序結束時寫入尚未寫入的狀態
+        atexit.register(self.close)
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得資料庫連線，第一次使用時建立資料表並清除過期記錄（需持有鎖）"""
+        if self._conn is None:
+            utils.create_directory(os.path.dirname(os.path.abspath(self.db_path)))
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    progress INTEGER,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+                CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at);
+                CREATE TABLE IF NOT EXISTS task_results (
+                    task_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS activities (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    action TEXT,
+                    status TEXT,
+                    details TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_activities_timestamp ON activities (timestamp);
+                CREATE TABLE IF NOT EXISTS comparisons (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT,
+                    timestamp REAL NOT NULL,
+                    scenario TEXT,
+                    status TEXT,
+                    modules INTEGER,
+                    duration TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_comparisons_timestamp ON comparisons (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_comparisons_task_id ON comparisons (task_id);
+                CREATE TABLE IF NOT EXISTS task_runs (
+                    task_id TEXT PRIMARY KEY,
+                    kind TEXT,
+                    status TEXT,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    reconciled INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_task_runs_started_at ON task_runs (started_at);
+                CREATE TABLE IF NOT EXISTS statistics (
+                    name TEXT PRIMARY KEY,
+                    value REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS task_owners (
+                    owner TEXT PRIMARY KEY,
+                    host TEXT,
+                    pid INTEGER,
+                    heartbeat REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS daily_statistics (
+                    day TEXT PRIMARY KEY,
+                    started INTEGER NOT NULL DEFAULT 0,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0
+                );
+            ''')
+            # 舊版資料庫補上新增的欄位
+            self._ensure_column(conn, 'tasks', 'owner', 'TEXT')
+            self._ensure_column(conn, 'task_runs', 'reconciled', 'INTEGER NOT NULL DEFAULT 0')
+            if self.retention_days > 0:
+                cutoff = time.time() - self.retention_days * 86400
+                with conn:
+                    conn.execute('DELETE FROM tasks WHERE updated_at < ?', (cutoff,))
+                    conn.execute('DELETE FROM task_results WHERE updated_at < ?', (cutoff,))
+                    conn.execute('DELETE FROM activities WHERE timestamp < ?', (cutoff,))
+                    conn.execute('DELETE FROM comparisons WHERE timestamp < ?', (cutoff,))
+                    # 統計計數不受影響，task_runs 只用來計算處理時間
+                    conn.execute('DELETE FROM task_runs WHERE started_at < ?', (cutoff,))
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _ensure_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            with conn:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    @staticmethod
+    def _dumps(data: Any) -> str:
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+    def _beat(self, conn: sqlite3.Connection, now: float) -> None:
+        """更新本程序的心跳（需持有鎖，在交易中呼叫）"""
+        conn.execute(
+            'INSERT INTO task_owners (owner, host, pid, heartbeat) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(owner) DO UPDATE SET heartbeat = excluded.heartbeat',
+            (self.owner_id, socket.gethostname(), os.getpid(), now)
+        )
+
+    def _ensure_heartbeat(self) -> None:
+        """本程序有處理中的任務時，啟動背景執行緒定期更新心跳（需持有鎖）"""
+        if self._heartbeat is not None and self._heartbeat.is_alive():
+            return
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='task-store-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        """背景心跳迴圈"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                with self._lock:
+                    if self._live and self._conn is not None:
+                        with self._conn:
+                            self._beat(self._conn, time.time())
+            except Exception as e:
+                self.logger.debug(f"更新任務記錄心跳時發生錯誤: {str(e)}")
+
+    @staticmethod
+    def _owner_alive(host: str, pid: Optional[int]) -> bool:
+        """同一主機上的程序是否仍存在（無法判斷時視為存在，由心跳逾時決定）"""
+        if host != socket.gethostname() or not pid or os.name != 'posix':
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def reconcile_interrupted(self) -> int:
+        """
+        將已結束的程序留下的處理中任務改為 error（處理執行緒已不存在，否則前端會一直輪詢到停在中途的狀態）
+
+        只處理所屬程序已停止心跳（超過 heartbeat_timeout）、在同一主機上已不存在或沒有記錄所屬程序的任務，
+        其他仍在執行的伺服器程序的任務不受影響；只應在伺服器啟動時呼叫
+
+        Returns:
+            標記為中斷的任務數
+        """
+        now = time.time()
+        placeholders = ', '.join('?' for _ in FINAL_STATUSES)
+        interrupted = 0
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                alive = {self.owner_id}
+                for owner, host, pid, heartbeat in conn.execute(
+                        'SELECT owner, host, pid, heartbeat FROM task_owners').fetchall():
+                    if now - heartbeat <= self.heartbeat_timeout and self._owner_alive(host, pid):
+                        alive.add(owner)
+                    else:
+                        conn.execute('DELETE FROM task_owners WHERE owner = ?', (owner,))
+
+                rows = conn.execute(
+                    # 沒有 status 的記錄（例如下載準備狀態）不是處理中的任務
+                    f'SELECT task_id, owner, data FROM tasks '
+                    f'WHERE status IS NOT NULL AND status NOT IN ({placeholders})',
+                    FINAL_STATUSES
+                ).fetchall()
+                for task_id, owner, raw in rows:
+                    if owner in alive:
+                        continue
+                    data = json.loads(raw)
+                    data['status'] = 'error'
+                    data['message'] = INTERRUPTED_MESSAGE
+                    conn.execute(
+                        'UPDATE tasks SET status = ?, data = ?, owner = NULL, updated_at = ? WHERE task_id = ?',
+                        ('error', self._dumps(data), now, task_id)
+                    )
+                    self._finish_run(conn, task_id, 'error', now, reconciled=True)
+                    interrupted += 1
+        if interrupted:
+            self.logger.warning(f"已將 {interrupted} 個中斷的任務標記為錯誤")
+        return interrupted
+
+    def _write_status(self, task_id: str, data: Dict[str, Any], now: float) -> None:
+        """寫入任務狀態（需持有鎖）"""
+        conn = self._connection()
+        status = data.get('status')
+        progress = data.get('progress')
+        # 處理中的任務記錄所屬程序
+        running = status is not None and status not in FINAL_STATUSES
+        with conn:
+            conn.execute(
+                'INSERT INTO tasks (task_id, status, progress, data, owner, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, progress = excluded.progress, '
+                'data = excluded.data, owner = excluded.owner, updated_at = excluded.updated_at',
+                (task_id, status, progress if isinstance(progress, int) else None,
+                 self._dumps(data), self.owner_id if running else None, now, now)
+            )
+            if running:
+                self._beat(conn, now)
+            if status in FINAL_STATUSES:
+                self._finish_run(conn, task_id, status, now)
+        if running:
+            self._ensure_heartbeat()
+        self._persisted[task_id] = (now, status)
+        if 'status' not in data or status in FINAL_STATUSES:
+            self._live.pop(task_id, None)
+            self._persisted.pop(task_id, None)
+
+    def set_status(self, task_id: str, data: Dict[str, Any], force: bool = False) -> None:
+        """
+        設定任務狀態
+
+        狀態（status）改變時立即寫入資料庫；只有進度改變時，同一任務每 progress_interval 秒最多寫入一次，
+        期間的最新狀態保留在本程序記憶體中（本程序讀取時仍是最新的）
+
+        Args:
+            task_id: 任務 ID
+            data: 狀態資料（progress / status / message / results 等）
+            force: 不論間隔一律寫入
+        """
+        now = time.time()
+        with self._lock:
+            self._live[task_id] = data
+            last = self._persisted.get(task_id)
+            if (force or last is None or last[1] != data.get('status')
+                    or now - last[0] >= self.progress_interval):
+                self._write_status(task_id, data, now)
+
+    def get_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """取得任務狀態，沒有記錄時回傳 None"""
+        with self._lock:
+            data = self._live.get(task_id)
+            if data is not None:
+                return data
+            row = self._connection().execute(
+                'SELECT data FROM tasks WHERE task_id = ?', (task_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_results(self, task_id: str, results: Dict[str, Any], merge: bool = False) -> bool:
+        """
+        更新任務狀態中的 results
+
+        Args:
+            task_id: 任務 ID
+            results: 任務結果
+            merge: True 表示合併到現有的 results，False 表示取代
+
+        Returns:
+            任務是否存在
+        """
+        data = self.get_status(task_id)
+        if data is None:
+            return False
+        if merge:
+            # 進行中的任務與 WebProcessor 共用 results 物件，合併後處理器也看得到
+            data.setdefault('results', {}).update(results)
+        else:
+            data['results'] = results
+        self.set_status(task_id, data, force=True)
+        return True
+
+    def task_statuses(self) -> Dict[str, Optional[str]]:
+        """取得所有任務的狀態 {task_id: status}"""
+        with self._lock:
+            rows = self._connection().execute('SELECT task_id, status FROM tasks').fetchall()
+            statuses = dict(rows)
+            for task_id, data in self._live.items():
+                statuses[task_id] = data.get('status')
+        return statuses
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, name: str, delta: float = 1) -> None:
+        conn.execute(
+            'INSERT INTO statistics (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value', (name, delta)
+        )
+
+    @staticmethod
+    def _bump_day(conn: sqlite3.Connection, timestamp: float, column: str, delta: int = 1) -> None:
+        conn.execute(
+            f'INSERT INTO daily_statistics (day, {column}) VALUES (?, ?) '
+            f'ON CONFLICT(day) DO UPDATE SET {column} = {column} + excluded.{column}', (_day(timestamp), delta)
+        )
+
+    def task_started(self, task_id: str, kind: str) -> None:
+        """
+        記錄任務開始（更新總數、今日數量與各種類任務數）
+
+        同一任務重新執行時計入總數與今日數量（結束時也會再計入成功/失敗一次），
+        但使用相同的結果目錄，不再計入各種類任務數
+
+        Args:
+            task_id: 任務 ID
+            kind: 任務種類 download / compare / one_step
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                known = conn.execute('SELECT 1 FROM task_runs WHERE task_id = ?', (task_id,)).fetchone()
+                conn.execute(
+                    'INSERT OR REPLACE INTO task_runs (task_id, kind, status, started_at, finished_at) '
+                    'VALUES (?, ?, NULL, ?, NULL)', (task_id, kind, now)
+                )
+                self._bump(conn, 'total')
+                self._bump_day(conn, now, 'started')
+                if known:
+                    return
+                for result_kind in TASK_KINDS.get(kind, ()):
+                    self._bump(conn, f'{result_kind}_tasks')
+
+    def _finish_run(self, conn: sqlite3.Connection, task_id: str, status: str, now: float,
+                    reconciled: bool = False) -> None:
+        """
+        任務進入結束狀態時更新成功/失敗與處理時間（需持有鎖，在交易中呼叫）
+
+        被標記為中斷（reconciled）的執行記錄之後仍可由任務實際的結束狀態更正一次，
+        先撤銷中斷時計入的失敗再重新計入
+        """
+        row = conn.execute(
+            'SELECT started_at, finished_at, reconciled FROM task_runs WHERE task_id = ?', (task_id,)
+        ).fetchone()
+        if row is None:
+            return
+        started_at, finished_at, was_reconciled = row
+        if finished_at is not None:
+            if reconciled or not was_reconciled:
+                return
+            self._bump(conn, 'failed', -1)
+            self._bump_day(conn, finished_at, 'failed', -1)
+        conn.execute(
+            'UPDATE task_runs SET status = ?, finished_at = ?, reconciled = ? WHERE task_id = ?',
+            (status, now, int(reconciled), task_id)
+        )
+        column = 'completed' if status == 'completed' else 'failed'
+        self._bump(conn, column)
+        self._bump_day(conn, now, column)
+        if status == 'completed':
+            self._bump(conn, 'duration_total', now - started_at)
+            self._bump(conn, 'duration_count')
+
+    def task_duration(self, task_id: str) -> Optional[float]:
+        """任務的處理時間（秒），執行中的任務為目前已經過的時間，沒有記錄時回傳 None"""
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT started_at, finished_at FROM task_runs WHERE task_id = ?', (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        started_at, finished_at = row
+        return (finished_at or time.time()) - started_at
+
+    def seed_statistics(self, result_dirs: Dict[str, str]) -> None:
+        """
+        第一次使用時依既有的任務目錄建立統計（之後只在任務開始/結束時更新，不再掃描目錄）
+
+        Args:
+            result_dirs: {任務種類(download / compare): 結果目錄}，目錄下的 task_* 資料夾視為已完成的任務
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute("SELECT 1 FROM statistics WHERE name = 'seeded'").fetchone():
+                    return
+
+                tasks = {}  # task_id -> 最後修改時間
+                for result_kind, directory in result_dirs.items():
+                    count = 0
+                    for entry in self._task_entries(directory):
+                        count += 1
+                        mtime = entry.stat().st_mtime
+                        tasks[entry.name] = max(tasks.get(entry.name, 0), mtime)
+                    self._bump(conn, f'{result_kind}_tasks', count)
+
+                known = {row[0] for row in conn.execute('SELECT task_id FROM task_runs')}
+                for task_id, mtime in tasks.items():
+                    if task_id in known:
+                        continue
+                    conn.execute(
+                        'INSERT INTO task_runs (task_id, kind, status, started_at, finished_at) '
+                        'VALUES (?, NULL, ?, ?, ?)', (task_id, 'completed', mtime, mtime)
+                    )
+                    self._bump(conn, 'total')
+                    self._bump(conn, 'completed')
+                    self._bump_day(conn, mtime, 'started')
+                    self._bump_day(conn, mtime, 'completed')
+                self._bump(conn, 'seeded')
+                self.logger.info(f"已依既有任務目錄建立統計: {len(tasks)} 個任務")
+
+    @staticmethod
+    def _task_entries(directory: str) -> Iterable[os.DirEntry]:
+        try:
+            with os.scandir(directory) as entries:
+                return [entry for entry in entries if entry.name.startswith('task_') and entry.is_dir()]
+        except OSError:
+            return []
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        取得統計（只讀取計數與最近 7 天的每日統計）
+
+        Returns:
+            total / today / week / completed / failed / download_tasks / compare_tasks /
+            success_rate（百分比）/ avg_duration（秒）
+        """
+        now = datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
+        with self._lock:
+            conn = self._connection()
+            counters = dict(conn.execute('SELECT name, value FROM statistics').fetchall())
+            days = conn.execute(
+                'SELECT day, started FROM daily_statistics WHERE day >= ?', (week_start,)
+            ).fetchall()
+
+        completed = int(counters.get('completed', 0))
+        failed = int(counters.get('failed', 0))
+        finished = completed + failed
+        duration_count = counters.get('duration_count', 0)
+        return {
+            'total': int(counters.get('total', 0)),
+            'today': sum(started for day, started in days if day == today),
+            'week': sum(started for day, started in days if day <= today),
+            'completed': completed,
+            'failed': failed,
+            'download_tasks': int(counters.get('download_tasks', 0)),
+            'compare_tasks': int(counters.get('compare_tasks', 0)),
+            'success_rate': round(completed / finished * 100, 1) if finished else 0,
+            'avg_duration': counters.get('duration_total', 0) / duration_count if duration_count else 0.0
+        }
+
+    def save_results(self, task_id: str, data: Dict[str, Any]) -> None:
+        """記錄任務結果（供樞紐分析使用）"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO task_results (task_id, data, updated_at) VALUES (?, ?, ?)',
+                    (task_id, self._dumps(data), time.time())
+                )
+
+    def get_results(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """取得記錄的任務結果，沒有記錄時回傳 None"""
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT data FROM task_results WHERE task_id = ?', (task_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add_activity(self, action: str, status: str, details: str = None) -> None:
+        """新增活動記錄"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT INTO activities (timestamp, action, status, details) VALUES (?, ?, ?, ?)',
+                    (time.time(), action, status, details)
+                )
+
+    def recent_activities(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """取得最近的活動記錄（新的在前，timestamp 為 datetime）"""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT timestamp, action, status, details FROM activities '
+                'ORDER BY timestamp DESC, id DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [{
+            'timestamp': datetime.fromtimestamp(timestamp),
+            'action': action,
+            'status': status,
+            'details': details
+        } for timestamp, action, status, details in rows]
+
+    def add_comparison(self, task_id: str, scenario: str, status: str, modules: int,
+                       duration: str = None) -> None:
+        """新增比對記錄（未指定 duration 時使用任務實際的處理時間）"""
+        if duration is None:
+            duration = format_duration(self.task_duration(task_id))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'INSERT INTO comparisons (task_id, timestamp, scenario, status, modules, duration) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (task_id, time.time(), scenario, status, modules, duration)
+                )
+
+    def recent_comparisons(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """取得最近的比對記錄（新的在前，timestamp 為 datetime）"""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT task_id, timestamp, scenario, status, modules, duration FROM comparisons '
+                'ORDER BY timestamp DESC, id DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [{
+            'id': task_id,
+            'task_id': task_id,
+            'timestamp': datetime.fromtimestamp(timestamp),
+            'scenario': scenario,
+            'status': status,
+            'modules': modules,
+            'duration': duration
+        } for task_id, timestamp, scenario, status, modules, duration in rows]
+
+    def close(self) -> None:
+        """
+        將尚未寫入的狀態寫入資料庫並關閉連線
+
+        同時移除本程序的心跳記錄，之後啟動的伺服器會將本程序未結束的任務標記為中斷
+        """
+        with self._lock:
+            now = time.time()
+            for task_id, data in list(self._live.items()):
+                self._write_status(task_id, data, now)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute('DELETE FROM task_owners WHERE owner = ?', (self.owner_id,))
+                self._conn.close()
+                self._conn = None
+
+# 全域任務記錄實例
+task_store = TaskStore()
@@ -0,0 +1,133 @@
+"""
+下載進度追蹤模組
+累計位元組與路徑計數，計算傳輸速率與預估剩餘時間，
+並將進度事件合併到固定的最高頻率後再送出
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+class TransferProgress:
+    """下載進度追蹤類別（執行緒安全）"""
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None],
+                 max_rate_hz: float = None, throughput_window: float = None):
+        """
+        初始化進度追蹤
+
+        Args:
+            emit: 送出進度的函數，參數為 snapshot() 的結果
+            max_rate_hz: 每秒最多送出次數（預設 config.PROGRESS_MAX_RATE_HZ）
+            throughput_window: 計算傳輸速率的視窗秒數（預設 config.PROGRESS_THROUGHPUT_WINDOW）
+        """
+        self.emit = emit
+        rate = max_rate_hz or config.PROGRESS_MAX_RATE_HZ
+        self.min_interval = 1.0 / rate if rate > 0 else 0
+        self.throughput_window = throughput_window or config.PROGRESS_THROUGHPUT_WINDOW
+        self.logger = logger
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, paths_total: int = 0) -> None:
+        """開始新的下載工作"""
+        with self._lock:
+            self.paths_total = paths_total
+            self.paths_done = 0
+            self.files_transferred = 0
+            self.bytes_done = 0
+            self.started_at = time.monotonic()
+            self._samples = deque([(self.started_at, 0)])  # (時間, 累計 bytes)
+            self._last_emit = 0.0
+
+    def file_callback(self) -> Callable[[int, int], None]:
+        """
+        產生單一檔案的傳輸回調（參數為 (已傳輸 bytes, 檔案總 bytes)）
+
+        第一次呼叫視為起始位置（傳輸開始前以續傳位置呼叫，已存在的部分不計入速率）
+        """
+        last = [None]
+
+        def callback(transferred: int, total: int) -> None:
+            delta = transferred - last[0] if last[0] is not None else 0
+            last[0] = transferred
+            if delta > 0:
+                with self._lock:
+                    self.bytes_done += delta
+            if transferred >= total:
+                self.file_done()
+            elif delta > 0:
+                self.maybe_emit()
+
+        return callback
+
+    def file_done(self) -> None:
+        """一個檔案實際傳輸完成"""
+        with self._lock:
+            self.files_transferred += 1
+        self.maybe_emit()
+
+    def path_done(self) -> None:
+        """一個下載路徑處理完成"""
+        with self._lock:
+            self.paths_done += 1
+        self.maybe_emit()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """取得目前的進度資料"""
+        with self._lock:
+            return self._snapshot_locked(time.monotonic())
+
+    def _snapshot_locked(self, now: float) -> Dict[str, Any]:
+        """計算進度資料（需持有鎖）"""
+        # 以滑動視窗計算近期速率
+        self._samples.append((now, self.bytes_done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.throughput_window:
+            self._samples.popleft()
+        window_start, window_bytes = self._samples[0]
+        window_seconds = now - window_start
+        throughput = (self.bytes_done - window_bytes) / window_seconds if window_seconds > 0 else 0.0
+
+        # 檔案大小要掃描後才知道，剩餘時間以路徑完成速度估算
+        elapsed = now - self.started_at
+        eta = None
+        if self.paths_total and self.paths_done:
+            remaining = max(self.paths_total - self.paths_done, 0)
+            eta = round(elapsed / self.paths_done * remaining, 1)
+
+        return {
+            'paths_done': self.paths_done,
+            'paths_total': self.paths_total,
+            'files_transferred': self.files_transferred,
+            'bytes_done': self.bytes_done,
+            'throughput': round(throughput, 1),
+            'elapsed': round(elapsed, 1),
+            'eta': eta
+        }
+
+    def maybe_emit(self, force: bool = False) -> bool:
+        """
+        距離上次送出超過最小間隔才送出進度
+
+        Args:
+            force: 忽略頻率限制立即送出
+
+        Returns:
+            是否有送出
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_emit < self.min_interval:
+                return False
+            self._last_emit = now
+            snapshot = self._snapshot_locked(now)
+
+        try:
+            self.emit(snapshot)
+        except Exception as e:
+            self.logger.debug(f"送出進度時發生錯誤: {str(e)}")
+        return True
@@ -0,0 +1,220 @@
+"""
+版本資料夾索引模組
+以 SQLite 記錄各 SFTP 基礎路徑下的版本資料夾（名稱、版號、mtime），
+遠端目錄 mtime 未改變時直接使用索引，只需一次 stat 而不必重新列出整個目錄
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import utils
+import config
+
+logger = utils.setup_logger(__name__)
+
+VersionFolder = namedtuple('VersionFolder', ['name', 'version', 'is_dir', 'mtime'])
+
+# 目錄在快照前後同一秒內被修改時，mtime 無法分辨快照是否完整；
+# 只信任在第一次看到此目錄 mtime 之後至少經過這麼多秒才列出的快照
+# （只比較本機經過的時間，不與伺服器的 mtime 比較，不受兩端時鐘差異影響）
+MTIME_GRANULARITY = 2
+
+def parse_version_number(name: str) -> Optional[int]:
+    """取得資料夾名稱開頭的版號（如 536_all_202507312300 -> 536）"""
+    match = re.match(r'^(\d+)', name)
+    return int(match.group(1)) if match else None
+
+class VersionIndex:
+    """版本資料夾索引類別（執行緒安全）"""
+
+    def __init__(self, db_path: str = None, enabled: bool = None):
+        """
+        初始化索引
+
+        Args:
+            db_path: SQLite 檔案路徑（預設 config.VERSION_INDEX_DB_PATH）
+            enabled: 是否啟用（預設 config.VERSION_INDEX_ENABLED，停用時每次都重新列出）
+        """
+        self.db_path = db_path or config.VERSION_INDEX_DB_PATH
+        self.enabled = config.VERSION_INDEX_ENABLED if enabled is None else enabled
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得資料庫連線，第一次使用時建立資料表（需持有鎖）"""
+        if self._conn is None:
+            utils.create_directory(os.path.dirname(os.path.abspath(self.db_path)))
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS directories (
+                    host TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    dir_mtime INTEGER NOT NULL,
+                    refreshed_at REAL NOT NULL,
+                    first_seen REAL,
+                    PRIMARY KEY (host, path)
+                );
+                CREATE TABLE IF NOT EXISTS folders (
+                    host TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    version INTEGER,
+                    is_dir INTEGER NOT NULL,
+                    mtime INTEGER NOT NULL,
+                    PRIMARY KEY (host, path, name)
+                );
+            ''')
+            # 舊版資料庫補上新增的欄位（沒有記錄的快照視為不可信任，下次查詢時重新列出）
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(directories)')}
+            if 'first_seen' not in columns:
+                with conn:
+                    conn.execute('ALTER TABLE directories ADD COLUMN first_seen REAL')
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        """統一路徑格式（移除結尾斜線）"""
+        return path.rstrip('/') or '/'
+
+    @staticmethod
+    def _sort_folders(folders: Iterable[VersionFolder]) -> List[VersionFolder]:
+        """依版號由大到小排序（無版號者在後），同版號以 mtime 較新者優先"""
+        return sorted(
+            folders,
+            key=lambda f: (f.version is not None, f.version or 0, f.mtime, f.name),
+            reverse=True
+        )
+
+    def get_folders(self, host: str, path: str, stat_dir: Callable[[], Any],
+                    list_dir: Callable[[], Iterable[Tuple[str, bool, int]]]) -> List[VersionFolder]:
+        """
+        取得目錄下的資料夾列表（已依版號排序）
+
+        Args:
+            host: SFTP 伺服器位址
+            path: 遠端目錄路徑
+            stat_dir: 取得遠端目錄屬性的函數（需含 st_mtime）
+            list_dir: 列出遠端目錄的函數，回傳 (名稱, 是否為目錄, mtime)
+
+        Returns:
+            VersionFolder 列表
+        """
+        path = self._normalize_path(path)
+
+        if not self.enabled:
+            return self._build_folders(list_dir())
+
+        try:
+            dir_mtime = int(stat_dir().st_mtime)
+        except Exception as e:
+            # 伺服器不支援 stat 等情況，直接列出目錄且不寫入索引
+            self.logger.debug(f"無法取得目錄 mtime，略過索引: {path}, {str(e)}")
+            return self._build_folders(list_dir())
+        # stat 回應時伺服器時間已不早於 dir_mtime
+        observed_at = time.time()
+
+        cached, first_seen = self._load(host, path, dir_mtime)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        refreshed_at = time.time()
+        folders = self._build_folders(list_dir())
+        self._store(host, path, dir_mtime, refreshed_at, first_seen or observed_at, folders)
+        self.logger.debug(f"更新版本資料夾索引: {path} ({len(folders)} 個項目)")
+        return folders
+
+    def _build_folders(self, entries: Iterable[Tuple[str, bool, int]]) -> List[VersionFolder]:
+        """由目錄列表建立 VersionFolder"""
+        return self._sort_folders(
+            VersionFolder(name, parse_version_number(name), bool(is_dir), int(mtime or 0))
+            for name, is_dir, mtime in entries
+        )
+
+    def _load(self, host: str, path: str,
+              dir_mtime: int) -> Tuple[Optional[List[VersionFolder]], Optional[float]]:
+        """
+        目錄 mtime 與索引相同且快照可信任時回傳索引內容
+
+        Returns:
+            (索引內容，不可使用時為 None, 第一次看到此目錄 mtime 的本機時間，沒有記錄時為 None)
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT dir_mtime, refreshed_at, first_seen FROM directories WHERE host = ? AND path = ?',
+                (host, path)
+            ).fetchone()
+            if row is None or row[0] != dir_mtime:
+                return None, None
+            _, refreshed_at, first_seen = row
+            # 快照與目錄最後一次修改可能在同一秒內，下次查詢時重新列出
+            if first_seen is None or refreshed_at - first_seen < MTIME_GRANULARITY:
+                return None, first_seen
+
+            rows = conn.execute(
+                'SELECT name, version, is_dir, mtime FROM folders WHERE host = ? AND path = ?',
+                (host, path)
+            ).fetchall()
+
+        return self._sort_folders(VersionFolder(name, version, bool(is_dir), mtime)
+                                  for name, version, is_dir, mtime in rows), first_seen
+
+    def _store(self, host: str, path: str, dir_mtime: int, refreshed_at: float, first_seen: float,
+               folders: List[VersionFolder]) -> None:
+        """以新的目錄列表取代索引內容"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM folders WHERE host = ? AND path = ?', (host, path))
+                conn.executemany(
+                    'INSERT INTO folders (host, path, name, version, is_dir, mtime) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(host, path, f.name, f.version, int(f.is_dir), f.mtime) for f in folders]
+                )
+                conn.execute(
+                    'INSERT OR REPLACE INTO directories (host, path, dir_mtime, refreshed_at, first_seen) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (host, path, dir_mtime, refreshed_at, first_seen)
+                )
+
+    def invalidate(self, host: str = None, path: str = None) -> None:
+        """
+        使索引失效
+
+        Args:
+            host: 只清除此伺服器的項目（None 表示全部）
+            path: 只清除此目錄的項目（None 表示全部）
+        """
+        conditions, params = [], []
+        if host is not None:
+            conditions.append('host = ?')
+            params.append(host)
+        if path is not None:
+            conditions.append('path = ?')
+            params.append(self._normalize_path(path))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(f'DELETE FROM directories{where}', params)
+                conn.execute(f'DELETE FROM folders{where}', params)
+
+    def close(self) -> None:
+        """關閉資料庫連線"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# 全域索引實例
+version_index = VersionIndex()
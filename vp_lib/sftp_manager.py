@@ -4,15 +4,17 @@ SFTP 管理模組
 """
 import os
 import sys
-import re
+import stat
 from typing import List, Optional, Tuple
-import paramiko
 
 # 將上層目錄加入 Python 路徑
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import utils
 import config
+from remote_listing_cache import listing_cache, cached_listdir, cached_listdir_attr
+from sftp_connection_pool import connection_pool
+from version_index import VersionFolder, version_index
 
 logger = utils.setup_logger(__name__)
 
@@ -23,29 +25,67 @@ class SFTPManager:
         self.logger = logger
         self._sftp = None
         self._transport = None
+        self._connection = None
         
     def connect(self) -> None:
-        """建立 SFTP 連線"""
+        """建立 SFTP 連線（由共用連線池取得已認證的連線）"""
         try:
+            if self._connection:
+                self.disconnect()
             self.logger.info(f"連線到 SFTP: {config.SFTP_HOST}:{config.SFTP_PORT}")
-            self._transport = paramiko.Transport((config.SFTP_HOST, config.SFTP_PORT))
-            self._transport.connect(username=config.SFTP_USERNAME, password=config.SFTP_PASSWORD)
-            self._sftp = paramiko.SFTPClient.from_transport(self._transport)
+            self._connection = connection_pool.acquire(
+                config.SFTP_HOST, config.SFTP_PORT, config.SFTP_USERNAME, config.SFTP_PASSWORD
+            )
+            self._transport = self._connection.transport
+            self._sftp = self._connection.sftp
             self.logger.info("SFTP 連線成功")
         except Exception as e:
             self.logger.error(f"SFTP 連線失敗: {str(e)}")
             raise
             
     def disconnect(self) -> None:
-        """關閉 SFTP 連線"""
+        """歸還 SFTP 連線至連線池"""
         try:
-            if self._sftp:
-                self._sftp.close()
-            if self._transport:
-                self._transport.close()
-            self.logger.info("SFTP 連線已關閉")
+            if self._connection:
+                connection_pool.release(self._connection)
+                self.logger.info("SFTP 連線已歸還連線池")
         except Exception as e:
             self.logger.error(f"關閉 SFTP 連線時發生錯誤: {str(e)}")
+        finally:
+            self._connection = None
+            self._sftp = None
+            self._transport = None
+            
+    def listdir(self, path: str) -> List[str]:
+        """列出遠端目錄（使用共用的目錄列表快取）"""
+        return cached_listdir(self._sftp, config.SFTP_HOST, path)
+        
+    def listdir_attr(self, path: str) -> list:
+        """列出遠端目錄詳細資訊（使用共用的目錄列表快取）"""
+        return cached_listdir_attr(self._sftp, config.SFTP_HOST, path)
+        
+    def invalidate_cache(self, path: str = None) -> None:
+        """清除此伺服器的目錄列表快取（指定 path 時只清除該路徑及其子路徑）"""
+        listing_cache.invalidate(config.SFTP_HOST, path)
+            
+    def list_version_folders(self, path: str) -> List[VersionFolder]:
+        """
+        列出目錄下的資料夾（依版號由大到小排序）
+        經由版本資料夾索引，目錄 mtime 未改變時只需一次 stat
+        """
+        return version_index.get_folders(
+            config.SFTP_HOST, path,
+            stat_dir=lambda: self._sftp.stat(path),
+            list_dir=lambda: self._list_folder_entries(path)
+        )
+        
+    def _list_folder_entries(self, path: str) -> List[Tuple[str, bool, int]]:
+        """重新列出遠端目錄（目錄已變更，先清除列表快取）"""
+        listing_cache.invalidate(config.SFTP_HOST, path)
+        return [
+            (item.filename, stat.S_ISDIR(item.st_mode or 0), item.st_mtime or 0)
+            for item in self.listdir_attr(path)
+        ]
             
     def get_latest_version(self, sftp_path: str) -> Tuple[str, str, str]:
         """
@@ -62,28 +102,21 @@ class SFTPManager:
             path_parts = sftp_path.rstrip('/').split('/')
             db_folder = path_parts[-1] if path_parts else ''
             
-            # 列出目錄內容
+            # 列出目錄內容（索引已依版號由大到小排序）
             try:
-                items = self._sftp.listdir(sftp_path)
+                items = self.list_version_folders(sftp_path)
             except:
                 self.logger.warning(f"無法列出目錄: {sftp_path}")
                 return db_folder, '', sftp_path
             
             # 過濾版本資料夾（格式: 數字開頭，如 536_all_202507312300）
-            version_folders = []
-            for item in items:
-                # 檢查是否為版本資料夾格式
-                match = re.match(r'^(\d+)', item)
-                if match:
-                    version_num = int(match.group(1))
-                    version_folders.append((version_num, item))
+            version_folders = [(item.version, item.name) for item in items if item.version is not None]
             
             if not version_folders:
                 self.logger.warning(f"找不到版本資料夾: {sftp_path}")
                 return db_folder, '', sftp_path
             
-            # 按版本號排序，取最大的（最新的）
-            version_folders.sort(key=lambda x: x[0], reverse=True)
+            # 取版號最大的（最新的）
             latest_version = version_folders[0][1]
             full_path = f"{sftp_path}/{latest_version}"
             
@@ -115,12 +148,12 @@ class SFTPManager:
             
             # 列出目錄找到對應的 DB 資料夾
             parent_path = '/'.join(sftp_path.rstrip('/').split('/')[:-1])
-            items = self._sftp.listdir(parent_path)
+            items = self.list_version_folders(parent_path)
             
             db_folder = None
             for item in items:
-                if item.startswith(f"{db_number}_"):
-                    db_folder = item
+                if item.name.startswith(f"{db_number}_"):
+                    db_folder = item.name
                     break
             
             if not db_folder:
@@ -131,7 +164,7 @@ class SFTPManager:
             db_path = f"{parent_path}/{db_folder}"
             
             # 列出版本資料夾
-            version_items = self._sftp.listdir(db_path)
+            version_items = [item.name for item in self.list_version_folders(db_path)]
             
             # 找到對應版本
             for version_item in version_items:
@@ -5,6 +5,7 @@ import os
 import shutil
 import sys
 import json
+import gzip
 import threading
 import time
 import asyncio
@@ -18,13 +19,18 @@ from sftp_downloader import SFTPDownloader
 from file_comparator import FileComparator
 from zip_packager import ZipPackager
 import utils
-from flask import make_response
+from flask import make_response, Response, stream_with_context
 import utils
 import openpyxl
 from copy import copy
 import io
 from excel_handler import ExcelHandler
 from metadata_manager import metadata_manager
+from result_sidecar import result_sidecar
+from task_store import task_store
+from payload_cache import payload_cache
+from pivot_query import pivot_query
+from zip_stream import zip_stream
 from functools import wraps
 
 # 初始化 Flask 應用
@@ -59,11 +65,16 @@ for folder in ['uploads', 'downloads', 'compare_results', 'zip_output', 'logs']:
     if not os.path.exists(folder):
         os.makedirs(folder)
 
-# 全域變數存儲處理進度和歷史記錄
-processing_status = {}
-recent_activities = []
-recent_comparisons = []
-task_results = {}  # 儲存任務結果以供樞紐分析
+# 處理進度、任務結果與歷史記錄存放在 task_store（SQLite），重新啟動後仍然存在
+def init_task_store():
+    """
+    伺服器啟動時初始化任務記錄：第一次啟動時依既有的任務目錄建立統計，之後只在任務開始/結束時更新；
+    已結束的伺服器程序留下的處理中任務標記為中斷
+
+    比對使用 spawn 啟動的子程序會重新載入本模組，因此不可在模組載入時開啟任務記錄
+    """
+    task_store.seed_statistics({'download': 'downloads', 'compare': 'compare_results'})
+    task_store.reconcile_interrupted()
 
 class WebProcessor:
     """Web 處理器類別"""
@@ -79,8 +90,8 @@ class WebProcessor:
         self.results = {}
         self.logger = utils.setup_logger(f'WebProcessor_{task_id}')  # 添加 logger
 
-    def update_progress(self, progress, status, message, stats=None, files=None):
-        """更新處理進度"""
+    def update_progress(self, progress, status, message, stats=None, files=None, transfer=None):
+        """更新處理進度（transfer 為位元組層級的傳輸資訊：速率、預估剩餘時間等）"""
         self.progress = progress
         self.status = status
         self.message = message
@@ -109,7 +120,10 @@ class WebProcessor:
         if files:
             update_data['files'] = files
             
-        processing_status[self.task_id] = update_data
+        if transfer:
+            update_data['transfer'] = transfer
+            
+        task_store.set_status(self.task_id, update_data)
         
         # 透過 SocketIO 發送即時更新
         socketio.emit('progress_update', {
@@ -119,6 +133,7 @@ class WebProcessor:
         
     def process_one_step(self, excel_file, sftp_config):
         """執行一步到位處理 - 修正檔案資料保存"""
+        task_store.task_started(self.task_id, 'one_step')
         try:
             # 步驟 1：下載
             self.update_progress(10, 'downloading', '正在連接 SFTP 伺服器...')
@@ -134,14 +149,15 @@ class WebProcessor:
             )
             
             # 設定進度回調
-            def progress_callback(progress, status, message, stats=None, files=None):
+            def progress_callback(progress, status, message, stats=None, files=None, transfer=None):
                 if stats:
                     self.update_progress(
                         int(progress * 0.4),  # 下載佔總進度的 40%
                         status, 
                         message, 
                         stats=stats,
-                        files=files
+                        files=files,
+                        transfer=transfer
                     )
                 else:
                     self.update_progress(int(progress * 0.4), status, message)
@@ -258,7 +274,7 @@ class WebProcessor:
                 'files': files
             }
             
-            processing_status[self.task_id] = final_update_data
+            task_store.set_status(self.task_id, final_update_data)
             
             # 透過 SocketIO 發送最終更新
             socketio.emit('progress_update', {
@@ -289,6 +305,7 @@ class WebProcessor:
             
     def process_download(self, excel_file, sftp_config, options):
         """執行下載處理 - 包含 Excel 檔案複製改名功能"""
+        task_store.task_started(self.task_id, 'download')
         try:
             self.update_progress(10, 'downloading', '正在連接 SFTP 伺服器...')
             
@@ -303,14 +320,15 @@ class WebProcessor:
             )
             
             # 設定進度回調
-            def progress_callback(progress, status, message, stats=None, files=None):
+            def progress_callback(progress, status, message, stats=None, files=None, transfer=None):
                 if stats:
                     self.update_progress(
                         int(progress),
                         status, 
                         message, 
                         stats=stats,
-                        files=files
+                        files=files,
+                        transfer=transfer
                     )
                 else:
                     self.update_progress(int(progress), status, message)
@@ -588,6 +606,7 @@ class WebProcessor:
         import pandas as pd
         from file_comparator import FileComparator
         
+        task_store.task_started(self.task_id, 'compare')
         try:
             self.update_progress(10, 'comparing', '正在準備比對...')
             
@@ -720,46 +739,24 @@ class WebProcessor:
 # 輔助函數
 def add_activity(action, status, details=None):
     """添加活動記錄"""
-    activity = {
-        'timestamp': datetime.now(),
-        'action': action,
-        'status': status,
-        'details': details
-    }
-    recent_activities.insert(0, activity)
-    # 只保留最近 20 筆
-    if len(recent_activities) > 20:
-        recent_activities.pop()
+    task_store.add_activity(action, status, details)
 
 def add_comparison(task_id, scenario, status, modules):
     """添加比對記錄"""
-    comparison = {
-        'id': task_id,  # 使用傳入的 task_id
-        'task_id': task_id,  # 明確保存 task_id
-        'timestamp': datetime.now(),
-        'scenario': scenario,
-        'status': status,
-        'modules': modules,
-        'duration': '< 1 分鐘'
-    }
-    recent_comparisons.insert(0, comparison)
-    # 只保留最近 10 筆
-    if len(recent_comparisons) > 10:
-        recent_comparisons.pop()
+    task_store.add_comparison(task_id, scenario, status, modules)
 
 def save_task_results(task_id, results):
     """儲存任務結果供樞紐分析使用"""
     # 確保儲存完整的結果
-    task_results[task_id] = {
+    task_store.save_results(task_id, {
         'results': results,
         'summary_report': results.get('summary_report', ''),
         'compare_results': results.get('compare_results', {}),
         'timestamp': datetime.now()
-    }
+    })
     
-    # 同時更新 processing_status 以確保資料持久性
-    if task_id in processing_status:
-        processing_status[task_id]['results'] = results
+    # 同時更新任務狀態中的結果
+    task_store.update_results(task_id, results)
 
 def global_login_required(f):
     """全域登入檢查裝飾器"""
@@ -977,16 +974,17 @@ def process_compare():
 def get_status(task_id):
     """取得任務狀態 API - 增強版，支援從文件系統恢復任務狀態"""
     
-    # 1. 首先檢查記憶體中的狀態
-    if task_id in processing_status:
-        return jsonify(processing_status[task_id])
+    # 1. 首先檢查任務記錄
+    task_status = task_store.get_status(task_id)
+    if task_status is not None:
+        return jsonify(task_status)
     
-    # 2. 如果記憶體中沒有，嘗試從文件系統恢復任務狀態
+    # 2. 如果沒有記錄（例如記錄建立前的任務），嘗試從文件系統恢復任務狀態
     try:
         task_status = recover_task_status_from_filesystem(task_id)
         if task_status:
-            # 將恢復的狀態存回記憶體中，供後續使用
-            processing_status[task_id] = task_status
+            # 將恢復的狀態寫入任務記錄，之後不必再掃描目錄
+            task_store.set_status(task_id, task_status, force=True)
             return jsonify(task_status)
     except Exception as e:
         app.logger.error(f'Error recovering task status for {task_id}: {str(e)}')
@@ -1092,6 +1090,8 @@ def generate_folder_structure_from_directory(directory):
     
     try:
         for root, dirs, files in os.walk(directory):
+            # 略過比對結果的欄式副本
+            dirs[:] = [d for d in dirs if not result_sidecar.is_sidecar_dir(d)]
             # 獲取相對路徑
             rel_path = os.path.relpath(root, directory)
             if rel_path == '.':
@@ -1199,12 +1199,24 @@ def read_summary_stats_from_excel(excel_file):
     try:
         import pandas as pd
         
+        # 優先使用比對時寫入的摘要 JSON
+        summary = result_sidecar.read_summary(excel_file)
+        if summary is not None:
+            return {
+                'success': summary.get('success', 0),
+                'failed': summary.get('failed', 0),
+                'identical': summary.get('identical', 0),
+                'modules': summary.get('modules', []),
+                'failed_modules': summary.get('failed_modules', [])
+            }
+        
         # 讀取摘要頁籤
-        df = pd.read_excel(excel_file, sheet_name='摘要')
+        df = result_sidecar.read_excel(excel_file, sheet_name='摘要')
         
         # 查找成功模組數和失敗模組數
         success_count = 0
         failed_count = 0
+        identical_count = 0
         success_modules = []
         failed_modules = []
         
@@ -1224,6 +1236,12 @@ def read_summary_stats_from_excel(excel_file):
                 except:
                     failed_count = 0
                     
+            elif '內容相同模組數' in item:
+                try:
+                    identical_count = int(value)
+                except:
+                    identical_count = 0
+                    
             elif '成功模組清單' in item and value and str(value) != '無':
                 try:
                     success_modules = [m.strip() for m in str(value).split(',') if m.strip()]
@@ -1239,6 +1257,7 @@ def read_summary_stats_from_excel(excel_file):
         return {
             'success': success_count,
             'failed': failed_count,
+            'identical': identical_count,
             'modules': success_modules,
             'failed_modules': failed_modules
         }
@@ -1350,8 +1369,8 @@ def get_recent_activities():
     try:
         activities = []
         
-        # 1. 從記憶體中的活動記錄
-        for activity in recent_activities[:10]:
+        # 1. 從活動記錄
+        for activity in task_store.recent_activities(10):
             activities.append({
                 'timestamp': activity['timestamp'].isoformat(),
                 'action': activity['action'],
@@ -1359,7 +1378,7 @@ def get_recent_activities():
                 'details': activity['details']
             })
         
-        # 2. 如果記憶體中沒有足夠的活動，從檔案系統推斷
+        # 2. 如果記錄中沒有足夠的活動，從檔案系統推斷
         if len(activities) < 5:
             inferred_activities = infer_activities_from_filesystem()
             activities.extend(inferred_activities)
@@ -1451,25 +1470,18 @@ def get_recent_comparisons():
         'status': comp['status'],
         'modules': comp['modules'],
         'duration': comp.get('duration', '< 1 分鐘')
-    } for comp in recent_comparisons[:10]])
+    } for comp in task_store.recent_comparisons(10)])
 
 @app.route('/api/statistics')
 def get_statistics():
-    """取得真實統計資料"""
+    """取得真實統計資料（任務開始/結束時更新的統計計數，不需掃描目錄）"""
     try:
-        # 計算總處理數
-        total_processed = calculate_total_processed()
-        
-        # 計算今日處理數
-        today_processed = calculate_today_processed()
-        
-        # 計算成功率
-        success_rate = calculate_success_rate()
+        stats = task_store.get_statistics()
         
         return jsonify({
-            'total': total_processed,
-            'today': today_processed,
-            'successRate': success_rate
+            'total': stats['total'],
+            'today': stats['today'],
+            'successRate': stats['success_rate']
         })
         
     except Exception as e:
@@ -1481,76 +1493,27 @@ def get_statistics():
             'successRate': 0
         })
 
-def calculate_success_rate():
-    """計算成功率"""
-    if not processing_status and not recent_activities and not recent_comparisons:
-        return 0
-    
-    total_tasks = 0
-    successful_tasks = 0
-    
-    # 從處理狀態計算
-    for task_id, status in processing_status.items():
-        if task_id.startswith('task_'):
-            total_tasks += 1
-            if status.get('status') == 'completed':
-                successful_tasks += 1
-    
-    # 從比對記錄計算
-    for comparison in recent_comparisons:
-        total_tasks += 1
-        if comparison.get('status') == 'completed':
-            successful_tasks += 1
-    
-    # 從活動記錄計算（只計算明確標示成功/失敗的活動）
-    for activity in recent_activities:
-        if activity.get('status') in ['success', 'error']:
-            total_tasks += 1
-            if activity.get('status') == 'success':
-                successful_tasks += 1
-    
-    # 避免除以零
-    if total_tasks == 0:
-        return 0
-    
-    # 計算百分比並四捨五入
-    success_rate = (successful_tasks / total_tasks) * 100
-    return round(success_rate, 1)
-
 @app.route('/api/detailed-statistics')
 def get_detailed_statistics():
     """取得詳細統計資料"""
     try:
-        # 基本統計
-        total = calculate_total_processed()
-        today = calculate_today_processed()
-        success_rate = calculate_success_rate()
-        
-        # 額外統計
-        download_tasks = count_download_tasks()
-        compare_tasks = count_compare_tasks()
-        failed_tasks = count_failed_tasks()
-        
-        # 本週統計
-        week_processed = calculate_week_processed()
-        
-        # 平均處理時間（如果有記錄的話）
-        avg_processing_time = calculate_average_processing_time()
+        stats = task_store.get_statistics()
         
         return jsonify({
             'basic': {
-                'total': total,
-                'today': today,
-                'successRate': success_rate
+                'total': stats['total'],
+                'today': stats['today'],
+                'successRate': stats['success_rate']
             },
             'breakdown': {
-                'downloadTasks': download_tasks,
-                'compareTasks': compare_tasks,
-                'failedTasks': failed_tasks
+                'downloadTasks': stats['download_tasks'],
+                'compareTasks': stats['compare_tasks'],
+                'failedTasks': stats['failed']
             },
             'temporal': {
-                'weekProcessed': week_processed,
-                'avgProcessingTime': avg_processing_time
+                'weekProcessed': stats['week'],
+                # 已完成任務的實際平均處理時間（分鐘）
+                'avgProcessingTime': round(stats['avg_duration'] / 60, 1)
             }
         })
         
@@ -1558,294 +1521,149 @@ def get_detailed_statistics():
         app.logger.error(f'Detailed statistics error: {e}')
         return jsonify({'error': str(e)}), 500
 
-def calculate_average_processing_time():
-    """計算平均處理時間（分鐘）"""
-    # 這個需要你在處理過程中記錄開始和結束時間
-    # 目前先返回估計值
-    try:
-        # 可以從 processing_status 或其他地方獲取實際處理時間
-        # 這裡提供一個簡單的估算
-        total_tasks = len(processing_status)
-        if total_tasks > 0:
-            # 假設平均每個任務 5 分鐘（你可以根據實際情況調整）
-            return 5.0
-        return 0.0
-    except Exception:
-        return 0.0
-
-def calculate_week_processed():
-    """計算本週處理數"""
-    from datetime import datetime, timedelta
-    
-    # 獲取本週的開始日期（週一）
-    today = datetime.now()
-    week_start = today - timedelta(days=today.weekday())
-    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    week_count = 0
-    
-    # 從活動記錄計算
-    for activity in recent_activities:
-        try:
-            if activity['timestamp'] >= week_start:
-                week_count += 1
-        except Exception:
-            continue
-    
-    # 從比對記錄計算
-    for comparison in recent_comparisons:
-        try:
-            if comparison['timestamp'] >= week_start:
-                week_count += 1
-        except Exception:
-            continue
-            
-    return week_count
-
-def count_failed_tasks():
-    """統計失敗任務數量"""
-    failed_count = 0
-    
-    # 從處理狀態統計
-    for status in processing_status.values():
-        if status.get('status') == 'error':
-            failed_count += 1
-    
-    # 從活動記錄統計
-    for activity in recent_activities:
-        if activity.get('status') == 'error':
-            failed_count += 1
-            
-    return failed_count
-
-def count_compare_tasks():
-    """統計比對任務數量"""
-    count = 0
-    compare_dir = 'compare_results'
-    if os.path.exists(compare_dir):
-        try:
-            count = len([d for d in os.listdir(compare_dir) 
-                        if d.startswith('task_') and os.path.isdir(os.path.join(compare_dir, d))])
-        except Exception:
-            pass
-    return count
-
-def count_download_tasks():
-    """統計下載任務數量"""
-    count = 0
-    downloads_dir = 'downloads'
-    if os.path.exists(downloads_dir):
-        try:
-            count = len([d for d in os.listdir(downloads_dir) 
-                        if d.startswith('task_') and os.path.isdir(os.path.join(downloads_dir, d))])
-        except Exception:
-            pass
-    return count
+def build_pivot_payload(summary_report_path, paged=False):
+    """
+    讀取報表的所有工作表並轉換為樞紐分析使用的 JSON（bytes）
 
-def calculate_today_processed():
-    """計算今日處理數"""
-    from datetime import datetime, timedelta
+    Args:
+        summary_report_path: 報表路徑
+        paged: 超過 config.PIVOT_INLINE_MAX_ROWS 筆的工作表只回傳欄位與概要（paged: true），
+               資料列改由 /api/pivot-rows 分頁取得、樞紐分析改由 /api/pivot-aggregate 計算
+    """
+    app.logger.info(f'Reading Excel file: {summary_report_path}')
     
-    today = datetime.now().date()
-    today_count = 0
+    # 讀取所有工作表（優先使用欄式副本，已處理 NaN 與日期）
+    excel_data = pivot_query.load_sheets(summary_report_path)
     
-    # 從活動記錄計算今日處理數
-    for activity in recent_activities:
-        try:
-            # activity['timestamp'] 是 datetime 物件
-            activity_date = activity['timestamp'].date()
-            if activity_date == today:
-                today_count += 1
-        except Exception as e:
-            app.logger.warning(f'Error parsing activity timestamp: {e}')
-            continue
+    # 列出所有工作表名稱
+    app.logger.info(f'Available sheets: {list(excel_data.keys())}')
     
-    # 從比對記錄計算今日處理數
-    for comparison in recent_comparisons:
-        try:
-            # comparison['timestamp'] 是 datetime 物件
-            comparison_date = comparison['timestamp'].date()
-            if comparison_date == today:
-                today_count += 1
-        except Exception as e:
-            app.logger.warning(f'Error parsing comparison timestamp: {e}')
+    # 轉換為 JSON 格式
+    pivot_data = {}
+    for sheet_name, df in excel_data.items():
+        app.logger.info(f'Processing sheet: {sheet_name} with {len(df)} rows')
+        
+        if paged and len(df) > config.PIVOT_INLINE_MAX_ROWS:
+            pivot_data[sheet_name] = {
+                'columns': df.columns.tolist(),
+                'data': [],
+                'paged': True,
+                **pivot_query.describe(df)
+            }
             continue
+        
+        # 將 DataFrame 轉換為記錄格式
+        pivot_data[sheet_name] = {
+            'columns': df.columns.tolist(),
+            'data': df.to_dict('records')
+        }
     
-    # 從任務目錄的修改時間計算
-    try:
-        for dir_name in ['downloads', 'compare_results']:
-            if os.path.exists(dir_name):
-                for item in os.listdir(dir_name):
-                    if item.startswith('task_'):
-                        item_path = os.path.join(dir_name, item)
-                        if os.path.isdir(item_path):
-                            # 獲取目錄的修改時間
-                            mtime = os.path.getmtime(item_path)
-                            mdate = datetime.fromtimestamp(mtime).date()
-                            if mdate == today:
-                                today_count += 1
-    except Exception as e:
-        app.logger.warning(f'Error counting today tasks from directories: {e}')
+    app.logger.info(f'Successfully loaded {len(pivot_data)} sheets')
+    # 與 jsonify 的輸出相同
+    return app.json.response(pivot_data).get_data()
+
+def gzip_json_response(payload):
+    """以 gzip 壓縮的 JSON 建立回應（用戶端不接受 gzip 時解壓縮後回傳）"""
+    if 'gzip' in request.accept_encodings:
+        response = make_response(payload)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = make_response(gzip.decompress(payload))
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def find_pivot_report(task_id, scenario):
+    """依情境查找樞紐分析使用的報表，找不到時回傳 None"""
+    summary_report_path = None
+    
+    # 1. 根據您提供的實際路徑結構進行精確映射
+    if scenario == 'all':
+        # 全部情境使用 all_scenarios_summary.xlsx
+        summary_report_path = os.path.join('compare_results', task_id, 'all_scenarios_summary.xlsx')
+        if not os.path.exists(summary_report_path):
+            # 備選路徑
+            alt_paths = [
+                os.path.join('compare_results', task_id, 'all_scenarios_compare.xlsx'),
+                os.path.join('compare_results', task_id, 'all_compare.xlsx')
+            ]
+            for path in alt_paths:
+                if os.path.exists(path):
+                    summary_report_path = path
+                    break
+    else:
+        # 根據實際的資料夾結構，不需要映射！
+        # 前端的 scenario 名稱就是實際的資料夾名稱
+        folder_name = scenario  # 直接使用 scenario 作為資料夾名稱
+        
+        # 構建精確路徑
+        summary_report_path = os.path.join('compare_results', task_id, folder_name, 'all_scenarios_compare.xlsx')
+        app.logger.info(f'Checking path: {summary_report_path}')
+        
+        if not os.path.exists(summary_report_path):
+            app.logger.warning(f'File not found at primary path: {summary_report_path}')
+            
+            # 嘗試其他可能的檔名
+            alt_names = ['all_compare.xlsx', f'{folder_name}_compare.xlsx']
+            for alt_name in alt_names:
+                alt_path = os.path.join('compare_results', task_id, folder_name, alt_name)
+                app.logger.info(f'Trying alternative path: {alt_path}')
+                if os.path.exists(alt_path):
+                    summary_report_path = alt_path
+                    app.logger.info(f'Found alternative file: {alt_path}')
+                    break
     
-    return today_count
+    if not summary_report_path or not os.path.exists(summary_report_path):
+        return None
+    return summary_report_path
 
-def calculate_total_processed():
-    """計算總處理數"""
-    total = 0
-    
-    # 方法1：從活動記錄計算
-    total += len(recent_activities)
-    
-    # 方法2：從比對記錄計算
-    total += len(recent_comparisons)
+def pivot_report_not_found(task_id, scenario):
+    """找不到報表時的錯誤回應（列出實際存在的報表供除錯）"""
+    app.logger.error(f'Could not find report for scenario: {scenario}')
     
-    # 方法3：從檔案系統計算（統計已完成的任務目錄）
-    try:
-        # 統計 downloads 目錄下的任務資料夾
-        downloads_dir = 'downloads'
-        if os.path.exists(downloads_dir):
-            download_tasks = [d for d in os.listdir(downloads_dir) 
-                            if d.startswith('task_') and os.path.isdir(os.path.join(downloads_dir, d))]
-            total += len(download_tasks)
-        
-        # 統計 compare_results 目錄下的任務資料夾
-        compare_dir = 'compare_results'
-        if os.path.exists(compare_dir):
-            compare_tasks = [d for d in os.listdir(compare_dir) 
-                           if d.startswith('task_') and os.path.isdir(os.path.join(compare_dir, d))]
-            total += len(compare_tasks)
-            
-    except Exception as e:
-        app.logger.warning(f'Error counting task directories: {e}')
+    # 列出實際存在的檔案結構供除錯
+    compare_dir = os.path.join('compare_results', task_id)
+    available_files = []
     
-    # 去重複（因為同一個任務可能同時有下載和比對）
-    unique_tasks = set()
+    if os.path.exists(compare_dir):
+        app.logger.info(f'Listing directory structure for {compare_dir}:')
+        for root, dirs, files in os.walk(compare_dir):
+            for file in files:
+                if file.endswith('.xlsx'):
+                    rel_path = os.path.relpath(os.path.join(root, file), compare_dir)
+                    available_files.append(rel_path)
+                    app.logger.info(f'  Found: {rel_path}')
     
-    # 從處理狀態獲取唯一任務
-    for task_id in processing_status.keys():
-        if task_id.startswith('task_'):
-            unique_tasks.add(task_id)
+    # 返回更詳細的錯誤訊息
+    error_msg = f'找不到資料檔案：{scenario}'
     
-    # 從目錄獲取唯一任務
-    try:
-        for dir_name in ['downloads', 'compare_results']:
-            if os.path.exists(dir_name):
-                for item in os.listdir(dir_name):
-                    if item.startswith('task_') and os.path.isdir(os.path.join(dir_name, item)):
-                        unique_tasks.add(item)
-    except Exception:
-        pass
-    
-    return len(unique_tasks) if unique_tasks else max(total, 0)
+    return jsonify({
+        'error': error_msg,
+        'available_files': available_files
+    }), 404
 
 @app.route('/api/pivot-data/<task_id>')
 def get_pivot_data(task_id):
-    """取得樞紐分析資料 API - 支援按情境查找"""
+    """取得樞紐分析資料 API - 支援按情境查找（paged=1 時大型工作表改由伺服器端分頁）"""
     try:
         app.logger.info(f'Getting pivot data for task: {task_id}')
         
         # 檢查是否有情境參數
         scenario = request.args.get('scenario', 'all')
+        paged = request.args.get('paged') == '1'
         app.logger.info(f'Requested scenario: {scenario}')
         
         # 查找任務結果
-        summary_report_path = None
+        summary_report_path = find_pivot_report(task_id, scenario)
+        if not summary_report_path:
+            return pivot_report_not_found(task_id, scenario)
         
-        # 1. 根據您提供的實際路徑結構進行精確映射
-        if scenario == 'all':
-            # 全部情境使用 all_scenarios_summary.xlsx
-            summary_report_path = os.path.join('compare_results', task_id, 'all_scenarios_summary.xlsx')
-            if not os.path.exists(summary_report_path):
-                # 備選路徑
-                alt_paths = [
-                    os.path.join('compare_results', task_id, 'all_scenarios_compare.xlsx'),
-                    os.path.join('compare_results', task_id, 'all_compare.xlsx')
-                ]
-                for path in alt_paths:
-                    if os.path.exists(path):
-                        summary_report_path = path
-                        break
-        else:
-            # 根據實際的資料夾結構，不需要映射！
-            # 前端的 scenario 名稱就是實際的資料夾名稱
-            folder_name = scenario  # 直接使用 scenario 作為資料夾名稱
-            
-            # 構建精確路徑
-            summary_report_path = os.path.join('compare_results', task_id, folder_name, 'all_scenarios_compare.xlsx')
-            app.logger.info(f'Checking path: {summary_report_path}')
-            
-            if not os.path.exists(summary_report_path):
-                app.logger.warning(f'File not found at primary path: {summary_report_path}')
-                
-                # 嘗試其他可能的檔名
-                alt_names = ['all_compare.xlsx', f'{folder_name}_compare.xlsx']
-                for alt_name in alt_names:
-                    alt_path = os.path.join('compare_results', task_id, folder_name, alt_name)
-                    app.logger.info(f'Trying alternative path: {alt_path}')
-                    if os.path.exists(alt_path):
-                        summary_report_path = alt_path
-                        app.logger.info(f'Found alternative file: {alt_path}')
-                        break
-        
-        # 2. 如果還是找不到，提供詳細的錯誤訊息
-        if not summary_report_path or not os.path.exists(summary_report_path):
-            app.logger.error(f'Could not find report for scenario: {scenario}')
-            
-            # 列出實際存在的檔案結構供除錯
-            compare_dir = os.path.join('compare_results', task_id)
-            available_files = []
-            
-            if os.path.exists(compare_dir):
-                app.logger.info(f'Listing directory structure for {compare_dir}:')
-                for root, dirs, files in os.walk(compare_dir):
-                    for file in files:
-                        if file.endswith('.xlsx'):
-                            rel_path = os.path.relpath(os.path.join(root, file), compare_dir)
-                            available_files.append(rel_path)
-                            app.logger.info(f'  Found: {rel_path}')
-            
-            # 返回更詳細的錯誤訊息
-            error_msg = f'找不到資料檔案：{scenario}'
-            
-            return jsonify({
-                'error': error_msg,
-                'available_files': available_files
-            }), 404
-        
-        # 3. 讀取並返回資料
+        # 讀取並返回資料（報表未改變時直接使用快取的壓縮 JSON）
         try:
-            app.logger.info(f'Reading Excel file: {summary_report_path}')
-            
-            # 讀取 Excel 檔案的所有工作表
-            excel_data = pd.read_excel(summary_report_path, sheet_name=None)
-            
-            # 列出所有工作表名稱
-            app.logger.info(f'Available sheets: {list(excel_data.keys())}')
-            
-            # 轉換為 JSON 格式
-            pivot_data = {}
-            for sheet_name, df in excel_data.items():
-                app.logger.info(f'Processing sheet: {sheet_name} with {len(df)} rows')
-                
-                # 處理 NaN 值
-                df = df.fillna('')
-                
-                # 將日期轉換為字串
-                for col in df.columns:
-                    if df[col].dtype == 'datetime64[ns]':
-                        df[col] = df[col].astype(str)
-                    elif df[col].dtype == 'object':
-                        # 確保所有值都是可序列化的
-                        df[col] = df[col].apply(lambda x: str(x) if pd.notna(x) else '')
-                
-                # 將 DataFrame 轉換為記錄格式
-                pivot_data[sheet_name] = {
-                    'columns': df.columns.tolist(),
-                    'data': df.to_dict('records')
-                }
-            
-            app.logger.info(f'Successfully loaded {len(pivot_data)} sheets')
-            return jsonify(pivot_data)
+            st = os.stat(summary_report_path)
+            cache_key = ('pivot-data', os.path.realpath(summary_report_path), st.st_size, st.st_mtime_ns, scenario, paged)
+            payload = payload_cache.get_or_build(cache_key, lambda: build_pivot_payload(summary_report_path, paged))
+            return gzip_json_response(payload)
             
         except Exception as e:
             app.logger.error(f'Error reading Excel file: {e}')
@@ -1859,6 +1677,72 @@ def get_pivot_data(task_id):
         app.logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/pivot-rows/<task_id>')
+def get_pivot_rows(task_id):
+    """取得一頁資料列 API（伺服器端篩選、搜尋、排序與分頁）"""
+    try:
+        scenario = request.args.get('scenario', 'all')
+        sheet = request.args.get('sheet')
+        if not sheet:
+            return jsonify({'error': '缺少資料表名稱'}), 400
+        
+        summary_report_path = find_pivot_report(task_id, scenario)
+        if not summary_report_path:
+            return pivot_report_not_found(task_id, scenario)
+        
+        result = pivot_query.page_rows(
+            summary_report_path, sheet,
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', config.PIVOT_PAGE_SIZE, type=int),
+            sort=request.args.get('sort'),
+            order=request.args.get('order', 'asc'),
+            filters=pivot_query.parse_json_arg(request.args.get('filters'), {}),
+            exclusions=pivot_query.parse_json_arg(request.args.get('exclusions'), {}),
+            search=request.args.get('search', '')
+        )
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f'Get pivot rows error: {e}')
+        import traceback
+        app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/pivot-aggregate/<task_id>', methods=['POST'])
+def get_pivot_aggregate(task_id):
+    """樞紐分析彙總 API（rows / cols / vals / aggregatorName / exclusions 與 pivotUI 設定相同）"""
+    try:
+        data = request.json or {}
+        scenario = data.get('scenario', 'all')
+        sheet = data.get('sheet')
+        if not sheet:
+            return jsonify({'error': '缺少資料表名稱'}), 400
+        
+        summary_report_path = find_pivot_report(task_id, scenario)
+        if not summary_report_path:
+            return pivot_report_not_found(task_id, scenario)
+        
+        result = pivot_query.aggregate(
+            summary_report_path, sheet,
+            rows=data.get('rows', []),
+            cols=data.get('cols', []),
+            aggregator=data.get('aggregatorName', 'Count'),
+            vals=data.get('vals', []),
+            filters=data.get('filters', {}),
+            exclusions=data.get('exclusions', {})
+        )
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f'Get pivot aggregate error: {e}')
+        import traceback
+        app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
 def row_belongs_to_scenario(row, scenario):
     """判斷資料行是否屬於特定情境"""
     base_folder = str(row.get('base_folder', ''))
@@ -2108,10 +1992,10 @@ def prepare_download(task_id):
         time.sleep(3)  # 模擬檔案準備時間
         # 實際應用中這裡應該生成真實的檔案
         download_url = f"/api/download-ready/{download_task_id}"
-        processing_status[download_task_id] = {
+        task_store.set_status(download_task_id, {
             'ready': True,
             'download_url': download_url
-        }
+        })
     
     thread = threading.Thread(target=prepare_file)
     thread.start()
@@ -2124,7 +2008,7 @@ def prepare_download(task_id):
 @app.route('/api/download-status/<task_id>')
 def download_status(task_id):
     """檢查下載準備狀態"""
-    status = processing_status.get(task_id, {'ready': False})
+    status = task_store.get_status(task_id) or {'ready': False}
     return jsonify(status)
 
 @app.route('/api/download-ready/<task_id>')
@@ -2204,64 +2088,56 @@ def export_excel(task_id):
         app.logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+def iter_export_members(task_id):
+    """列出匯出 ZIP 的成員（下載的檔案與比對結果，沒有任何檔案時加入 README）"""
+    files_added = False
+    
+    # 添加下載的檔案
+    download_dir = os.path.join('downloads', task_id)
+    if os.path.exists(download_dir):
+        for member in zip_stream.walk_directory(download_dir, 'downloads'):
+            files_added = True
+            yield member
+        app.logger.info(f'Added downloads directory: {download_dir}')
+    
+    # 添加比對結果（欄式副本只供網頁讀取，不打包）
+    compare_dir = os.path.join('compare_results', task_id)
+    if os.path.exists(compare_dir):
+        for member in zip_stream.walk_directory(compare_dir, 'compare_results', result_sidecar.is_sidecar_dir):
+            files_added = True
+            yield member
+        app.logger.info(f'Added compare results directory: {compare_dir}')
+    
+    # 如果沒有檔案，至少添加一個 README
+    if not files_added:
+        readme_content = f'任務 ID: {task_id}\n'
+        readme_content += f'創建時間: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
+        readme_content += '暫無比對結果\n'
+        yield 'README.txt', readme_content.encode('utf-8')
+
 @app.route('/api/export-zip/<task_id>')
 def export_zip(task_id):
-    """匯出 ZIP 檔案 API - 包含所有結果"""
+    """匯出 ZIP 檔案 API - 包含所有結果（邊壓縮邊傳送，不在記憶體中建立整個壓縮檔）"""
     try:
-        import tempfile
-        import shutil
-        import zipfile
-        import io
-        
-        # 使用 BytesIO 而不是臨時檔案
-        zip_buffer = io.BytesIO()
-        
-        # 創建 ZIP
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            files_added = False
-            
-            # 添加下載的檔案
-            download_dir = os.path.join('downloads', task_id)
-            if os.path.exists(download_dir):
-                for root, dirs, files in os.walk(download_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arc_name = os.path.join('downloads', os.path.relpath(file_path, download_dir))
-                        zipf.write(file_path, arc_name)
-                        files_added = True
-                app.logger.info(f'Added downloads directory: {download_dir}')
-            
-            # 添加比對結果
-            compare_dir = os.path.join('compare_results', task_id)
-            if os.path.exists(compare_dir):
-                for root, dirs, files in os.walk(compare_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arc_name = os.path.join('compare_results', os.path.relpath(file_path, compare_dir))
-                        zipf.write(file_path, arc_name)
-                        files_added = True
-                app.logger.info(f'Added compare results directory: {compare_dir}')
-            
-            # 如果沒有檔案，至少添加一個 README
-            if not files_added:
-                readme_content = f'任務 ID: {task_id}\n'
-                readme_content += f'創建時間: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
-                readme_content += '暫無比對結果\n'
-                zipf.writestr('README.txt', readme_content.encode('utf-8'))
-        
-        # 重置 buffer 位置
-        zip_buffer.seek(0)
-        
         # 生成檔案名稱
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         zip_filename = f'results_{task_id}_{timestamp}.zip'
         
-        # 返回檔案
-        return send_file(
-            zip_buffer,
+        def generate():
+            try:
+                yield from zip_stream.generate(iter_export_members(task_id))
+            except Exception as e:
+                # 已開始傳送後無法再回傳錯誤，只能記錄並中斷
+                app.logger.error(f'Export ZIP stream error: {e}')
+                import traceback
+                app.logger.error(traceback.format_exc())
+                raise
+        
+        # 返回串流（長度未知，以 chunked 傳送）
+        return Response(
+            stream_with_context(generate()),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=zip_filename
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
         )
         
     except Exception as e:
@@ -2394,8 +2270,8 @@ def download_report(task_id):
     """下載報表 API"""
     try:
         # 查找任務的下載報告
-        if task_id in processing_status:
-            task_data = processing_status[task_id]
+        task_data = task_store.get_status(task_id)
+        if task_data is not None:
             report_path = task_data.get('results', {}).get('download_report')
             
             if report_path and os.path.exists(report_path):
@@ -2528,8 +2404,8 @@ def list_export_tasks():
                         })
         
         # 從處理狀態獲取任務
-        for task_id, status in processing_status.items():
-            if status.get('status') == 'completed':
+        for task_id, status in task_store.task_statuses().items():
+            if status == 'completed':
                 tasks.append({
                     'id': task_id,
                     'name': f'處理任務 {task_id}',
@@ -2600,14 +2476,14 @@ def get_task_data(task_id):
     """獲取任務資料的輔助函數"""
     try:
         # 1. 從處理狀態中查找
-        if task_id in processing_status:
-            task_data = processing_status[task_id]
+        task_data = task_store.get_status(task_id)
+        if task_data is not None:
             results = task_data.get('results', {})
             
             if 'summary_report' in results:
                 summary_report_path = results['summary_report']
                 if os.path.exists(summary_report_path):
-                    excel_data = pd.read_excel(summary_report_path, sheet_name=None)
+                    excel_data = result_sidecar.read_excel(summary_report_path)
                     data = {}
                     for sheet_name, df in excel_data.items():
                         df = df.fillna('')
@@ -2623,7 +2499,7 @@ def get_task_data(task_id):
             for file in os.listdir(compare_dir):
                 if file == 'all_compare.xlsx' or file.endswith('_summary.xlsx'):
                     file_path = os.path.join(compare_dir, file)
-                    excel_data = pd.read_excel(file_path, sheet_name=None)
+                    excel_data = result_sidecar.read_excel(file_path)
                     data = {}
                     for sheet_name, df in excel_data.items():
                         df = df.fillna('')
@@ -3404,8 +3280,8 @@ def export_excel_single_sheet(task_id, sheet_name):
                         break
         
         # 2. 從處理狀態中查找
-        if not excel_path and task_id in processing_status:
-            task_data = processing_status[task_id]
+        task_data = None if excel_path else task_store.get_status(task_id)
+        if task_data is not None:
             results = task_data.get('results', {})
             if 'summary_report' in results and os.path.exists(results['summary_report']):
                 excel_path = results['summary_report']
@@ -3551,8 +3427,7 @@ def handle_download_complete(task_id):
         )
         
         # 更新任務結果
-        if task_id in processing_status:
-            processing_status[task_id]['results'].update(excel_result)
+        task_store.update_results(task_id, excel_result, merge=True)
         
         return jsonify(excel_result)
         
@@ -3688,5 +3563,6 @@ def get_config():
     })
     
 if __name__ == '__main__':
+    init_task_store()
     # 開發模式執行
     socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
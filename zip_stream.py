@@ -0,0 +1,122 @@
+"""
+串流 ZIP 模組
+邊加入檔案邊產生 ZIP 內容片段（data descriptor 格式、支援 ZIP64），
+不需要先在記憶體或暫存檔中建立整個壓縮檔，大型任務匯出時記憶體用量固定、第一個位元組立即送出
+"""
+import os
+import zipfile
+from typing import Iterable, Iterator, Tuple, Union
+import utils
+
+logger = utils.setup_logger(__name__)
+
+# 每次讀取來源檔案的大小
+CHUNK_SIZE = 1024 * 1024
+
+# 已經壓縮過的格式直接儲存，不再以 deflate 壓縮
+STORED_SUFFIXES = ('.xlsx', '.zip', '.gz', '.tgz', '.7z', '.jar', '.apk')
+
+# ZIP 成員來源：檔案路徑或內容
+ZipSource = Union[str, bytes]
+
+class _ChunkBuffer:
+    """只能寫入的緩衝區（沒有 seek / tell，zipfile 會改用 data descriptor 寫入）"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        """取出目前累積的內容"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ZipStream:
+    """串流 ZIP 產生類別"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        """
+        初始化
+
+        Args:
+            chunk_size: 每次讀取來源檔案的大小
+        """
+        self.chunk_size = chunk_size
+        self.logger = logger
+
+    @staticmethod
+    def compress_type(arc_name: str) -> int:
+        """依副檔名決定壓縮方式（已壓縮的格式直接儲存）"""
+        return zipfile.ZIP_STORED if arc_name.lower().endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+
+    def generate(self, members: Iterable[Tuple[str, ZipSource]]) -> Iterator[bytes]:
+        """
+        產生 ZIP 內容片段
+
+        Args:
+            members: (壓縮檔內的路徑, 檔案路徑或內容)，可以是產生器，走訪時才加入
+
+        Yields:
+            ZIP 內容片段（依序串接即為完整的 ZIP 檔）
+        """
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+            for arc_name, source in members:
+                if isinstance(source, bytes):
+                    zipf.writestr(arc_name, source, compress_type=self.compress_type(arc_name))
+                else:
+                    yield from self._write_file(zipf, buffer, arc_name, source)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+        # 中央目錄在關閉時寫入
+        data = buffer.drain()
+        if data:
+            yield data
+
+    def _write_file(self, zipf: zipfile.ZipFile, buffer: _ChunkBuffer,
+                    arc_name: str, file_path: str) -> Iterator[bytes]:
+        """分段讀取檔案寫入 ZIP，每段寫入後送出已產生的內容"""
+        zinfo = zipfile.ZipInfo.from_file(file_path, arc_name, strict_timestamps=False)
+        zinfo.compress_type = self.compress_type(arc_name)
+        # 依檔案大小決定是否使用 ZIP64（file_size 已由 from_file 設定）
+        with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+            while True:
+                chunk = src.read(self.chunk_size)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+    @staticmethod
+    def walk_directory(directory: str, prefix: str, skip_dir=None) -> Iterator[Tuple[str, str]]:
+        """
+        列出目錄下的檔案作為 ZIP 成員
+
+        Args:
+            directory: 來源目錄
+            prefix: 壓縮檔內的上層路徑
+            skip_dir: 回傳 True 的子目錄名稱不打包
+
+        Yields:
+            (壓縮檔內的路徑, 檔案路徑)
+        """
+        for root, dirs, files in os.walk(directory):
+            if skip_dir is not None:
+                dirs[:] = [d for d in dirs if not skip_dir(d)]
+            for file in files:
+                file_path = os.path.join(root, file)
+                yield os.path.join(prefix, os.path.relpath(file_path, directory)), file_path
+
+# 全域串流 ZIP 實例
+zip_stream = ZipStream()